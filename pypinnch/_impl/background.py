@@ -31,6 +31,18 @@ from mv1fw.fw import (
     fw_backends_mps_is_available,
     fw_backends_mps_is_built,
 )
+from torch import (
+    get_num_threads as torch_get_num_threads,
+    set_num_threads as torch_set_num_threads,
+    get_num_interop_threads as torch_get_num_interop_threads,
+)
+
+from .impl2.threads import (
+    available_cores,
+    set_cores,
+    set_interop_threads,
+    autotune_threads,
+)
 
 
 
@@ -60,6 +72,25 @@ class Background:
             reproducible run.
          file (string):
             Always `__file__`.
+         threads (optional integer):
+            Number of intra-op threads (of the cpu backend).
+            If None, the framework's default. (Default: None)
+         interop_threads (optional integer):
+            Number of inter-op threads.
+            If None, the framework's default. (Default: None)
+         cores (optional list of integer):
+            The cores the process is pinned to (linux only).
+            If None, the process's affinity is unchanged. (Default: None)
+         autotune (boolean):
+            If set, and threads is None, the number of intra-op threads is
+            chosen by a short timing probe (a few seconds at most),
+            cf. :any:`autotune_threads`. (Default: False)
+
+    The effective thread counts and cores are logged by init().
+    Several processes that share a node, e.g., drivers,
+    the workers of a :any:`Sweep`, should divide the cores
+    between them, or threads oversubscribe the cores,
+    cf. :any:`DriverConfig`.
 
     """
     # todo experiment with precision levels
@@ -71,6 +102,10 @@ class Background:
         precision,
         seed,
         file,
+        threads = None,
+        interop_threads = None,
+        cores = None,
+        autotune = False,
     ):
         # initialize os's RNG (not used?)
         self.seed = seed
@@ -89,6 +124,11 @@ class Background:
         self.backend = None
         # > path for references, if any, set by `Engine`
         self.reference_absolute_root_directory = None
+        # > cpu parallelism
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.cores = cores
+        self.autotune = autotune
 
 
     def init(self, out = None):
@@ -154,10 +194,36 @@ class Background:
             out.log(f"Unrecognized backend {self.backend_requested}")
         out.log(f"Using precision {self.precision}...")
         fw_set_default_dtype(fw_type(float64))
+        # > the threads are set up before the framework is seeded
+        self.init_threads(out)
         fw_manual_seed(self.seed)
         out.log("\n\n")
 
 
+    def init_threads(self, out):
+        """
+        Set up the cpu parallelism: core affinity,
+        intra-op and inter-op threads, and log the effective values.
+
+        :meta private:
+        """
+        if self.cores is not None:
+            if not set_cores(self.cores):
+                out.log(f"[Threads] Core affinity is not supported on {platform}.")
+        threads = self.threads
+        if threads is None and self.autotune:
+            threads = autotune_threads()
+            out.log(f"[Threads] Autotuned intra-op threads: {threads}.")
+        if threads is not None:
+            torch_set_num_threads(threads)
+        if self.interop_threads is not None:
+            if not set_interop_threads(self.interop_threads):
+                out.log(f"[Threads] Inter-op threads could not be set, they were already in use.")
+        out.log(f"[Threads] intra-op threads: {torch_get_num_threads()}, "
+                f"inter-op threads: {torch_get_num_interop_threads()}, "
+                f"cores: {available_cores()}")
+
+
     def dtype(self):
         out = float32 if self.precision == 32 else float64 if self.precision == 64 else None
         if out is None:
@@ -185,6 +251,10 @@ class Background:
         out += f"backend: {self.backend_requested}\n"
         out += f"precision: {self.precision}\n"
         out += f"seed: {self.seed}\n"
+        out += f"threads: {self.threads}\n"
+        out += f"interop_threads: {self.interop_threads}\n"
+        out += f"cores: {self.cores}\n"
+        out += f"autotune: {self.autotune}\n"
         return out
 
 
@@ -63,6 +63,15 @@ class Constraint:
             for use in setting a custom batch;
             STIUYKB.
 
+        group (optional string):
+            Label of a sample group. Constraints in the same group
+            must have the same source (the same instance), and they share
+            one sample set, one batch per iteration, one forward pass,
+            and the cache of derivatives, while each keeps its own
+            weight and loss. For example, the residuals of a system
+            of pdes on the interior of a domain. The constraints
+            of a group must be declared consecutively. (Default: None)
+
     """
 
     def __init__(
@@ -70,10 +79,12 @@ class Constraint:
             residual = None,
             source = None,
             custom_batch = None,
+            group = None,
     ):
         self.source = source
         self.residual = residual
         self.custom_batch = custom_batch
+        self.group = group
         self.is_boundary_constraint = None
 
 
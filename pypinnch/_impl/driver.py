@@ -7,12 +7,10 @@
 
 from torch import (
     empty as torch_empty,
-    hstack as torch_hstack,
     from_numpy as torch_from_numpy,
 )
 from copy import deepcopy
 # import sys # sizeof
-from scipy.interpolate import griddata
 
 
 from .driverconfig import DriverConfig
@@ -57,6 +55,11 @@ class Driver:
             Strategies that apply to the driver.
         actions (optional list of :any:`Action`):
             Actions that are applied by the driver.
+        subdomain (optional :any:`Union`):
+            The subdomain of the driver, for domain decomposition,
+            cf. :any:`TimeIndependent`. The sample sets of the
+            constraints are restricted to the points in the subdomain.
+            (Default: None)
 
     """
 
@@ -68,6 +71,7 @@ class Driver:
             config = DriverConfig(),
             strategies = None,
             actions = None,
+            subdomain = None,
     ):
         self.strategies = strategies
         self.actions = []
@@ -79,6 +83,7 @@ class Driver:
         )
         self.config = config
         self.phases = phases
+        self.subdomain = subdomain
         self.phase = None
         self.L = 0
         self.hub = None
@@ -101,6 +106,14 @@ class Driver:
         self.the_model_is_not_ready_yet = True
         # final phase label
         self.final_plb = None
+        # current phase label and step, for checkpointing
+        self.plb = None
+        self.step = None
+        # state pending to resume a stride, or None
+        self.resume = None
+        # set during the callbacks of the resumed step,
+        # before its state is restored
+        self.resuming = False
 
 
     @timed("init")
@@ -228,7 +241,7 @@ class Driver:
         if self.icbase is not None:
             # know: self.phase has the final phase.
             # know: final phase did not deinit.
-            # copy icbase to fcbuffer
+            # hand off icbase to fcbuffer (the phase releases it below)
             self.fcbuffer(self.phase.samplesets.icbase)
         # free memory
         self.phase.deinit()
@@ -242,6 +255,66 @@ class Driver:
             return self.th.tfinal == self.problem_th.tfinal
 
 
+    def state_dict(self, granularity):
+        """
+        The state of the driver, for the purpose of checkpointing.
+
+        Arguments:
+
+            granularity (string):
+                "stride", "step", or "iteration"
+
+        Returns:
+
+            dict
+
+        :meta private:
+        """
+        out = {
+            "modules": [module.state_dict() for module in self.hub.modules],
+            "icbase": self.icbase.state_dict() if self.icbase is not None else None,
+            "fcbuffer": self.fcbuffer.state_dict(),
+            "th": deepcopy(self.th),
+            "the_model_is_not_ready_yet": self.the_model_is_not_ready_yet,
+            "phase": None,
+        }
+        if granularity != "stride" and self.during_phase:
+            out["plb"] = self.plb
+            out["step"] = self.step
+            out["L"] = self.L
+            out["phase"] = self.phase.state_dict(granularity)
+        return out
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict(). Called after init().
+        If the state was taken during a stride,
+        the phase state is kept pending,
+        and it is restored by the next call to critical_section().
+
+        Arguments:
+
+            state (dict):
+
+        :meta private:
+        """
+        for module, state_ in zip(self.hub.modules, state["modules"]):
+            module.load_state_dict(state_)
+        if self.icbase is not None:
+            self.icbase.load_state_dict(state["icbase"])
+        self.fcbuffer.load_state_dict(state["fcbuffer"])
+        self.th = state["th"]
+        self.the_model_is_not_ready_yet = state["the_model_is_not_ready_yet"]
+        if state["phase"] is not None:
+            self.resume = {
+                "plb": state["plb"],
+                "step": state["step"],
+                "L": state["L"],
+                "phase": state["phase"],
+            }
+
+
     #############################################
 
 
@@ -263,6 +336,7 @@ class Driver:
             hub=self.hub,
             manager=self.out,
             th=self.th,
+            subdomain=self.subdomain,
         )
 
 
@@ -276,8 +350,8 @@ class Driver:
         for _ in range(N):
             self.out.on_expand()
             # todo self.phase.samplesets.expand()
-            for c in self.phase.samplesets.cs:
-                c.expand()
+            for css in self.phase.samplesets.unique_csss():
+                css.expand()
             self.L += 1
 
 
@@ -289,8 +363,8 @@ class Driver:
             self.out.after_train()
             self.out.on_contract()
             # todo self.phase.samplesets.contract()
-            for c in self.phase.samplesets.cs:
-                c.contract()
+            for css in self.phase.samplesets.unique_csss():
+                css.contract()
             self.L -= 1
 
 
@@ -325,11 +399,21 @@ class Driver:
         :meta private:
         """
 
+        resume = self.resume
+        self.resume = None
+
+        self.config.apply()
+
         self.out.gate_phaseloop()
 
         for plb in self.phases:
             phase = self.phases[plb]
 
+            if resume is not None and plb != resume["plb"]:
+                # the phase was completed before the checkpoint
+                continue
+
+            self.plb = plb
             self.init_phase(phase=phase)
 
             self.out.on_phase(plb=plb, phase=phase)
@@ -337,11 +421,37 @@ class Driver:
             self.out.gate_steploop()
 
             for step in range(phase.th.Nstep()):
+                if resume is not None and step < resume["step"]:
+                    # the step was completed before the checkpoint
+                    continue
+
+                self.step = step
+                # > the state of the resumed step is restored after on_step,
+                # so it must not be checkpointed in on_step
+                self.resuming = resume is not None
                 self.out.on_step()
+                self.resuming = False
+
+                expanded = False
+                if resume is not None:
+                    # > restore the state taken in this step
+                    self.L = resume["L"]
+                    expanded = resume["phase"]["train"] is not None
+                    self.phase.load_state_dict(
+                        state=resume["phase"],
+                        out_state=resume["out"],
+                        random_state=resume["random"],
+                    )
+                    resume = None
+
+                # > warm start from the previous steps
+                if phase.strategies.using('warmstart') and not expanded:
+                    phase.strategies.warmstart.apply(phase=self.phase, step=step)
 
                 # graded training entry point
                 if phase.strategies.using('grading'):
-                    self.expand(step=step)
+                    if not expanded:
+                        self.expand(step=step)
                     self.train_and_contract()
                 # final training session
                 # Invariant: L = 0
@@ -349,6 +459,9 @@ class Driver:
                 passed = self.phase.train(level=self.L)
                 self.out.after_train()
 
+                if phase.strategies.using('warmstart'):
+                    phase.strategies.warmstart.store(phase=self.phase, step=step)
+
                 # > advance the phase in time
                 self.out.on_advance()
                 self.advance()
@@ -408,10 +521,13 @@ class Driver:
         X0 = X.X()
         t = X.t()
         end = X0.shape[1] - X.reserve
+        # > preallocate, the outputs are written in place
+        outdim = len(p_lbl) - p_indim
+        Xout = torch_empty((X0.shape[0], end + outdim), dtype=X0.dtype, device=X0.device)
+        Xout[:,:end] = X0[:,:end]
         # todo review and improve - cf. evaluate_output() documentation,
         #  which explains the planned revision
-        UU, _ = self.evaluate_output(X=X, force_evaluate=force_evaluate)
-        Xout = torch_hstack((X0[:,:end], UU.to(X0.device)))
+        self.evaluate_output(X=X, force_evaluate=force_evaluate, out=Xout[:,end:])
         fslabelsout = self.problem_fslabels
         return XFormat(
             X=Xout,
@@ -424,10 +540,13 @@ class Driver:
             self,
             X,
             force_evaluate = False,
+            out = None,
     ):
         """
         Evaluate the input data and return all the corresponding problem
         output label data as a raw pytorch tensor.
+        The modules are evaluated in chunks, without a graph,
+        cf. :any:`Module`.evaluate_on_input().
 
         .. note::
 
@@ -461,6 +580,9 @@ class Driver:
                 instead of evaluating using IC. STIUYKB, this is probably
                 only needed if you are computing moments to go
                 in constraints. Default: False
+            out (optional tensor):
+                Output UU, written in place, e.g., a slice of a larger tensor.
+                If None, it is allocated. Default: None
 
         Returns:
 
@@ -478,46 +600,47 @@ class Driver:
             Xbase = self.phase.samplesets.icbase.X
             if indim == 0:
                 # Most likely, X.shape[0] == 1
+                # The base has no inputs, its first columns are the outputs,
+                # as in the interpolation below.
                 shape0 = X0.shape[0]
-                u_ = Xbase[0:1,:]
-                UU = torch_empty((shape0, Xbase.shape[1])).to(device=self.config.device)
-                for i in range(shape0):
-                    UU[i:i+1,:] = u_
+                u_ = Xbase[0:1,:outdim].to(device=self.config.device)
+                if out is None:
+                    UU = u_.expand(shape0, -1).clone()
+                else:
+                    UU = out
+                    UU[:,:] = u_
             else:
                 # > interpolate Xbase outputs to X
                 # t is constant, so it can be removed
-                # from the interpolation call
-                points = []
-                for i in range(indim):
-                    points.append(Xbase[:,i])
-                Xhost = X0.cpu()
-                UU = griddata(
-                    points=tuple(points),
-                    # todo this assumes the first output ic's are the same as the outdim labels. -> XFormat
-                    values=Xbase[:,indim:indim+outdim],
-                    xi=Xhost[:,:indim],
-                    method="linear",
-                ).reshape((-1, outdim))
+                # from the interpolation call.
+                # The interpolator is cached by the base.
+                # todo this assumes the first output ic's are the same as the outdim labels. -> XFormat
+                interpolator = self.phase.samplesets.icbase.interpolator(outdim=outdim)
+                Xhost = X0.detach().cpu().numpy()
+                UU = interpolator(Xhost[:,:indim]).reshape((-1, outdim))
                 UU = torch_from_numpy(UU).to(device=self.config.device)
+                if out is not None:
+                    out[:,:] = UU
+                    UU = out
         else:
             # > make space
-            UU = torch_empty((X0.shape[0], outdim)).to(device=self.config.device)
+            UU = torch_empty((X0.shape[0], outdim), device=self.config.device) if out is None else out
             for ni, module in enumerate(self.hub.modules):
                 model_lbl = self.hub.lbls[ni]
                 model_indim = self.hub.indims[ni]
                 model_beg = self.hub.begs[ni]
                 # todo branch on t is None inside the call (and pass indim) for the sake of cleaner code?
+                beg = model_beg - indim
+                end = beg + len(model_lbl[model_indim:])
+                # > evaluate in place
                 if self.icbase is None:
                     # time-independent case
-                    Ui = module.evaluate_on_input(X0[:,:indim])
+                    module.evaluate_on_input(X0[:,:indim], out=UU[:,beg:end])
                 else:
                     if t is None:
-                        Ui = module.evaluate_on_input(X0[:,:indim+1])
+                        module.evaluate_on_input(X0[:,:indim+1], out=UU[:,beg:end])
                     else:
-                        Ui = module.evaluate_on_input((X0[:,:indim], t))
-                beg = model_beg - indim
-                end = beg + len(model_lbl[model_indim:])
-                UU[:,beg:end] = Ui
+                        module.evaluate_on_input((X0[:,:indim], t), out=UU[:,beg:end])
         return UU, lbl[indim:]
 
 
@@ -5,8 +5,11 @@
 
 from torch import (
     device as torch_device,
+    set_num_threads as torch_set_num_threads,
 )
 
+from .impl2.threads import set_cores
+
 
 class DriverConfig:
     """
@@ -26,14 +29,29 @@ class DriverConfig:
     Arguments:
 
         device_int (integer): a device id
+        threads (optional integer):
+            Number of intra-op threads while the driver trains,
+            overriding :any:`Background` and the engine. (Default: None)
+        cores (optional list of integer):
+            The cores the driver's process is pinned to
+            while the driver trains (linux only). (Default: None)
+
+    .. note::
+        The threads and cores apply to the process where the driver trains,
+        that is, its own process for engines that train drivers in parallel,
+        otherwise the main process, from the driver's first training on.
 
     """
 
     def __init__(
             self,
             device_int = 0,
+            threads = None,
+            cores = None,
     ):
         self.device_int = device_int
+        self.threads = threads
+        self.cores = cores
         self.device = None
         self.fw_type = None
 
@@ -50,9 +68,23 @@ class DriverConfig:
             print(f"[Warn] Driver: backend {background.backend} not recognized.")
         self.fw_type = background.fw_type()
 
+    def apply(self):
+        """
+        Set the threads and cores of the present process, if any.
+        Called by :any:`Driver` before it trains.
+        """
+        if self.cores is not None:
+            set_cores(self.cores)
+        if self.threads is not None:
+            torch_set_num_threads(self.threads)
+
     def __str__(self):
         out = ""
         out += f"device: {self.device_int} ({self.device})\n"
+        if self.threads is not None:
+            out += f"threads: {self.threads}\n"
+        if self.cores is not None:
+            out += f"cores: {self.cores}\n"
         return out
 
 
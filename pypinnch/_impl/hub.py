@@ -51,6 +51,9 @@ class Hub:
         # lists of batches, one per constraint
         self.XXs = None
         self.QQrefs = None
+        # list of importance weights, one per constraint,
+        # or None where importance batching is not used
+        self.IWs = None
 
         # pointers for problem.get()
         # that are set in phase.
@@ -60,6 +63,9 @@ class Hub:
         # todo review this policy.
         self._x = None
         self._u = None
+        # the reference values of the batch of the
+        # constraint whose loss is computed, or None
+        self._qqref = None
 
         # the timestep - passed to sample set advance() methods
         # via the hub, so that a future update might support an
@@ -1,16 +1,22 @@
 __all__ = [
+    "BatchsizeRamp",
     "Config",
     "Grad",
     "Ledger",
+    "LossWindow",
+    "QuietManager",
     "ResultPlotter",
     "RotateDict",
     "RotateList",
     "TimeHorizon",
 ]
 
+from .batchsizeramp import BatchsizeRamp
 from .config import Config
 from .grad import Grad
 from .ledger import Ledger
+from .losswindow import LossWindow
+from .quietmanager import QuietManager
 from .resultplotter import ResultPlotter
 from .rotatedict import RotateDict
 from .rotatelist import RotateList
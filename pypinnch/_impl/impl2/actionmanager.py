@@ -3,7 +3,10 @@
 
 
 
+import os
+import pickle
 import numpy as np
+from copy import deepcopy
 from os.path import (
     realpath as os_path_realpath,
 )
@@ -61,9 +64,6 @@ class ActionManager:
         engine,
         output_abs_path_root = None,
     ):
-        if len(engine.drivers) > 1:
-            # > raise error pending parallel driver update
-            raise ValueError(f"Manager class does not support multiple drivers yet.")
         self.cog = CogManager(
             output_abs_path_root=output_abs_path_root,
         )
@@ -167,19 +167,18 @@ class ActionManager:
             a.gate_strideloop(self.B)
         for p in self.B.engine.probes:
             p.gate_strideloop(self.B)
-        # todo this is incorrect code for multiple drivers -
-        #  gate_strideloop should be called once separately for each driver -
-        #  but review before changing - it's ok in one driver case.
-        for a in driver.actions:
-            a.gate_strideloop(self.B)
-        for p in driver.probes:
-            p.gate_strideloop(self.B)
-        for plb in driver.phases:
-            phase = driver.phases[plb]
-            for a in phase.actions:
+        # > once for each driver
+        for driver in self.B.engine.drivers:
+            for a in driver.actions:
                 a.gate_strideloop(self.B)
-            for p in phase.probes:
+            for p in driver.probes:
                 p.gate_strideloop(self.B)
+            for plb in driver.phases:
+                phase = driver.phases[plb]
+                for a in phase.actions:
+                    a.gate_strideloop(self.B)
+                for p in phase.probes:
+                    p.gate_strideloop(self.B)
         self.log(f"\n~-~-~-~-~-~-~-~-~-~-~-~-~-~-~-~-~\n")
 
 
@@ -199,17 +198,38 @@ class ActionManager:
             a.on_stride(self.B)
         for p in self.B.engine.probes:
             p.on_stride(self.B)
-        for driver in self.B.engine.drivers:
-            for a in driver.actions:
+        # > the driver of the stride
+        for a in self.B.driver.actions:
+            a.on_stride(self.B)
+        for p in self.B.driver.probes:
+            p.on_stride(self.B)
+        for plb in self.B.driver.phases:
+            phase = self.B.driver.phases[plb]
+            for a in phase.actions:
                 a.on_stride(self.B)
-            for p in driver.probes:
+            for p in phase.probes:
                 p.on_stride(self.B)
-            for plb in driver.phases:
-                phase = driver.phases[plb]
-                for a in phase.actions:
-                    a.on_stride(self.B)
-                for p in phase.probes:
-                    p.on_stride(self.B)
+
+
+    def join_stride(self, driver):
+        """
+        Bind the bundle and the cog to the stride of a driver
+        that was trained in another process, cf. :any:`Strides`.
+        The on_stride callbacks were called in that process,
+        and they are not called again.
+
+        Arguments:
+
+            driver (:any:`Driver`):
+
+        """
+        self.B.init_stride(
+            driver=driver,
+        )
+        self.cog.init_stride(
+            driver=driver,
+            ti=self.B.ti,
+        )
 
 
     def after_strideloop(self):
@@ -616,6 +636,24 @@ class ActionManager:
             p.after_constraint_loss(self.B, self.BB)
 
 
+    def set_losses(self, ic_losses, losses):
+        """
+        Replace the losses of the terms in the bundle,
+        e.g., by their averages over the processes
+        of :any:`DataParallel`. No callbacks are called.
+
+        Arguments:
+
+            ic_losses (list of float):
+            losses (list of float):
+
+        """
+        for i, loss in enumerate(ic_losses):
+            self.BB.ic_losses[i] = loss
+        for i, loss in enumerate(losses):
+            self.BB.losses[i] = loss
+
+
     def after_residual(self, R, T, W):
         self.BB.R = R
         self.BB.T = T
@@ -722,6 +760,21 @@ class ActionManager:
             p.on_maxiter_break(self.B, self.BB)
 
 
+    def on_plateau_break(self, reason):
+        kit = self.B.phase.strategies.optimizer.kit
+        saved = kit.max_iterations - self.BB.iteration
+        self.log(f"train at level {self.B.L}: "
+             f"break at iteration {self.BB.iteration} after reaching a loss plateau: "
+             f"{reason}. Saved {saved} iterations "
+             f"({(saved/kit.max_iterations)*100:04f}% of allocation).")
+        for p in self.B.engine.probes:
+            p.on_plateau_break(self.B, self.BB)
+        for p in self.B.driver.probes:
+            p.on_plateau_break(self.B, self.BB)
+        for p in self.B.phase.probes:
+            p.on_plateau_break(self.B, self.BB)
+
+
     def action_triggered_break(self):
         return self.B.action_triggered_break
 
@@ -759,4 +812,144 @@ class ActionManager:
             self.BB.values = None
 
 
+    # Checkpointing
+
+
+    def _all_actions(self):
+        """
+        All actions and probes, in a fixed order.
+        """
+        out = self.B.engine.actions + self.B.engine.probes
+        for driver in self.B.engine.drivers:
+            out += driver.actions + driver.probes
+            for plb in driver.phases:
+                phase = driver.phases[plb]
+                out += phase.actions + phase.probes
+        return out
+
+
+    def _stride_actions(self, driver):
+        """
+        The actions and probes that are called
+        in the stride of a driver, in a fixed order.
+        """
+        out = self.B.engine.actions + self.B.engine.probes
+        out += driver.actions + driver.probes
+        for plb in driver.phases:
+            phase = driver.phases[plb]
+            out += phase.actions + phase.probes
+        return out
+
+
+    def stride_state(self, driver):
+        """
+        The state of the actions of the stride of the driver,
+        cf. :any:`Action`.stride_state(). The main process takes it
+        before it forks the process that trains the stride,
+        as the base of the merge, cf. receive_stride_state().
+
+        Arguments:
+
+            driver (:any:`Driver`):
+
+        Returns:
+
+            list
+
+        """
+        return deepcopy([a.stride_state() for a in self._stride_actions(driver)])
+
+
+    def send_stride_state(self, fd, driver):
+        """
+        Called in a forked process that trained the stride
+        of the driver: send the state of the actions of the stride
+        to the main process, so that they are not lost at exit.
+
+        Arguments:
+
+            fd (integer): write end of a pipe
+            driver (:any:`Driver`):
+
+        """
+        state = self.stride_state(driver)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f)
+
+
+    def receive_stride_state(self, fd, driver, base):
+        """
+        Called in the main process, before it waits for the forked
+        process that trained the stride of the driver:
+        merge the state of the actions of the stride, cf. send_stride_state().
+        Nothing is received if the process failed.
+
+        Arguments:
+
+            fd (integer): read end of a pipe
+            driver (:any:`Driver`):
+            base (list): the state of the actions
+                when the process was forked, cf. stride_state()
+
+        """
+        with os.fdopen(fd, 'rb') as f:
+            data = f.read()
+        if len(data) == 0:
+            return
+        state = pickle.loads(data)
+        for a, state_, base_ in zip(self._stride_actions(driver), state, base):
+            if state_ is not None:
+                a.join_stride_state(state_, base_)
+
+
+    def state_dict(self):
+        """
+        State of the bundle counters and of
+        the actions, for the purpose of checkpointing.
+
+        Returns:
+
+            dict
+
+        """
+        return {
+            "B": {
+                "L": self.B.L,
+                "driveri": self.B.driveri,
+                "ti": self.B.ti,
+                "stride": self.B.stride,
+                "phasei": self.B.phasei,
+                "tj": self.B.tj,
+                "sj": self.B.sj,
+                "tr": self.B.tr,
+                "final": self.B.final,
+            },
+            "BB": {
+                "iteration": self.BB.iteration,
+            },
+            "actions": [a.state_dict() for a in self._all_actions()],
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        Arguments:
+
+            state (dict):
+
+        """
+        for key in state["B"]:
+            setattr(self.B, key, state["B"][key])
+        for key in state["BB"]:
+            setattr(self.BB, key, state["BB"][key])
+        actions = self._all_actions()
+        if len(actions) != len(state["actions"]):
+            raise ValueError(f"Checkpoint has {len(state['actions'])} actions, but {len(actions)} actions are defined.")
+        for a, state_ in zip(actions, state["actions"]):
+            a.load_state_dict(state_)
+
+
+
 
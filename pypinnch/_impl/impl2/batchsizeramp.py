@@ -0,0 +1,149 @@
+
+
+
+from .losswindow import LossWindow
+
+
+
+batchsize_schedule_default = {
+    # "geometric": grow every `every` iterations,
+    # "plateau": grow when the loss reaches a plateau.
+    "mode": "geometric",
+    # number of times the batch size grows to reach the full batch size
+    "nstages": 3,
+    # growth factor
+    "factor": 2,
+    # geometric mode only
+    "every": 1000,
+    # plateau mode only, cf. LossWindow
+    "window": 100,
+    "rtol": 1e-2,
+    "patience": 2,
+}
+
+
+
+class BatchsizeRamp:
+    """
+    State of a batch-size schedule during a call to train(),
+    cf. :any:`Kit`. The batch size of the constraints starts at
+    the full batch size divided by factor^nstages,
+    and grows by the factor at each stage, either every `every`
+    iterations (geometric mode) or when the loss reaches a plateau
+    (plateau mode), until it reaches the full batch size.
+
+    """
+
+    def __init__(self):
+        self.schedule = None
+        self.stage = 0
+        self.losswindow = None
+        self.loss = None
+
+
+    def init(self, schedule):
+        """
+        Called at the initialization of train().
+
+        Arguments:
+
+            schedule (optional dict):
+                The kit's batch-size schedule, or None.
+
+        """
+        if schedule is None:
+            self.schedule = None
+            self.losswindow = None
+        else:
+            self.schedule = {}
+            for key in batchsize_schedule_default:
+                self.schedule[key] = schedule[key] if key in schedule else batchsize_schedule_default[key]
+            if self.schedule["mode"] not in ["geometric", "plateau"]:
+                raise ValueError(f"Unrecognized batch size schedule mode {self.schedule['mode']}")
+            if self.schedule["mode"] == "plateau":
+                self.losswindow = LossWindow(
+                    window=self.schedule["window"],
+                    rtol=self.schedule["rtol"],
+                    patience=self.schedule["patience"],
+                )
+            else:
+                self.losswindow = None
+        self.stage = 0
+        self.loss = None
+
+
+    def using(self):
+        return self.schedule is not None
+
+
+    def finished(self):
+        """
+        Whether the full batch size is reached.
+        """
+        return not self.using() or self.stage == self.schedule["nstages"]
+
+
+    def divisor(self):
+        """
+        The full batch size divided by the current batch size.
+        """
+        if self.finished():
+            return 1
+        return self.schedule["factor"]**(self.schedule["nstages"] - self.stage)
+
+
+    def set_loss(self, L):
+        self.loss = L
+
+
+    def step(self, iteration):
+        """
+        Called once per iteration, after the optimizer step.
+
+        Arguments:
+
+            iteration (integer):
+                The iteration of train().
+
+        Returns:
+
+            boolean: whether the batch size grows.
+
+        """
+        if self.finished():
+            return False
+        out = False
+        if self.losswindow is None:
+            out = (iteration+1) % self.schedule["every"] == 0
+        elif self.loss is not None:
+            if self.losswindow.push(self.loss) and self.losswindow.plateau():
+                self.losswindow.reset()
+                out = True
+        self.loss = None
+        if out:
+            self.stage += 1
+        return out
+
+
+    def state_dict(self):
+        lw = self.losswindow
+        return {
+            "stage": self.stage,
+            "losswindow": None if lw is None else {
+                "acc": lw.acc,
+                "n": lw.n,
+                "best": lw.best,
+                "mean": lw.mean,
+                "improvement": lw.improvement,
+                "nfail": lw.nfail,
+            },
+        }
+
+
+    def load_state_dict(self, state):
+        self.stage = state["stage"]
+        if state["losswindow"] is not None:
+            for key in state["losswindow"]:
+                setattr(self.losswindow, key, state["losswindow"][key])
+
+
@@ -0,0 +1,112 @@
+
+
+
+class LossWindow:
+    """
+    Running test for stagnation of a loss history.
+    Loss values are accumulated over windows of a fixed
+    number of iterations, and the mean over each window
+    is compared to the best mean seen so far.
+    A window "fails" if its relative improvement
+    is less than `rtol`, and the loss is said to have
+    reached a plateau after `patience` consecutive failed windows.
+
+    Only host (Python float) values are pushed,
+    so that using the window never forces a device sync.
+
+    Parameters:
+
+        window (integer):
+            Number of iterations per window.
+        rtol (scalar):
+            Relative improvement of the windowed mean loss
+            below which a window is counted as failed.
+        patience (integer):
+            Number of consecutive failed windows
+            that signal a plateau.
+
+    """
+
+    def __init__(
+            self,
+            window,
+            rtol,
+            patience,
+    ):
+        if window < 1:
+            raise ValueError(f"[LossWindow] window must be a positive integer, received {window}.")
+        if patience < 1:
+            raise ValueError(f"[LossWindow] patience must be a positive integer, received {patience}.")
+        self.window = window
+        self.rtol = rtol
+        self.patience = patience
+        self.acc = 0.0
+        self.n = 0
+        self.best = None
+        self.mean = None
+        self.improvement = None
+        self.nfail = 0
+
+
+    def reset(self):
+        """
+        Forget the loss history.
+        """
+        self.acc = 0.0
+        self.n = 0
+        self.best = None
+        self.mean = None
+        self.improvement = None
+        self.nfail = 0
+
+
+    def push(self, L):
+        """
+        Push a loss value.
+
+        Arguments:
+
+            L (scalar):
+                A loss value, already on the host.
+
+        Returns:
+            boolean: whether a window was closed by this value.
+
+        """
+        self.acc += L
+        self.n += 1
+        if self.n < self.window:
+            return False
+        self.mean = self.acc/self.n
+        self.acc = 0.0
+        self.n = 0
+        if self.best is None:
+            self.best = self.mean
+            self.improvement = None
+            self.nfail = 0
+        else:
+            self.improvement = (self.best - self.mean)/abs(self.best) if self.best != 0.0 else 0.0
+            if self.improvement < self.rtol:
+                self.nfail += 1
+            else:
+                self.nfail = 0
+            if self.mean < self.best:
+                self.best = self.mean
+        return True
+
+
+    def plateau(self):
+        """
+        Whether the loss has reached a plateau.
+        """
+        return self.nfail >= self.patience
+
+
+    def __str__(self):
+        out = f"window: {self.window}\n"
+        out += f"rtol: {self.rtol}\n"
+        out += f"patience: {self.patience}\n"
+        return out
+
+
+
@@ -0,0 +1,17 @@
+
+
+
+class QuietManager:
+    """
+    Stands in for the :any:`ActionManager` where no actions
+    should be called (logging, checkpointing, output),
+    e.g., in a worker process, or for an auxiliary driver.
+    Every call is a no-op.
+
+    :meta private:
+    """
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
@@ -0,0 +1,90 @@
+
+
+
+import random
+
+from numpy import (
+    random as np_random,
+)
+from torch import (
+    get_rng_state as torch_get_rng_state,
+    set_rng_state as torch_set_rng_state,
+)
+from torch.cuda import (
+    is_available as torch_cuda_is_available,
+    get_rng_state_all as torch_cuda_get_rng_state_all,
+    set_rng_state_all as torch_cuda_set_rng_state_all,
+)
+
+
+
+
+def _sources(problem):
+    """
+    Helper to list the problem's sources by label.
+    """
+    out = {}
+    if problem.ic_source is not None:
+        out["ic"] = problem.ic_source
+    for lb in problem.constraints:
+        source = problem.constraints[lb].source
+        if source is not None:
+            out[lb] = source
+    return out
+
+
+
+def get_random_state(problem):
+    """
+    Get all of the state that determines the random
+    numbers drawn during training, for a checkpoint.
+    This covers the Python, numpy, and torch (cpu and cuda)
+    generators, and the samplers of the problem's sources.
+    The skopt samplers draw from the numpy generator,
+    so their state is covered by the numpy state.
+
+    Arguments:
+
+        problem (:any:`Problem`):
+
+    Returns:
+
+        dict
+
+    """
+    return {
+        "random": random.getstate(),
+        "numpy": np_random.get_state(),
+        "torch": torch_get_rng_state(),
+        "cuda": torch_cuda_get_rng_state_all() if torch_cuda_is_available() else None,
+        "sources": {
+            lb: source.state_dict() for lb, source in _sources(problem).items()
+        },
+    }
+
+
+
+def set_random_state(state, problem):
+    """
+    Inverse of :any:`get_random_state`.
+    Since nearly everything draws random numbers,
+    this should be the last thing done when restoring a checkpoint.
+
+    Arguments:
+
+        state (dict):
+        problem (:any:`Problem`):
+
+    """
+    random.setstate(state["random"])
+    np_random.set_state(state["numpy"])
+    torch_set_rng_state(state["torch"])
+    if state["cuda"] is not None and torch_cuda_is_available():
+        torch_cuda_set_rng_state_all(state["cuda"])
+    sources = _sources(problem)
+    for lb in state["sources"]:
+        if lb in sources:
+            sources[lb].load_state_dict(state["sources"][lb])
+
+
+
@@ -0,0 +1,136 @@
+import os
+import time
+
+from torch import (
+    rand as torch_rand,
+    Generator as torch_Generator,
+    float64 as torch_float64,
+    get_num_threads as torch_get_num_threads,
+    set_num_threads as torch_set_num_threads,
+    get_num_interop_threads as torch_get_num_interop_threads,
+    set_num_interop_threads as torch_set_num_interop_threads,
+)
+
+
+
+
+def available_cores():
+    """
+    The cores the process may run on.
+
+    Returns:
+
+        list of integer
+
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+
+def set_cores(cores):
+    """
+    Pin the process to the cores.
+
+    Arguments:
+
+        cores (list of integer):
+
+    Returns:
+
+        boolean: whether the platform supports core affinity
+
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    os.sched_setaffinity(0, cores)
+    return True
+
+
+
+def set_interop_threads(n):
+    """
+    Set the number of inter-op threads. The framework only allows this
+    before its first inter-op parallel work, e.g., once per process.
+
+    Returns:
+
+        boolean: whether the number was set
+
+    """
+    if torch_get_num_interop_threads() == n:
+        return True
+    try:
+        torch_set_num_interop_threads(n)
+    except RuntimeError:
+        return False
+    return True
+
+
+
+def autotune_threads(
+        candidates = None,
+        batchsize = 4096,
+        width = 64,
+        depth = 4,
+        repeat = 3,
+):
+    """
+    A short probe for the number of intra-op threads:
+    time the forward and backward passes of a small
+    fully connected tanh network, with each candidate number
+    of threads, and return the fastest. A greater number of threads
+    is only preferred if it is at least 5% faster.
+    The number of threads is restored, and the probe
+    draws from its own generator, so the global random state
+    is left unchanged.
+
+    Arguments:
+
+        candidates (optional list of integer):
+            If None, the powers of 2 up to the number
+            of available cores, and that number.
+
+    Returns:
+
+        integer
+
+    """
+    ncores = len(available_cores())
+    if candidates is None:
+        candidates = []
+        n = 1
+        while n < ncores:
+            candidates.append(n)
+            n *= 2
+        candidates.append(ncores)
+    threads0 = torch_get_num_threads()
+    generator = torch_Generator().manual_seed(0)
+    X = torch_rand(batchsize, width, dtype=torch_float64, generator=generator)
+    Ws = [torch_rand(width, width, dtype=torch_float64, generator=generator).requires_grad_(True) for _ in range(depth)]
+
+    def probe():
+        Y = X
+        for W in Ws:
+            Y = (Y @ W).tanh()
+        Y.sum().backward()
+
+    best = None
+    best_dt = None
+    for n in sorted(candidates):
+        torch_set_num_threads(n)
+        # warm up
+        probe()
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            probe()
+        dt = time.perf_counter() - t0
+        if best is None or dt < 0.95*best_dt:
+            best = n
+            best_dt = dt
+    torch_set_num_threads(threads0)
+    return best
+
+
+
@@ -33,6 +33,18 @@ class Kit:
             A dict for LBFGS parameters.
         adamw:
             A dict for other AdamW and AMSGrad parameters.
+        gaussnewton:
+            A dict for GaussNewton and GaussNewtonCG parameters.
+        batchsize_schedule (optional dict):
+            A dict for a batch-size schedule (ramp) of the constraints,
+            or None for a constant batch size. Each call to train()
+            starts with the phase's batch size divided by factor^nstages,
+            and grows it by the factor, either every `every` iterations
+            (mode: geometric) or when the loss reaches a plateau
+            (mode: plateau, with window, rtol, patience as in :any:`Plateau`),
+            until it is the phase's batch size.
+            Keys: mode, nstages, factor, every, window, rtol, patience.
+            The batch size of the IC is not affected.
 
     """
 
@@ -44,6 +56,8 @@ class Kit:
         gamma = 0.9,
         lbfgs = None,
         adamw = None,
+        gaussnewton = None,
+        batchsize_schedule = None,
     ):
         self.max_iterations = max_iterations
         self.tolerance = tolerance
@@ -51,6 +65,8 @@ class Kit:
         self.gamma = gamma
         self.lbfgs = {} if lbfgs is None else lbfgs
         self.adamw = {} if adamw is None else adamw
+        self.gaussnewton = {} if gaussnewton is None else gaussnewton
+        self.batchsize_schedule = batchsize_schedule
 
 
     def __len__(self):
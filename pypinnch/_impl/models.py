@@ -40,9 +40,9 @@ class Models:
         self.file = file
         self._i = 0
 
-    def init(self):
+    def init(self, parameters=None):
         for model in self.model_list:
-            model.init()
+            model.init(parameters=parameters)
 
     def __getitem__(self, idx):
         return self.model_list[idx]
@@ -60,6 +60,13 @@ class Periodic(DataResidual):
         labels (string):
             A labels string.
 
+        axis (optional string):
+            The label of the periodic input, if the
+            periodicity is along one axis. If the axis is
+            encoded by a :any:`PeriodicEncoding`, the periodicity
+            is exact, and the constraint is dropped from the phases.
+            (Default: None)
+
     """
 
     def __init__(
@@ -67,9 +74,11 @@ class Periodic(DataResidual):
             transform,
             labels = None,
             label = None,
+            axis = None,
     ):
         super().__init__(labels, label)
         self.transform = transform
+        self.axis = axis
 
 
 
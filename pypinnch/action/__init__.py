@@ -7,6 +7,7 @@ __all__ = [
     #
     "Info",
     "ModelCheckpoint",
+    "TrainingCheckpoint",
     "Result",
     "LossCurves",
     "MLTest",
@@ -22,6 +23,7 @@ from .action_impl import Action, Probe, Bundle, ActionBundle, ProbeBundle
 
 from .info import Info
 from .modelcheckpoint import ModelCheckpoint
+from .trainingcheckpoint import TrainingCheckpoint
 from .result import Result
 from .losscurves import LossCurves
 from .mltest import MLTest
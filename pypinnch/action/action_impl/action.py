@@ -50,6 +50,66 @@ class Action:
         self.cog_id = cog_id
 
 
+    def state_dict(self):
+        """
+        State of the action, for the purpose of checkpointing.
+        Stateless actions return None.
+
+        :meta private:
+        """
+        return None
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        :meta private:
+        """
+        pass
+
+
+    def stride_state(self):
+        """
+        State of the action after a stride that was trained
+        in a forked process, sent back to the main process,
+        cf. :any:`Strides`. By default, state_dict().
+
+        :meta private:
+        """
+        return self.state_dict()
+
+
+    def join_stride_state(self, state, base):
+        """
+        Merge the state of the action in a forked process,
+        cf. stride_state(). Several strides may train concurrently,
+        so the state is merged into the present state, not loaded.
+        By default, a number is a counter: its change during the stride
+        (from `base`, the state when the process was forked) is added,
+        and any other entry is replaced. An action whose state
+        is not of this kind overrides this method.
+
+        Arguments:
+
+            state (dict): the state at the end of the stride
+            base (dict): the state when the process was forked
+
+        :meta private:
+        """
+        if not isinstance(state, dict):
+            raise ValueError(f"[{self}] The state of the action cannot be merged, implement join_stride_state().")
+        base = base if base is not None else {}
+        own = self.state_dict()
+        for key in state:
+            x = state[key]
+            if isinstance(x, (int, float)) and not isinstance(x, bool) and isinstance(base.get(key), (int, float)):
+                own[key] = own[key] + x - base[key]
+            else:
+                own[key] = x
+        self.load_state_dict(own)
+
+
     def is_final_phase(self, B):
         """
         Helper to allow actions to check whether
@@ -266,6 +326,11 @@ class Probe(Action):
 
 
 
+    def on_plateau_break(self, B, BB):
+        pass
+
+
+
     def after_taweighting_step(self, B, BB):
         pass
 
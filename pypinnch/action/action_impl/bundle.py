@@ -146,9 +146,12 @@ class ActionBundle(Bundle):
             self,
             driver,
     ):
+        # the driver of the stride,
+        # with multiple drivers, this changes with each stride.
+        self.driver = driver
+        self.out = driver.out
         # bundles expose modules to actions.
         # modules may change between strides in testing contexts.
-        # todo awk, remove and remove driver argument
         self.modules = driver.hub.modules
         self.phasei = 0
         self.stride += 1
@@ -53,6 +53,9 @@ class Info(Probe):
         self.it_checkpoint = None
         self.it_checkpoint_c = 0
         self.it_base_time = None
+        # iterations saved by plateau termination
+        self.plateau_nbreak = 0
+        self.plateau_saved = 0
 
 
     def gate_strideloop(self, B):
@@ -172,6 +175,11 @@ class Info(Probe):
         self.it_checkpoint_c += 1
 
 
+    def on_plateau_break(self, B, BB):
+        self.plateau_nbreak += 1
+        self.plateau_saved += BB.kit.max_iterations - BB.iteration
+
+
     def on_end(self, B):
         # > collect the full start-to-finish clock measurement
         self.cycle_total_time()
@@ -185,10 +193,39 @@ class Info(Probe):
         )
         with open(filename, 'w') as f:
             f.write(str(timingstore))
+        if self.plateau_nbreak > 0:
+            self.log(f"plateau termination: {self.plateau_nbreak} calls to train stopped early, "
+                     f"{self.plateau_saved} iterations saved in total.")
         self.log(f"ttx {self.total_time:.8f}, {approximately(self.total_time)}\n\n\n")
         self.store_log()
 
 
+    def state_dict(self):
+        self.cycle_total_time()
+        return {
+            "total_time": self.total_time,
+            "it_checkpoint": self.it_checkpoint,
+            "it_checkpoint_c": self.it_checkpoint_c,
+            "it_base_time": self.it_base_time,
+            "plateau_nbreak": self.plateau_nbreak,
+            "plateau_saved": self.plateau_saved,
+        }
+
+
+    def load_state_dict(self, state):
+        # the clock continues from the time when the checkpoint was taken
+        self.base_elapsed = default_timer()
+        for key in state:
+            setattr(self, key, state[key])
+
+
+    def join_stride_state(self, state, base):
+        # the clock of the main process runs during the strides,
+        # and the progress of train() is local to the stride
+        self.plateau_nbreak += state["plateau_nbreak"] - base["plateau_nbreak"]
+        self.plateau_saved += state["plateau_saved"] - base["plateau_saved"]
+
+
     def store_log(self):
         filename = self.cog.filename(
             action=self,
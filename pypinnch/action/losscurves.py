@@ -241,6 +241,20 @@ class LossCurves(Probe):
         self.checkpoint_iteration = 0
 
 
+    def stride_state(self):
+        if self.Z is None:
+            return None
+        return {
+            "Z": self.Z,
+        }
+
+
+    def join_stride_state(self, state, base):
+        # > the steps recorded by the stride
+        recorded = state["Z"][:,0] != -1.0
+        self.Z[recorded,:] = state["Z"][recorded,:]
+
+
     def after_strideloop(self, B):
         filename = self.cog.filename(
             action=self,
@@ -17,7 +17,9 @@ class ModelCheckpoint(Probe):
 
     .. note::
 
-        Does not save the optimizer state, ITCINOOD.
+        Does not save the optimizer state. To save the
+        entire training state, in order to resume a run,
+        use :any:`TrainingCheckpoint`.
 
     Parameters:
 
@@ -59,5 +61,15 @@ class ModelCheckpoint(Probe):
         self.checkpoint_i += 1
 
 
+    def state_dict(self):
+        return {
+            "checkpoint_i": self.checkpoint_i,
+        }
+
+
+    def load_state_dict(self, state):
+        self.checkpoint_i = state["checkpoint_i"]
+
+
 
 
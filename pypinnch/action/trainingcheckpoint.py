@@ -0,0 +1,114 @@
+
+
+
+import torch
+
+from os import (
+    replace as os_replace,
+)
+
+from .action_impl import Probe
+
+
+class TrainingCheckpoint(Probe):
+    """
+    This action saves the entire training state,
+    so that a run can be resumed via
+    :any:`Engine.set_checkpoint_loadpath`,
+    for example after the run is preempted.
+    The state includes the modules, the optimizer
+    and lr scheduler state, the state of the strategies,
+    the sample sets and their ages, the IC base and
+    buffer, the moment lattices, the counters of the actions
+    (including :any:`Info`), and the state of all the
+    random number generators, so that the resumed run
+    proceeds exactly as the original run would have.
+
+    The checkpoint is written to the same file each time
+    (unless `keep` is set), and the file is replaced atomically,
+    so that a run that is interrupted while saving
+    still has a valid checkpoint.
+
+    Parameters:
+
+        granularity (string):
+
+            - stride: checkpoint at the end of each stride.
+            - step: checkpoint at the start of each step.
+            - iteration: checkpoint at the start of an iteration
+                of a call to train().
+
+            (Default: step)
+
+        every (integer):
+            Checkpoint every `every` strides, steps,
+            or iterations, depending on the granularity.
+            (Default: 1)
+
+        keep (boolean):
+            If set, keep all checkpoints, otherwise
+            only the latest checkpoint is kept. (Default: False)
+
+    """
+
+    def __init__(
+            self,
+            granularity = "step",
+            every = 1,
+            keep = False,
+    ):
+        super().__init__()
+        if granularity not in ["stride", "step", "iteration"]:
+            raise ValueError(f"Unrecognized checkpoint granularity {granularity}")
+        if every < 1:
+            raise ValueError(f"Invalid value every = {every}")
+        self.granularity = granularity
+        self.every = every
+        self.keep = keep
+
+
+    def after_stride(self, B):
+        if self.granularity == "stride" and B.stride % self.every == 0:
+            self.save(B, f"stride{B.stride}")
+
+
+    def on_step(self, B):
+        if B.driver.resuming:
+            # the state is not restored yet, and the
+            # checkpoint it was restored from is kept
+            return
+        if self.granularity == "step" and B.tj % self.every == 0:
+            self.save(B, f"stride{B.stride}_phase{B.phasei}_step{B.tj}")
+
+
+    def on_iter(self, B, BB):
+        if self.granularity == "iteration" \
+        and BB.iteration > 0 and BB.iteration % self.every == 0:
+            self.save(B, f"stride{B.stride}_phase{B.phasei}_step{B.tj}_train{B.tr}_iter{BB.iteration}")
+
+
+    def save(self, B, tag):
+        """
+        Save the training state.
+
+        Arguments:
+
+            B (:any:`ActionBundle`):
+            tag (string):
+                describes the position in the run.
+
+        :meta private:
+        """
+        handle = f"state_{tag}" if self.keep else "state"
+        filename = self.cog.filename(
+            action=self,
+            handle=handle,
+            stem="pth",
+        )
+        state = B.engine.state_dict(granularity=self.granularity)
+        torch.save(state, filename + ".tmp")
+        os_replace(filename + ".tmp", filename)
+        self.log(f"Saved training checkpoint ({tag}).")
+
+
+
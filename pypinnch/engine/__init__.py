@@ -1,12 +1,20 @@
 __all__ = [
     "Engine",
+    "Parareal",
+    "Strides",
     "StridesIC",
+    "SuccessiveHalving",
+    "Sweep",
     "TimeIndependent",
 ]
 
 
 from .engine_impl.engine import Engine
+from .parareal import Parareal
+from .strides import Strides
 from .stridesic import StridesIC
+from .successivehalving import SuccessiveHalving
+from .sweep import Sweep
 from .timeindependent import TimeIndependent
 
 
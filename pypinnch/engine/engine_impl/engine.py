@@ -5,9 +5,18 @@
 from ..._impl.impl2.actionmanager import ActionManager
 from ...action.action_impl.action import separate_actions_probes
 from ...action.info import Info
+from ...action.trainingcheckpoint import TrainingCheckpoint
 from ...strategy.strategy_impl.strategies import Strategies
 from ..._impl.impl2 import RotateDict
 from ..._impl.driver import Driver
+from ..._impl.impl2.randomstate import (
+    get_random_state,
+    set_random_state,
+)
+
+from torch import (
+    load as torch_load,
+)
 
 
 class Engine:
@@ -98,6 +107,7 @@ class Engine:
         # > set checkpoints
         self.checkpoints = [10, 30, 60, 90] if checkpoints is None else checkpoints
         self.checkpoint_loadpath = None
+        self.checkpoint_weights_only = False
         # location of engine, if in a separate file
         self.file = file
         # case runs
@@ -126,7 +136,7 @@ class Engine:
             for model in self.models:
                 if model.labels is None:
                     raise ValueError(f"Model labels have not been set.")
-        self.models.init()
+        self.models.init(parameters=self.problem.p)
         # > compare problem labels vs. model labels
         self._labelcheck()
 
@@ -291,24 +301,147 @@ class Engine:
         self.strategies = Strategies(strategies)
 
 
-    def set_checkpoint_loadpath(self, filename):
+    def set_checkpoint_loadpath(self, filename, weights_only = False):
         """
-        Load training state from storage.
-        Inverse of Checkpoint::save().
+        Config method. (Called by user.)
+        Resume training from a checkpoint in storage,
+        produced by :any:`TrainingCheckpoint`.
+        The checkpoint is loaded after initialization, and the
+        run continues from the stride, step, or iteration where
+        the checkpoint was taken. The configuration of the engine
+        (problem, phases, strategies, actions) must be the same
+        as that of the run that produced the checkpoint.
+
+        Arguments:
+
+            filename (string):
+                path to a checkpoint file.
+            weights_only (boolean):
+                If set, only the weights of the modules are loaded,
+                and the run starts from the beginning. In this case the
+                file can also be one produced by :any:`ModelCheckpoint`.
+                (Default: False)
 
         """
         self.checkpoint_loadpath = filename
+        self.checkpoint_weights_only = weights_only
 
-        # todo move to init routines
-        # _, fname = split_path(filename)
-        # self.log(f"\nRestoring model from {fname}...\n")
-        # checkpoint = torch.load(filename)
-        # module.load_state_dict(checkpoint["state_dict"])
-        # optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
 
+    ###################################################
 
 
-    ###################################################
+    def state_dict(self, granularity):
+        """
+        The state of the run, for the purpose of checkpointing.
+        Engines with additional state should extend this method.
+
+        Arguments:
+
+            granularity (string):
+                "stride", "step", or "iteration"
+
+        Returns:
+
+            dict
+
+        """
+        return {
+            "granularity": granularity,
+            "ti": self.out.B.ti,
+            "stride": self.out.B.stride,
+            "rotation": self.drivers._z,
+            "drivers": {
+                key: self.drivers.dict[key].state_dict(granularity)
+                for key in self.drivers.key
+            },
+            "out": self.out.state_dict(),
+            "random": get_random_state(self.problem),
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        Arguments:
+
+            state (dict):
+
+        """
+        self.drivers._z = state["rotation"]
+        resuming = False
+        for key in self.drivers.key:
+            driver = self.drivers.dict[key]
+            driver.load_state_dict(state["drivers"][key])
+            if driver.resume is not None:
+                driver.resume["out"] = state["out"]
+                driver.resume["random"] = state["random"]
+                resuming = True
+        self.out.load_state_dict(state["out"])
+        if resuming:
+            # the stride is entered again, and its counter is incremented again.
+            # The driver restores everything else when it reaches the checkpoint.
+            self.out.B.stride -= 1
+        else:
+            set_random_state(state["random"], self.problem)
+
+
+    def load_checkpoint(self):
+        """
+        Load the checkpoint set by :any:`set_checkpoint_loadpath`, if any.
+        Called by the engine in start(), after init().
+
+        Returns:
+
+            ti, nstride (pair of integer):
+                total timesteps and number of strides
+                completed before the checkpoint.
+
+        """
+        if self.checkpoint_loadpath is None:
+            return 0, 0
+        state = torch_load(
+            self.checkpoint_loadpath,
+            map_location="cpu",
+            weights_only=False,
+        )
+        if self.checkpoint_weights_only:
+            self.out.log(f"Loading model weights from {self.checkpoint_loadpath}.")
+            for key in self.drivers.key:
+                driver = self.drivers.dict[key]
+                if "drivers" in state:
+                    # TrainingCheckpoint
+                    states = state["drivers"][key]["modules"]
+                else:
+                    # ModelCheckpoint
+                    states = [state["state_dict"]]
+                for module, state_ in zip(driver.hub.modules, states):
+                    module.load_state_dict(state_)
+            return 0, 0
+        self.load_state_dict(state)
+        if state["granularity"] == "stride":
+            nstride = state["stride"]
+        else:
+            nstride = state["stride"] - 1
+        self.out.log(f"Resuming from checkpoint {self.checkpoint_loadpath} "
+                     f"(granularity {state['granularity']}, stride {state['stride']}, ti {state['ti']}).")
+        return state["ti"], nstride
+
+
+    def _check_forked_checkpoints(self):
+        """
+        Reject the training checkpoints that would be saved
+        while the drivers train in forked processes:
+        the processes would write the same file at the same time,
+        and the state of the main process is not up to date.
+        Called during initialization by engines that fork.
+
+        :meta private:
+        """
+        for a in self.out._all_actions():
+            if isinstance(a, TrainingCheckpoint) and a.granularity != "stride":
+                raise ValueError(f"[{self.__class__.__name__}] TrainingCheckpoint granularity {a.granularity} "
+                                 f"is not supported, the drivers train in forked processes. Use granularity stride.")
 
 
     def _labelcheck(self):
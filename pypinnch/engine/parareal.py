@@ -0,0 +1,244 @@
+from .strides import Strides, _relative_change
+
+from copy import deepcopy
+
+from torch import (
+    zeros as torch_zeros,
+    zeros_like as torch_zeros_like,
+    int64 as torch_int64,
+    float64 as torch_float64,
+)
+
+from ..sampler.buffer import Buffer
+from .._impl.impl2.quietmanager import QuietManager
+from .._impl.types import timed
+
+
+
+class Parareal(Strides):
+    """
+    A time-parallel engine for time-dependent problems,
+    by the Parareal iteration over the strides of a round.
+    A cheap coarse propagator G (the driver `coarse`, e.g.,
+    with few iterations per stride, or a small sample set)
+    predicts the ICs of the strides in sequence,
+    and the expensive fine drivers F (the engine's drivers)
+    train the strides in parallel, each in its own process.
+    Each sweep corrects the ICs in sequence::
+
+        U[n+1] = G(U'[n]) + F(U[n]) - G(U[n])
+
+    where U' are the corrected ICs. An IC that is unchanged
+    by the sweep is propagated exactly, U[n+1] = F(U[n]),
+    without the coarse propagator, so after k sweeps
+    the first k strides are exact, and only the strides
+    whose IC changed are trained again.
+    The iteration ends when the greatest relative change
+    of the ICs (in the 2-norm) is below `rtol`, after `maxsweeps` sweeps,
+    or after `len(drivers)` sweeps, when it is exact.
+    The relative change of each IC is logged after each sweep.
+
+    The coarse driver trains in the main process, with its own modules,
+    and its actions are not called. The fine drivers are as
+    in :any:`Strides`, whose parameters are the same.
+
+    .. note::
+        CPU only. Checkpoints are saved and resumed at the
+        granularity of strides.
+
+    Parameters:
+
+        coarse (:any:`Driver`):
+            The coarse propagator.
+
+    """
+
+    def __init__(
+            self,
+            coarse,
+            phases = None,
+            drivers = None,
+            handle = None,
+            topline = None,
+            background = None,
+            problem = None,
+            models = None,
+            strategies = None,
+            actions = None,
+            checkpoints = None,
+            file = None,
+            rtol = 1e-3,
+            maxsweeps = 10,
+            threads = None,
+    ):
+        super().__init__(
+            phases=phases,
+            drivers=drivers,
+            handle=handle,
+            topline=topline,
+            background=background,
+            problem=problem,
+            models=models,
+            strategies=strategies,
+            actions=actions,
+            checkpoints=checkpoints,
+            file=file,
+            rtol=rtol,
+            maxsweeps=maxsweeps,
+            threads=threads,
+        )
+        self.coarse = coarse
+
+
+    @timed("init")
+    def init(self):
+        """
+
+        Called after start() and after config stage.
+
+        """
+        super().init()
+        self.coarse.init(
+            background=self.background,
+            problem=self.problem,
+            models=self.models,
+            manager=QuietManager(),
+            first=False,
+        )
+        # > the ICs share the sample of the zeroth driver,
+        # so that the propagated ICs can be combined
+        self.coarse.icbase = deepcopy(self.drivers[0].icbase)
+        self.problem._driver = self.drivers[0]
+
+
+    @timed("deinit")
+    def deinit(self):
+        super().deinit()
+        self.coarse.deinit()
+
+
+    def _coarse(self, U, th):
+        """
+        The coarse propagator: train the coarse driver
+        over the time horizon th, from the IC U.
+
+        Returns:
+
+            :any:`Buffer`: the final condition
+
+        """
+        self.problem._driver = self.coarse
+        self.coarse.th = deepcopy(th)
+        self.coarse.icbase(buffer=U)
+        self.coarse.critical_section()
+        self.problem._driver = self.drivers[0]
+        # (the coarse driver replaces its fcbuffer's X in the next training)
+        out = Buffer()
+        out(self.coarse.fcbuffer)
+        return out
+
+
+    def _fine(self, drivers, U, indices):
+        """
+        The fine propagator: train the strides of the
+        drivers in indices in parallel, from the ICs U.
+
+        Returns:
+
+            dict: integer -> :any:`Buffer`, the final conditions
+
+        """
+        n = len(drivers)
+        X = [torch_zeros_like(U[0].X).share_memory_() for _ in range(n)]
+        ts = torch_zeros(n, dtype=torch_float64).share_memory_()
+        status = torch_zeros(n, dtype=torch_int64).share_memory_()
+
+        def work(i):
+            driver = drivers[i]
+            self.out.on_stride(driver=driver)
+            driver.critical_section()
+            X[i].copy_(driver.fcbuffer.X)
+            ts[i] = driver.fcbuffer.t
+            self.out.after_critical_section()
+
+        for i in indices:
+            drivers[i].icbase(buffer=U[i])
+        self._fork(
+            drivers=drivers,
+            indices=indices,
+            work=work,
+            status=status,
+        )
+        out = {}
+        for i in indices:
+            # (the slots are not written again, they are handed off)
+            F = Buffer()
+            F.X = X[i]
+            F.t = float(ts[i])
+            out[i] = F
+        return out
+
+
+    @timed("critical_section")
+    def critical_section(self, drivers):
+        """
+        The Parareal iteration over the strides of a round.
+
+        Arguments:
+
+            drivers (list of :any:`Driver`):
+
+        """
+        n = len(drivers)
+        # > prediction: U[i] is the IC of stride i, G[i] = G(U[i])
+        U = [Buffer(drivers[0].icbase)]
+        G = []
+        for i in range(n):
+            G.append(self._coarse(U[i], drivers[i].th))
+            U.append(G[i])
+        # the final condition of each stride, and the IC it trained from
+        F = n*[None]
+        Fsrc = n*[None]
+        # the timeslices share the rows of the base, and the correction
+        # is applied to the outputs, the inputs are copied through
+        indim = self.problem.indim
+        sweep = 0
+        while True:
+            sweep += 1
+            # > fine propagation, of the strides whose IC changed
+            indices = [i for i in range(n) if Fsrc[i] is not U[i]]
+            F_ = self._fine(drivers, U, indices)
+            for i in indices:
+                F[i] = F_[i]
+                Fsrc[i] = U[i]
+            # > correction
+            changes = []
+            U_ = [U[0]]
+            for i in range(n):
+                if U_[i] is U[i]:
+                    # the IC is unchanged, its fine propagation is exact
+                    u = F[i]
+                else:
+                    g = self._coarse(U_[i], drivers[i].th)
+                    u = Buffer()
+                    u.X = g.X.clone()
+                    u.X[:,indim:] += F[i].X[:,indim:] - G[i].X[:,indim:]
+                    u.t = g.t
+                    G[i] = g
+                changes.append(_relative_change(u.X, U[i+1].X, indim))
+                U_.append(u)
+            U = U_
+            change = max(changes)
+            self.out.log(f"[Parareal] sweep {sweep}: {len(indices)} strides trained, "
+                         f"relative change of the ICs: max {change:.3e}, {[f'{c:.1e}' for c in changes]}.")
+            if change <= self.rtol or sweep == n:
+                break
+            if sweep == self.maxsweeps:
+                self.out.log(f"[Parareal] Warning: the round did not converge in {self.maxsweeps} sweeps.")
+                break
+        # > the final conditions of the round
+        for i, driver in enumerate(drivers):
+            driver.fcbuffer(U[i+1])
+
+
+
@@ -0,0 +1,469 @@
+from .engine_impl import Engine
+
+import os
+import time
+import traceback
+import multiprocessing
+from copy import deepcopy
+
+from torch import (
+    zeros as torch_zeros,
+    zeros_like as torch_zeros_like,
+    int64 as torch_int64,
+    float64 as torch_float64,
+    get_num_threads as torch_get_num_threads,
+    set_num_threads as torch_set_num_threads,
+)
+
+from ..sampler.buffer import Buffer
+from .._impl.types import timed
+
+
+
+# status of a driver's stride, in shared memory
+_running = 0
+_done = 1
+_failed = 2
+
+
+
+def _relative_change(X, Xref, indim):
+    """
+    The relative change of the outputs of a timeslice.
+    The rows of the timeslices are in the order of the base,
+    and the input columns are the same.
+    """
+    return float((X[:,indim:] - Xref[:,indim:]).norm()/(Xref[:,indim:].norm() + 1e-30))
+
+
+
+class Strides(Engine):
+    """
+    A pipelined engine for time-dependent problems,
+    which trains consecutive strides in parallel,
+    each driver in its own process.
+
+    The strides are trained in rounds.
+    In a round, the drivers train consecutive strides,
+    driver 0 from the correct IC (the final condition
+    of the previous round), and the other drivers from a
+    provisional, "wrong" IC, the IC of driver 0.
+    When a driver completes its stride, it publishes its
+    final condition (fcbuffer) to its successor through shared memory.
+    The successor keeps training: if the new IC differs from the IC
+    it trained from by more than `rtol` (relative, in the 2-norm),
+    it trains the stride again from the new IC, and publishes again.
+    A driver is converged when its predecessor is converged,
+    and it has trained from the predecessor's final condition.
+    So the wall time of a round is that of the
+    training of one stride, plus the retraining caused by
+    the corrections of the ICs, instead of the training of
+    `len(drivers)` strides in sequence, cf. :any:`StridesIC`.
+
+    The modules are placed in shared memory, so that the
+    main process holds the trained modules at the end of the round.
+    Actions of the strides (phases, steps) are called
+    in the driver's process, the final actions of the strides
+    (after the communication) in the main process,
+    in the order of the strides. The state of the actions
+    in the driver's process is sent back to the main process
+    at the end of the stride, cf. :any:`Action`.stride_state().
+    The log of the processes is interleaved.
+
+    .. note::
+        CPU only. Checkpoints are saved and resumed at the
+        granularity of strides.
+
+    Parameters:
+
+        rtol (scalar):
+            Relative change of an IC which triggers
+            another training of the stride. (Default: 1e-3)
+        maxsweeps (integer):
+            Maximum number of trainings of a stride in a round.
+            If it is reached, the stride is accepted,
+            and a warning is logged. (Default: 10)
+        threads (optional integer):
+            Number of intra-op threads of each process.
+            If None, the threads of the main process are divided
+            among the drivers. (Default: None)
+        poll (scalar):
+            Seconds between the checks for a new IC,
+            by a driver that waits for its predecessor. (Default: 0.01)
+
+    """
+
+    def __init__(
+            self,
+            phases = None,
+            drivers = None,
+            handle = None,
+            topline = None,
+            background = None,
+            problem = None,
+            models = None,
+            strategies = None,
+            actions = None,
+            checkpoints = None,
+            file = None,
+            rtol = 1e-3,
+            maxsweeps = 10,
+            threads = None,
+            poll = 0.01,
+    ):
+        super().__init__(
+            phases=phases,
+            drivers=drivers,
+            handle=handle,
+            topline=topline,
+            background=background,
+            problem=problem,
+            models=models,
+            strategies=strategies,
+            actions=actions,
+            checkpoints=checkpoints,
+            file=file,
+        )
+        if maxsweeps < 1:
+            raise ValueError(f"[Strides] maxsweeps must be a positive integer, received {maxsweeps}.")
+        self.rtol = rtol
+        self.maxsweeps = maxsweeps
+        self.threads = threads
+        self.poll = poll
+        # set during init()
+        # number of steps of a stride
+        self.nstep_stride = None
+        # IC of the next stride
+        self.ic = None
+
+
+    @timed("init")
+    def init(self):
+        """
+
+        Called after start() and after config stage.
+
+        """
+        # > init topline, background, models
+        super().init()
+        if not self.problem.with_t:
+            raise ValueError(f"[Strides] The problem is not time dependent, use the TimeIndependent engine.")
+        # > init neural networks
+        # and propagate information down to drivers
+        first = True
+        for driver in self.drivers:
+            driver.init(
+                background=self.background,
+                problem=self.problem,
+                models=self.models,
+                manager=self.out,
+                first=first,
+            )
+            first = False
+            if driver.config.device.type != "cpu":
+                raise ValueError(f"[Strides] Strides only supports the cpu backend, received device {driver.config.device}.")
+            # > the main process sees the training of the driver's process
+            for module in driver.hub.modules:
+                module.share_memory()
+        self._check_forked_checkpoints()
+        self.ic = Buffer(self.drivers[0].icbase)
+        for i in range(1, len(self.drivers)):
+            self.drivers[i].icbase = deepcopy(self.drivers[0].icbase)
+        # > steps per stride
+        th = deepcopy(self.problem.th)
+        th.init(textent=self.problem.th.extent()/self.topline.stride)
+        self.nstep_stride = th.Nstep()
+
+
+    @timed("deinit")
+    def deinit(self):
+        """
+
+        Called at end of start().
+
+        """
+        super().deinit()
+        for driver in self.drivers:
+            driver.deinit()
+        self.topline.deinit(self)
+
+
+    def _schedule(self, ti):
+        """
+        Set the time horizons of the drivers for
+        the round that starts at total timestep ti.
+
+        Returns:
+
+            list of :any:`Driver`: the drivers of the round, in order
+
+        """
+        Nstep = self.problem.th.Nstep()
+        stepsize = self.problem.th.stepsize()
+        out = []
+        tj = ti
+        for driver in self.drivers:
+            if tj >= Nstep:
+                break
+            th = deepcopy(self.problem.th)
+            th.shift(shamt=tj*stepsize)
+            th.init(textent=min(self.nstep_stride, Nstep - tj)*stepsize)
+            driver.th = th
+            out.append(driver)
+            tj += th.Nstep()
+        return out
+
+
+    @timed("critical_section")
+    def critical_section(self, drivers):
+        """
+        Train the strides of a round, each driver in its own process,
+        and wait for the drivers to converge.
+
+        Arguments:
+
+            drivers (list of :any:`Driver`):
+
+        """
+        n = len(drivers)
+        # > shared memory: the final condition of each driver,
+        # its version (the number of times it was published),
+        # the driver's status, and its number of sweeps
+        X = [torch_zeros_like(drivers[0].icbase.X).share_memory_() for _ in range(n)]
+        ts = torch_zeros(n, dtype=torch_float64).share_memory_()
+        version = torch_zeros(n, dtype=torch_int64).share_memory_()
+        status = torch_zeros(n, dtype=torch_int64).share_memory_()
+        sweeps = torch_zeros(n, dtype=torch_int64).share_memory_()
+        ctx = multiprocessing.get_context("fork")
+        locks = [ctx.Lock() for _ in range(n)]
+        shared = (X, ts, version, status, sweeps, locks)
+        self._fork(
+            drivers=drivers,
+            indices=range(n),
+            work=lambda i: self._work(drivers, i, shared),
+            status=status,
+        )
+        # > collect the final conditions,
+        # the slots are not written again, they are handed off
+        for i, driver in enumerate(drivers):
+            driver.fcbuffer.X = X[i]
+            driver.fcbuffer.t = float(ts[i])
+        self.out.log(f"[Strides] Round of {n} strides, sweeps: {[int(s) for s in sweeps]}.")
+
+
+    def _fork(self, drivers, indices, work, status):
+        """
+        Call work(i) for each i in indices, each in a forked process
+        that trains the stride of the i-th driver of the round,
+        and wait for the processes.
+
+        Arguments:
+
+            drivers (list of :any:`Driver`):
+                The drivers of the round.
+            indices (list of integer):
+            work (callable):
+            status (shared integer tensor):
+                The status of each driver of the round.
+
+        """
+        threads0 = torch_get_num_threads()
+        threads = self.threads if self.threads is not None else max(1, threads0 // max(1, len(indices)))
+        stride = self.out.B.stride
+        ti = self.out.B.ti
+        tis = []
+        for driver in drivers:
+            tis.append(ti)
+            ti += driver.th.Nstep()
+        pids = []
+        fds = []
+        bases = []
+        for i in indices:
+            status[i] = _running
+            bases.append(self.out.stride_state(drivers[i]))
+            r, w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                # driver's process
+                os.close(r)
+                code = 0
+                try:
+                    torch_set_num_threads(threads)
+                    self.problem._driver = drivers[i]
+                    self.out.B.stride = stride + i
+                    self.out.B.ti = tis[i]
+                    work(i)
+                    status[i] = _done
+                    # > the actions' state goes back to the main process
+                    self.out.send_stride_state(w, drivers[i])
+                except BaseException:
+                    traceback.print_exc()
+                    status[i] = _failed
+                    code = 1
+                os._exit(code)
+            os.close(w)
+            pids.append(pid)
+            fds.append(r)
+        failed = []
+        for i, pid, r, base in zip(indices, pids, fds, bases):
+            self.out.receive_stride_state(r, drivers[i], base)
+            _, code = os.waitpid(pid, 0)
+            if code != 0:
+                failed.append(i)
+        if len(failed) > 0:
+            raise ValueError(f"[{self.__class__.__name__}] The stride of driver(s) {failed} failed, see the traceback above.")
+
+
+    def _work(self, drivers, i, shared):
+        """
+        The main routine of a driver's process.
+        """
+        X, ts, version, status, sweeps, locks = shared
+        driver = drivers[i]
+        self.out.on_stride(driver=driver)
+        # the version of the predecessor's final condition
+        # that the driver trained from (0: the provisional IC)
+        seen = 0
+        buffer = Buffer()
+        while True:
+            driver.critical_section()
+            sweeps[i] += 1
+            with locks[i]:
+                X[i].copy_(driver.fcbuffer.X)
+                ts[i] = driver.fcbuffer.t
+                version[i] += 1
+            if i == 0:
+                break
+            if int(sweeps[i]) == self.maxsweeps:
+                self.out.log(f"[Strides] Warning: stride {self.out.B.stride} did not converge in {self.maxsweeps} sweeps.")
+                break
+            # > wait for an IC that differs, or for the predecessor to converge
+            retrain = False
+            while not retrain:
+                while int(version[i-1]) == seen and int(status[i-1]) == _running:
+                    time.sleep(self.poll)
+                if int(status[i-1]) == _failed:
+                    raise ValueError(f"[Strides] The predecessor of stride {self.out.B.stride} failed.")
+                with locks[i-1]:
+                    v = int(version[i-1])
+                    buffer.X = X[i-1].clone()
+                    buffer.t = float(ts[i-1])
+                if v == seen:
+                    # the predecessor converged, and the driver trained from its final condition
+                    break
+                seen = v
+                change = _relative_change(buffer.X, driver.icbase.X, self.problem.indim)
+                retrain = change > self.rtol
+            if not retrain:
+                break
+            self.out.log(f"[Strides] stride {self.out.B.stride}: IC changed by {change:.3e}, training again.")
+            driver.icbase(buffer=buffer)
+        self.out.after_critical_section()
+
+
+    @timed("communication")
+    def communication(self, drivers, i):
+        """
+        Propagate the final condition of the i-th driver
+        of the round, to the next driver, or to the next round.
+        """
+        if i+1 < len(drivers):
+            drivers[i+1].icbase(
+                buffer=drivers[i].fcbuffer,
+            )
+        self.ic(drivers[i].fcbuffer)
+
+
+    def state_dict(self, granularity):
+        out = super().state_dict(granularity)
+        out["ic"] = self.ic.state_dict()
+        return out
+
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.ic.load_state_dict(state["ic"])
+
+
+    def start(
+            self,
+            output_absolute_directory = None,
+            reference_absolute_root_directory = None,
+            case = None,
+            code = None,
+            file=None,
+    ):
+        """
+        The backbone routine of the engine.
+
+        Arguments:
+
+            output_absolute_directory (optional string):
+                A path to an output directory, if not specified,
+                the current working directory + "output" is used.
+            reference_absolute_root_directory (optional string):
+                If using references, this must be set to direct to the
+                location where reference data will be located.
+            case (optional :any:`Case`):
+                QueueG Case instance for a case-driven run.
+            code (optional string)
+                code for a QueueG case-driven run.
+            file (string):
+                Pass `__file__` if the run script is isolated from
+                the engine, otherwise `None`.
+
+        """
+        super().start(
+            output_absolute_directory=output_absolute_directory,
+            reference_absolute_root_directory=reference_absolute_root_directory,
+            case=case,
+            code=code,
+            file=file,
+        )
+
+        self.init()
+
+        self.out.after_init()
+
+        self.out.gate_strideloop(driver=self.drivers[0])
+
+        ti, _ = self.load_checkpoint()
+        for driver in self.drivers:
+            if driver.resume is not None:
+                raise ValueError(f"[{self.__class__.__name__}] {self.__class__.__name__} resumes checkpoints at the granularity of strides.")
+        Nstep = self.problem.th.Nstep()
+
+        while ti < Nstep:
+
+            drivers = self._schedule(ti)
+            drivers[0].icbase(buffer=self.ic)
+            for driver in drivers[1:]:
+                # provisional IC
+                driver.icbase(buffer=self.ic)
+
+            self.critical_section(drivers=drivers)
+
+            for i, driver in enumerate(drivers):
+
+                self.out.join_stride(driver=driver)
+
+                self.communication(drivers=drivers, i=i)
+
+                self.out.after_communication()
+
+                ti += driver.th.Nstep()
+
+                self.out.after_stride(ti=ti)
+
+        #} // round
+
+        self.out.after_strideloop()
+
+        self.out.on_end()
+
+        self.deinit()
+
+    #} // start
+
+
+
@@ -169,6 +169,17 @@ class StridesIC(Engine):
         return ti + progress
 
 
+    def state_dict(self, granularity):
+        out = super().state_dict(granularity)
+        out["nretired"] = self.nretired
+        return out
+
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.nretired = state["nretired"]
+
+
     #####################################
 
 
@@ -240,12 +251,12 @@ class StridesIC(Engine):
 
         self.out.gate_strideloop(driver=self.drivers[0])
 
-        ti = 0
+        ti, _ = self.load_checkpoint()
         Nstep = self.problem.th.Nstep()
 
         while ti < Nstep:
 
-            self.out.on_stride(driver=self.drivers[0])
+            self.out.on_stride(driver=self.drivers[self.nretired])
 
             self.critical_section()
 
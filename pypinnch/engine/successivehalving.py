@@ -0,0 +1,221 @@
+from .sweep import Sweep
+
+import os
+from copy import deepcopy
+
+from torch import (
+    save as torch_save,
+)
+
+
+
+class SuccessiveHalving(Sweep):
+    """
+    A multi-fidelity search over the cases of a parameter grid,
+    by successive halving [arXiv:1502.07943]: all of the cases
+    are run with a small budget, and the best 1/eta of them
+    are promoted to a budget eta times as large, and so on,
+    until the last rung, so most of the compute
+    is spent on the promising cases.
+
+    The budget is either the number of iterations of each phase
+    (resource: "iterations", the `max_iterations` of the phases' :any:`Kit` s),
+    or the number of steps of the run (resource: "steps", the
+    `early_nstep` of the :any:`TopLine`, for time-dependent problems).
+    The budget of rung k is ``min_budget * eta**k``.
+    A promoted case is warm-started from the weights of its
+    previous rung: in iterations, it continues with the difference
+    of the budgets, in steps, it runs the steps of its budget again.
+    The cases are ranked by `metric`, the final loss, or
+    a validation error (cf. :any:`Sweep`), the smaller the better.
+    The cases run in the pool of :any:`Sweep`, the output of a case
+    in a rung is in ``rung<k>/case<i>`` under the output root.
+
+    Hyperband is a loop over brackets of successive halving,
+    with different min_budget and number of rungs.
+
+    Parameters:
+
+        factory (callable):
+            cf. :any:`Sweep`
+        grid (dict: string -> list, or list of dict):
+            cf. :any:`Sweep`
+        min_budget (integer):
+            The budget of the first rung.
+        eta (integer):
+            The reduction factor of a rung. (Default: 3)
+        rungs (optional integer):
+            The number of rungs. If None, rungs are added
+            until one case is left. (Default: None)
+        resource (string):
+            "iterations" or "steps". (Default: "iterations")
+        metric (string):
+            "loss", or the label of a validation error, e.g., "uval".
+            (Default: "loss")
+        nprocs, threads, seed, reference_absolute_root_directory, file:
+            cf. :any:`Sweep`
+
+    """
+
+    def __init__(
+            self,
+            factory,
+            grid,
+            min_budget,
+            eta = 3,
+            rungs = None,
+            resource = "iterations",
+            metric = "loss",
+            nprocs = 2,
+            threads = None,
+            seed = 0,
+            reference_absolute_root_directory = None,
+            file = None,
+    ):
+        super().__init__(
+            factory=factory,
+            grid=grid,
+            nprocs=nprocs,
+            threads=threads,
+            seed=seed,
+            reference_absolute_root_directory=reference_absolute_root_directory,
+            file=file,
+        )
+        if min_budget < 1:
+            raise ValueError(f"[SuccessiveHalving] min_budget must be a positive integer, received {min_budget}.")
+        if eta < 2:
+            raise ValueError(f"[SuccessiveHalving] eta must be an integer ≥ 2, received {eta}.")
+        if resource not in ["iterations", "steps"]:
+            raise ValueError(f"[SuccessiveHalving] Unrecognized resource {resource}, use iterations or steps.")
+        if rungs is None:
+            rungs = 1
+            n = len(self.cases)
+            while n > 1:
+                n = max(1, n // eta)
+                rungs += 1
+        if rungs < 1:
+            raise ValueError(f"[SuccessiveHalving] rungs must be a positive integer, received {rungs}.")
+        self.min_budget = min_budget
+        self.eta = eta
+        self.rungs = rungs
+        self.resource = resource
+        self.metric = metric
+        # the present rung, inherited by the workers of the pool
+        self.rung = 0
+        # the output root of the present search
+        self.root = None
+
+
+    def budget(self, k):
+        """
+        The budget of rung k.
+        """
+        return self.min_budget*self.eta**k
+
+
+    def _row(self, i):
+        row = super()._row(i)
+        row["rung"] = self.rung
+        row["budget"] = self.budget(self.rung)
+        return row
+
+
+    def _directory(self, root, i):
+        return os.path.join(root, f"rung{self.rung}", f"case{i:03d}")
+
+
+    def _weights(self, root, k, i):
+        return os.path.join(root, f"rung{k}", f"case{i:03d}", "weights.pth")
+
+
+    def _configure(self, engine, i, directory):
+        k = self.rung
+        if self.resource == "iterations":
+            n = self.budget(k) - (self.budget(k-1) if k > 0 else 0)
+            for driver in engine.drivers:
+                for plb in driver.phases:
+                    phase = driver.phases[plb]
+                    if phase.strategies.using('optimizer'):
+                        optimizer = phase.strategies.optimizer
+                        kit = deepcopy(optimizer.init_kit)
+                        kit.max_iterations = n
+                        optimizer.init_kit = kit
+                        optimizer._reset_kit()
+        else:
+            engine.topline.early_nstep = self.budget(k)
+            engine.topline.early_nstride = None
+        if k > 0:
+            # > warm start
+            engine.set_checkpoint_loadpath(
+                filename=self._weights(self.root, k-1, i),
+                weights_only=True,
+            )
+
+
+    def _finish(self, engine, i, directory):
+        # > the weights, in the format of a TrainingCheckpoint
+        torch_save(
+            {
+                "drivers": {
+                    key: {
+                        "modules": [module.state_dict() for module in engine.drivers.dict[key].hub.modules],
+                    } for key in engine.drivers.key
+                },
+            },
+            os.path.join(directory, "weights.pth"),
+        )
+
+
+    def _score(self, row):
+        x = row.get(self.metric) if row["status"] == "ok" else None
+        return float("inf") if x is None else x
+
+
+    def start(self, output_absolute_directory=None):
+        """
+        Run the search.
+
+        Arguments:
+
+            output_absolute_directory (optional string):
+                The output root, if not specified,
+                the current working directory + "output" is used.
+
+        Returns:
+
+            list of dict: the rows of the summary, of every case
+            in every rung, the best case of the last rung first
+
+        """
+        self.root = os.path.join(os.getcwd(), "output") if output_absolute_directory is None else output_absolute_directory
+        survivors = list(range(len(self.cases)))
+        history = []
+        try:
+            for k in range(self.rungs):
+                self.rung = k
+                rows = self._map(survivors, self.root)
+                ranked = sorted(zip(survivors, rows), key=lambda pair: self._score(pair[1]))
+                self.log(f"[SuccessiveHalving] rung {k}, budget {self.budget(k)}: "
+                         f"{len(survivors)} cases, best {ranked[0][1]['case']} "
+                         f"({self.metric}: {ranked[0][1].get(self.metric)}).")
+                history = [row for _, row in ranked] + history
+                if k+1 == self.rungs:
+                    break
+                survivors = sorted(i for i, _ in ranked[:max(1, len(survivors)//self.eta)])
+        finally:
+            self.rung = 0
+        self._report(history, self.root)
+        return history
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"min_budget: {self.min_budget}\n"
+        out += f"eta: {self.eta}\n"
+        out += f"rungs: {self.rungs}\n"
+        out += f"resource: {self.resource}\n"
+        out += f"metric: {self.metric}\n"
+        return out
+
+
+
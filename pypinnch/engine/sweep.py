@@ -0,0 +1,366 @@
+
+
+import os
+import random
+import itertools
+import traceback
+import multiprocessing
+
+from numpy import (
+    random as np_random,
+)
+from torch import (
+    manual_seed as torch_manual_seed,
+    set_num_threads as torch_set_num_threads,
+    get_num_threads as torch_get_num_threads,
+)
+
+from ..action.action_impl.action import Probe
+from ..action.result import Result
+
+from mv1fw import (
+    Logger,
+)
+
+
+
+# the sweep run by the workers of the pool,
+# inherited by fork, so that the factory is not pickled
+_sweep = None
+
+
+
+def _init_worker(threads):
+    torch_set_num_threads(threads)
+
+
+
+def _work(args):
+    i, root = args
+    try:
+        return i, _sweep.run_case(i, output_absolute_directory=root)
+    except BaseException as e:
+        traceback.print_exc()
+        row = _sweep._row(i)
+        row["status"] = f"failed: {e.__class__.__name__}"
+        return i, row
+
+
+
+class _Summary(Probe):
+    """
+    Records the total loss of the latest iteration.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loss = None
+
+
+    def after_iter(self, B, BB):
+        self.loss = float(sum(BB.ic_losses) + sum(BB.losses))
+
+
+    def state_dict(self):
+        return {
+            "loss": self.loss,
+        }
+
+
+    def load_state_dict(self, state):
+        self.loss = state["loss"]
+
+
+    def join_stride_state(self, state, base):
+        # the latest loss, not a counter
+        self.load_state_dict(state)
+
+
+
+class Sweep:
+    """
+    Run a sweep of cases of an engine,
+    concurrently, in a pool of worker processes.
+
+    The cases are the points of a parameter grid, and the engine
+    of a case is made by the factory, called in the worker process
+    with the parameters of the case, for example::
+
+        def factory(width, lr):
+            ...
+            return TimeIndependent(
+                phases = ...,
+                models = FNN(width=width, depth=4),
+                ...
+            )
+
+        sweep = Sweep(
+            factory = factory,
+            grid = {"width": [32, 64], "lr": [1e-3, 1e-4]},
+            nprocs = 4,
+        )
+        rows = sweep.start()
+
+    The workers are forked from the main process, so they start
+    with everything it has imported, and each worker runs cases
+    until the grid is exhausted. Each case has its own
+    output directory ``case<i>`` under the output root,
+    and its own random seed, `seed` + i, which seeds the factory
+    and replaces the seed of the engine's :any:`Background`,
+    so a case can be reproduced on its own, in the main process, by run_case().
+    At the end, a summary table of the cases, with the final loss
+    and the final validation errors (if a :any:`Result` action
+    validates a solution against a reference), is logged
+    and written to ``sweep.txt`` in the output root.
+
+    Parameters:
+
+        factory (callable):
+            Called with the parameters of a case (as keyword arguments),
+            returns an :any:`Engine`.
+        grid (dict: string -> list, or list of dict):
+            The parameter grid, its cases are the cartesian product
+            of the lists, or a list of the cases.
+        nprocs (integer):
+            Number of worker processes. (Default: 2)
+        threads (optional integer):
+            Number of intra-op threads of each worker.
+            If None, the threads of the main process are divided
+            among the workers. (Default: None)
+        seed (integer):
+            Seed of the zeroth case. (Default: 0)
+        reference_absolute_root_directory (optional string):
+            Passed to the engine, cf. :any:`Engine`.start().
+        file (optional string):
+            Passed to the engine, cf. :any:`Engine`.start().
+
+    """
+
+    def __init__(
+            self,
+            factory,
+            grid,
+            nprocs = 2,
+            threads = None,
+            seed = 0,
+            reference_absolute_root_directory = None,
+            file = None,
+    ):
+        if nprocs < 1:
+            raise ValueError(f"[Sweep] nprocs must be a positive integer, received {nprocs}.")
+        self.factory = factory
+        if isinstance(grid, dict):
+            names = list(grid.keys())
+            self.cases = [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+        else:
+            self.cases = [dict(case) for case in grid]
+        if len(self.cases) == 0:
+            raise ValueError(f"[Sweep] The grid has no cases.")
+        self.nprocs = nprocs
+        self.threads = threads
+        self.seed = seed
+        self.reference_absolute_root_directory = reference_absolute_root_directory
+        self.file = file
+        self.log = Logger()
+
+
+    def _row(self, i):
+        row = {"case": f"case{i:03d}"}
+        row.update(self.cases[i])
+        row["loss"] = None
+        row["status"] = "ok"
+        return row
+
+
+    def run_case(self, i, output_absolute_directory=None):
+        """
+        Run the i-th case in the present process.
+
+        Arguments:
+
+            i (integer):
+            output_absolute_directory (optional string):
+                The output root, if not specified,
+                the current working directory + "output" is used.
+
+        Returns:
+
+            dict: the row of the case in the summary
+
+        """
+        root = os.path.join(os.getcwd(), "output") if output_absolute_directory is None else output_absolute_directory
+        row = self._row(i)
+        directory = self._directory(root, i)
+        # > seed, before the engine is made
+        seed = self.seed + i
+        random.seed(seed)
+        np_random.seed(seed)
+        torch_manual_seed(seed)
+        engine = self.factory(**self.cases[i])
+        summary = _Summary()
+        engine.probes.append(summary)
+        self._configure(engine, i, directory)
+        # > the engine seeds again when it starts
+        engine.background.seed = seed
+        engine.start(
+            output_absolute_directory=directory,
+            reference_absolute_root_directory=self.reference_absolute_root_directory,
+            file=self.file,
+        )
+        self._finish(engine, i, directory)
+        row["loss"] = summary.loss
+        row.update(self._validation(engine))
+        return row
+
+
+    def _directory(self, root, i):
+        """
+        The output directory of the i-th case.
+        """
+        return os.path.join(root, f"case{i:03d}")
+
+
+    def _configure(self, engine, i, directory):
+        """
+        Called before the engine of the i-th case starts.
+        """
+        pass
+
+
+    def _finish(self, engine, i, directory):
+        """
+        Called after the engine of the i-th case has run.
+        """
+        pass
+
+
+    def _validation(self, engine):
+        """
+        The final validation errors of the :any:`Result` actions.
+        """
+        actions = list(engine.actions)
+        for driver in engine.drivers:
+            actions += driver.actions
+            for plb in driver.phases:
+                actions += driver.phases[plb].actions
+        out = {}
+        for action in actions:
+            if isinstance(action, Result):
+                for fslabels in action.validation_ledgers:
+                    ledger = action.validation_ledgers[fslabels]
+                    X = ledger.retrieve()
+                    if X.shape[0] == 0:
+                        continue
+                    for j, lb in enumerate(ledger.labels.split(', ')):
+                        if lb != 't':
+                            out[lb] = float(X[-1,j])
+        return out
+
+
+    def start(self, output_absolute_directory=None):
+        """
+        Run the cases in the pool, and collect the summary.
+
+        Arguments:
+
+            output_absolute_directory (optional string):
+                The output root, if not specified,
+                the current working directory + "output" is used.
+
+        Returns:
+
+            list of dict: the rows of the summary, in the order of the cases
+
+        """
+        root = os.path.join(os.getcwd(), "output") if output_absolute_directory is None else output_absolute_directory
+        rows = self._map(range(len(self.cases)), root)
+        self._report(rows, root)
+        return rows
+
+
+    def _map(self, indices, root):
+        """
+        Run the cases in indices in the pool.
+
+        Returns:
+
+            list of dict: the rows of the cases, in the order of indices
+
+        """
+        global _sweep
+        os.makedirs(root, exist_ok=True)
+        indices = list(indices)
+        nprocs = min(self.nprocs, len(indices))
+        threads = self.threads if self.threads is not None else max(1, torch_get_num_threads() // nprocs)
+        _sweep = self
+        ctx = multiprocessing.get_context("fork")
+        rows = {}
+        try:
+            with ctx.Pool(
+                processes=nprocs,
+                initializer=_init_worker,
+                initargs=(threads,),
+            ) as pool:
+                for i, row in pool.imap_unordered(_work, [(i, root) for i in indices]):
+                    rows[i] = row
+                    self.log(f"[{self.__class__.__name__}] {row['case']}: {row['status']}, loss: {row['loss']}")
+        finally:
+            _sweep = None
+        return [rows[i] for i in indices]
+
+
+    def _report(self, rows, root):
+        """
+        Log the summary table, and write it to ``sweep.txt``.
+        """
+        table = self.summary(rows)
+        self.log(table)
+        with open(os.path.join(root, "sweep.txt"), 'w') as f:
+            f.write(table)
+
+
+    @staticmethod
+    def summary(rows):
+        """
+        Format the rows of a sweep as a table.
+
+        Arguments:
+
+            rows (list of dict):
+
+        Returns:
+
+            string
+
+        """
+        columns = []
+        for row in rows:
+            for lb in row:
+                if lb not in columns:
+                    columns.append(lb)
+        # > status last
+        columns.remove("status")
+        columns.append("status")
+
+        def fmt(x):
+            if x is None:
+                return "-"
+            if isinstance(x, float):
+                return f"{x:.4e}"
+            return str(x)
+
+        cells = [columns] + [[fmt(row.get(lb)) for lb in columns] for row in rows]
+        widths = [max(len(line[j]) for line in cells) for j in range(len(columns))]
+        lines = ["  ".join(c.ljust(w) for c, w in zip(line, widths)).rstrip() for line in cells]
+        return "\n".join(lines) + "\n"
+
+
+    def __str__(self):
+        out = f"{self.__class__.__name__}: {len(self.cases)} cases\n"
+        out += f"nprocs: {self.nprocs}\n"
+        out += f"threads: {self.threads}\n"
+        out += f"seed: {self.seed}\n"
+        return out
+
+
+
@@ -1,16 +1,39 @@
+from .engine_impl import Engine
 
+import os
+import traceback
 
+from torch import (
+    cat as torch_cat,
+    get_num_threads as torch_get_num_threads,
+    set_num_threads as torch_set_num_threads,
+)
 
+from .._impl.constraint import Constraint
+from ..source.interface import Interface
+from ..action.action_impl.action import Probe
+from .._impl.types import timed
 
 
 
 
+class _Exchange(Probe):
+    """
+    Publishes the interface values of a driver
+    every `every` iterations, in the driver's process,
+    for the asynchronous exchange.
+    """
 
+    def __init__(self, engine, key, every):
+        super().__init__()
+        self.engine = engine
+        self.key = key
+        self.every = every
 
 
-from .engine_impl import Engine
-
-from .._impl.types import timed
+    def after_iter(self, B, BB):
+        if (BB.iteration+1) % self.every == 0:
+            self.engine._publish(self.key)
 
 
 
@@ -20,9 +43,51 @@ class TimeIndependent(Engine):
     A time-independent engine
     that supports domain decomposition parallelism.
 
+    With one driver, the driver trains on the whole domain.
+    With multiple drivers (XPINN-style domain decomposition),
+    each driver has its own subdomain (cf. :any:`Driver`)
+    and its own modules, and it trains in its own process.
+    Its sample sets are restricted to its subdomain.
+    Neighboring drivers are coupled by :any:`Interface` s:
+    the engine adds a constraint to each driver
+    of an interface, whose residual is the difference of the
+    driver's values (continuity and flux) and the values
+    of its neighbor, at the points of the interface.
+    The values are exchanged through shared memory:
+
+        - sync: the drivers train in `rounds` strides,
+            and the values are exchanged between the strides.
+        - async: the drivers train `rounds` times without waiting
+            for each other, and each driver publishes its values
+            every `every` iterations, and after each training.
+            A driver trains on the latest values of its neighbors,
+            which may be stale, or partially updated.
+
+    The modules are placed in shared memory, so that the
+    main process holds the trained modules after each stride,
+    and the state of the actions is sent back to the main process.
+
+    .. note::
+        Domain decomposition supports the cpu backend only,
+        and checkpoints are saved and resumed at the granularity of strides.
+
+    Parameters:
+
+        interfaces (optional list of :any:`Interface`):
+            The interfaces between the subdomains of the drivers.
+        exchange (string):
+            "sync" or "async". (Default: "sync")
+        rounds (integer):
+            Number of trainings of each driver. (Default: 1)
+        every (integer):
+            async: Number of iterations between the publications
+            of the values of a driver. (Default: 100)
+        threads (optional integer):
+            Number of intra-op threads of each process.
+            If None, the threads of the main process are divided
+            among the drivers. (Default: None)
+
     """
-    # Domain decomposition is planned but not fully
-    # implemented yet ITCINOOD.
 
     def __init__(
             self,
@@ -37,6 +102,11 @@ class TimeIndependent(Engine):
             actions = None,
             checkpoints = None,
             file = None,
+            interfaces = None,
+            exchange = "sync",
+            rounds = 1,
+            every = 100,
+            threads = None,
     ):
         super().__init__(
             phases=phases,
@@ -58,6 +128,29 @@ class TimeIndependent(Engine):
                 for name in names:
                     if phase.strategies.using(name):
                         raise ValueError(f"Cannot train {self.__class__.__name__} engine with {name} strategy.")
+        self.interfaces = [] if interfaces is None else interfaces
+        if exchange not in ["sync", "async"]:
+            raise ValueError(f"[TimeIndependent] Unrecognized exchange {exchange}, use sync or async.")
+        if rounds < 1:
+            raise ValueError(f"[TimeIndependent] rounds must be a positive integer, received {rounds}.")
+        if len(self.drivers) > 1:
+            for key in self.drivers.key:
+                if self.drivers.dict[key].subdomain is None:
+                    raise ValueError(f"[TimeIndependent] Driver {key} has no subdomain, required for domain decomposition.")
+            for interface in self.interfaces:
+                for key in interface.drivers:
+                    if key not in self.drivers.dict:
+                        raise ValueError(f"[TimeIndependent] Interface {interface} refers to an unknown driver {key}.")
+        elif len(self.interfaces) > 0:
+            raise ValueError(f"[TimeIndependent] Interfaces require multiple drivers.")
+        self.exchange = exchange
+        self.rounds = rounds
+        self.every = every
+        self.threads = threads
+        # set during init(), for domain decomposition:
+        # values[k][j] are the values of the j-th driver
+        # of the k-th interface, at the interface points
+        self.values = None
 
 
     @timed("init")
@@ -67,6 +160,13 @@ class TimeIndependent(Engine):
         Called after start() and after config stage.
 
         """
+        # > the interface constraints, one for each driver of an interface,
+        # their residuals are set when the interfaces are sampled
+        for k, interface in enumerate(self.interfaces):
+            for key in interface.drivers:
+                self.problem.constraints[self._label(k, key)] = Constraint(
+                    source=interface,
+                )
         super().init()
         # > init neural networks
         # and propagate information down to drivers
@@ -80,6 +180,95 @@ class TimeIndependent(Engine):
                 first=first,
             )
             first = False
+        if len(self.drivers) > 1:
+            self._init_decomposition()
+
+
+    def _label(self, k, key):
+        return f"interface{k}_{key}"
+
+
+    def _init_decomposition(self):
+        """
+        Sample the interfaces, set the shared values,
+        and activate the interface constraints of each driver.
+        """
+        self._check_forked_checkpoints()
+        self.values = []
+        for k, interface in enumerate(self.interfaces):
+            drivers = [self.drivers.dict[key] for key in interface.drivers]
+            final = drivers[0].phases[drivers[0].final_plb]
+            interface.draw(
+                SPL=final.SPL,
+                Nmin=max(driver.phases[plb].batchsize for driver in drivers for plb in driver.phases),
+            )
+            self.values.append([self._evaluate(driver, interface).share_memory_() for driver in drivers])
+            for j, key in enumerate(interface.drivers):
+                # the residual of a driver reads its neighbor's values
+                self.problem.constraints[self._label(k, key)].residual = interface.residual(
+                    values=self.values[k][1-j],
+                )
+        for key in self.drivers.key:
+            driver = self.drivers.dict[key]
+            if driver.config.device.type != "cpu":
+                raise ValueError(f"[TimeIndependent] Domain decomposition only supports the cpu backend, received device {driver.config.device}.")
+            # > the main process sees the training of the driver's process
+            for module in driver.hub.modules:
+                module.share_memory()
+            # > the constraints whose sources miss the subdomain
+            if not driver.subdomain.initialized:
+                driver.subdomain.init(
+                    dtype=self.background.dtype(),
+                    parameters=self.problem.p,
+                )
+            bb = driver.subdomain.bounding_box()
+            missed = []
+            for lb in self.problem.constraints:
+                source = self.problem.constraints[lb].source
+                if source is None or isinstance(source, Interface):
+                    continue
+                try:
+                    bb_ = source.bounding_box()
+                except NotImplementedError:
+                    continue
+                if not bb.intersects(bb_):
+                    missed.append(lb)
+            if len(missed) > 0:
+                self.out.log(f"[TimeIndependent] Driver {key}: constraint(s) {missed} miss the subdomain, deactivated.")
+            for plb in driver.phases:
+                phase = driver.phases[plb]
+                for lb in missed:
+                    phase.active_constraint[lb] = False
+                for k, interface in enumerate(self.interfaces):
+                    for key_ in interface.drivers:
+                        phase.active_constraint[self._label(k, key_)] = (key_ == key)
+
+
+    def _evaluate(self, driver, interface):
+        """
+        The values of the driver at the points of the interface.
+        """
+        hub = driver.hub
+        module = hub.modules[0]
+        p = next(module.parameters())
+        hub._x = interface.X.to(dtype=p.dtype, device=p.device).clone().requires_grad_(True)
+        hub._u = module.forward(hub._x)
+        Q = self.problem.get(interface.all_labels(), hub)
+        self.problem.clear_gradients()
+        if isinstance(Q, tuple):
+            Q = torch_cat(Q, dim=1)
+        return Q.detach().clone()
+
+
+    def _publish(self, key):
+        """
+        Write the values of a driver at its interfaces to shared memory.
+        """
+        driver = self.drivers.dict[key]
+        for k, interface in enumerate(self.interfaces):
+            if key in interface.drivers:
+                j = interface.drivers.index(key)
+                self.values[k][j].copy_(self._evaluate(driver, interface))
 
 
     @timed("deinit")
@@ -98,21 +287,72 @@ class TimeIndependent(Engine):
     @timed("critical_section")
     def critical_section(self):
         """
-
+        Train the drivers. With domain decomposition,
+        each driver trains in its own process.
         """
-        # todo for domain decomposition, this loop is parallelized
-        for driver in self.drivers:
-            driver.critical_section()
+        if len(self.drivers) == 1:
+            self.drivers[0].critical_section()
+            return
+        nrounds = self.rounds if self.exchange == "async" else 1
+        threads0 = torch_get_num_threads()
+        threads = self.threads if self.threads is not None else max(1, threads0 // len(self.drivers))
+        stride = self.out.B.stride
+        pids = []
+        fds = []
+        bases = []
+        for i, key in enumerate(self.drivers.key):
+            driver = self.drivers.dict[key]
+            bases.append(self.out.stride_state(driver))
+            r, w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                # driver's process
+                os.close(r)
+                code = 0
+                try:
+                    torch_set_num_threads(threads)
+                    self.problem._driver = driver
+                    self.out.B.stride = stride + i
+                    self.out.on_stride(driver=driver)
+                    if self.exchange == "async":
+                        exchange = _Exchange(engine=self, key=key, every=self.every)
+                        driver.probes.append(exchange)
+                    for _ in range(nrounds):
+                        driver.critical_section()
+                        if self.exchange == "async":
+                            self._publish(key)
+                    self.out.after_critical_section()
+                    if self.exchange == "async":
+                        driver.probes.remove(exchange)
+                    # > the actions' state goes back to the main process
+                    self.out.send_stride_state(w, driver)
+                except BaseException:
+                    traceback.print_exc()
+                    code = 1
+                os._exit(code)
+            os.close(w)
+            pids.append(pid)
+            fds.append(r)
+        failed = []
+        for key, pid, r, base in zip(self.drivers.key, pids, fds, bases):
+            self.out.receive_stride_state(r, self.drivers.dict[key], base)
+            _, code = os.waitpid(pid, 0)
+            if code != 0:
+                failed.append(key)
+        if len(failed) > 0:
+            raise ValueError(f"[TimeIndependent] Driver(s) {failed} failed, see the traceback above.")
 
 
     @timed("communication")
     def communication(self):
         """
-        Propagate the BCs to the neighboring drivers.
+        Propagate the BCs to the neighboring drivers:
+        with the synchronous exchange, publish the values
+        of the drivers at the interfaces.
         """
-        # todo for domain decomposition, asynchronously trained drivers communicate.
-        #  either a lot of work or a lot of assumptions are required
-        pass
+        if len(self.drivers) > 1 and self.exchange == "sync":
+            for key in self.drivers.key:
+                self._publish(key)
 
 
     #####################################
@@ -160,27 +400,50 @@ class TimeIndependent(Engine):
 
         self.out.gate_strideloop(driver=self.drivers[0])
 
-        # todo strides now correspond to breaks for IPC (communication).
-        #  whenever there is one driver, there is no need to have more than one stride.
-        if len(self.drivers) > 1:
-            raise ValueError(f"Multiple drivers not supported yet.")
+        # Strides correspond to breaks for IPC (communication).
+        # Whenever there is one driver, there is no need to have more than one stride.
+        if len(self.drivers) > 1 and self.exchange == "sync":
+            nstrides = self.rounds
         else:
-            # todo get nstrides from Topline
             nstrides = 1
 
-        for ti in range(nstrides):
+        _, nstride = self.load_checkpoint()
+        if len(self.drivers) > 1:
+            for driver in self.drivers:
+                if driver.resume is not None:
+                    raise ValueError(f"[TimeIndependent] Domain decomposition resumes checkpoints at the granularity of strides.")
+            # (the stride counter counts the strides of all drivers)
+            nstride = nstride // len(self.drivers)
+
+        for ti in range(nstride, nstrides):
+
+            if len(self.drivers) == 1:
+
+                self.out.on_stride(driver=self.drivers[0])
+
+                self.critical_section()
+
+                self.out.after_critical_section()
+
+                self.communication()
+
+                self.out.after_communication()
+
+                self.out.after_stride(ti=ti)
+
+            else:
 
-            self.out.on_stride(driver=self.drivers[0])
+                self.critical_section()
 
-            self.critical_section()
+                self.communication()
 
-            self.out.after_critical_section()
+                for driver in self.drivers:
 
-            self.communication()
+                    self.out.join_stride(driver=driver)
 
-            self.out.after_communication()
+                    self.out.after_communication()
 
-            self.out.after_stride(ti=ti)
+                    self.out.after_stride(ti=ti)
 
         #} // stride
 
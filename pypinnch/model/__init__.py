@@ -1,6 +1,7 @@
 __all__ = [
     "module",
     "Model",
+    "OutputTransform",
     "CNN",
     "FNN",
     "WTPNN",
@@ -8,6 +9,7 @@ __all__ = [
 
 from . import module
 from .model_impl.model import Model
+from .model_impl.transform import OutputTransform
 
 from .cnn import CNN
 from .fnn import FNN
@@ -65,8 +65,8 @@ class CNN(Model):
         self._Module = Module_CNN
 
 
-    def init(self):
-        super().init()
+    def init(self, parameters=None):
+        super().init(parameters=parameters)
         indim_t = self.indim+1 if self.with_t else self.indim
         outdim = len(self.lbl) - self.indim
         self.layers = [indim_t] + self.hidden_layer_sizes + [outdim]
@@ -39,6 +39,11 @@ class FNN(Model):
             Labels can be passed in here or during config stage.
             If there is one model whose labels are the problem
             labels, this will be set automatically.
+        encoding (optional :any:`Encoding`):
+            Encoding of the inputs. (Default: None)
+        transform (optional :any:`OutputTransform`):
+            Transform of the outputs, applied after exp_final (if set).
+            (Default: None)
 
     """
 
@@ -51,10 +56,12 @@ class FNN(Model):
             exp_final=False,
             labels=None,
             encoding=None,
+            transform=None,
     ):
         super().__init__(
             labels=labels,
             encoding=encoding,
+            transform=transform,
         )
         self.hidden_layer_sizes = hidden_layer_sizes
         self.layers = None
@@ -65,8 +72,8 @@ class FNN(Model):
         self._Module = Module_FNN
 
 
-    def init(self):
-        super().init()
+    def init(self, parameters=None):
+        super().init(parameters=parameters)
         layers_indim = self.get_layers_indim()
         outdim = len(self.lbl) - self.indim
         self.layers = [layers_indim] + self.hidden_layer_sizes + [outdim]
@@ -1,6 +1,8 @@
 __all__ = [
     "Model",
+    "OutputTransform",
 ]
 
 from .model import Model
+from .transform import OutputTransform
 
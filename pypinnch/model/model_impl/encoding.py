@@ -12,7 +12,7 @@ class Encoding:
     def __init__(self):
         self._indim = None
 
-    def init(self, indim):
+    def init(self, indim, lbl=None, parameters=None):
         self._indim = indim
 
     def indim(self):
@@ -33,7 +33,7 @@ class BasicEncoding(Encoding):
     def __init__(self):
         super().__init__()
 
-    def init(self, indim):
+    def init(self, indim, lbl=None, parameters=None):
         super().init(indim=indim)
 
     def outdim(self):
@@ -55,7 +55,7 @@ class PositionalEncoding(Encoding):
         super().__init__()
         self.m = m
 
-    def init(self, indim):
+    def init(self, indim, lbl=None, parameters=None):
         super().init(indim=indim)
 
     def outdim(self):
@@ -98,7 +98,7 @@ class GaussianEncoding(Encoding):
         self.m = m
         self.b = b
 
-    def init(self, indim):
+    def init(self, indim, lbl=None, parameters=None):
         super().init(indim=indim)
         if self.b is not None:
             # nothing to do
@@ -111,3 +111,66 @@ class GaussianEncoding(Encoding):
         return 2*self.m
 
 
+
+class PeriodicEncoding(Encoding):
+    """
+    Periodic encoding, which enforces periodicity exactly.
+    Each periodic input x with period L is mapped to the harmonics
+
+        (cos 2 pi k (x-a)/L, sin 2 pi k (x-a)/L), k = 1, ..., m,
+
+    where the range of x is [a, a+L], and the other inputs are
+    not changed. The periods are the extents of the ranges
+    set in the :any:`Parameters` of the :any:`Problem`.
+    A :any:`Periodic` constraint whose axis is encoded is
+    dropped from the phases, which saves its sample set,
+    and a second forward pass every iteration.
+
+    Parameters:
+
+        axes (list of string):
+            Labels of the periodic inputs.
+        m (integer):
+            Number of harmonics. (Default: 1)
+
+    """
+    def __init__(
+            self,
+            axes,
+            m = 1,
+    ):
+        super().__init__()
+        if m < 1:
+            raise ValueError(f"[PeriodicEncoding] m must be a positive integer, received {m}.")
+        self.axes = axes if isinstance(axes, (list, tuple)) else [axes]
+        self.m = m
+        # memoized during init()
+        self.idx = None
+        self.origins = None
+        self.periods = None
+
+    def init(self, indim, lbl=None, parameters=None):
+        super().init(indim=indim)
+        if lbl is None or parameters is None:
+            raise ValueError(f"[PeriodicEncoding] Require the labels and the parameters of the problem.")
+        self.idx = []
+        self.origins = []
+        self.periods = []
+        for axis in self.axes:
+            if axis not in lbl[:indim]:
+                raise ValueError(f"[PeriodicEncoding] Axis {axis} is not an input {lbl[:indim]}.")
+            if axis not in parameters.ranges or parameters.ranges[axis] is None:
+                raise ValueError(f"[PeriodicEncoding] Require a range for axis {axis} in the problem parameters.")
+            a, b = parameters.range(axis)
+            if not b > a:
+                raise ValueError(f"[PeriodicEncoding] Invalid range ({a}, {b}) for axis {axis}.")
+            self.idx.append(lbl.index(axis))
+            self.origins.append(a)
+            self.periods.append(b - a)
+
+    def outdim(self):
+        return self._indim + (2*self.m - 1)*len(self.axes)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(axes: {self.axes}, m: {self.m})"
+
@@ -29,6 +29,11 @@ class Model:
             If there is one model whose labels are the problem
             labels, this will be set automatically.
             For format description, see :any:`Problem`.
+        encoding (optional :any:`Encoding`):
+            Encoding of the inputs. (Default: None)
+        transform (optional :any:`OutputTransform`):
+            Transform of the outputs, enforcing
+            boundary or initial conditions exactly. (Default: None)
 
     """
 
@@ -36,9 +41,11 @@ class Model:
             self,
             labels = None,
             encoding = None,
+            transform = None,
     ):
         self.labels = labels
         self.encoding = encoding
+        self.transform = transform
         self.lbl = None
         self.indim = None
         self.with_t = None
@@ -47,9 +54,14 @@ class Model:
         self._Module = None
 
 
-    def init(self):
+    def init(self, parameters=None):
         """
         Called by engine after config stage.
+
+        Arguments:
+
+            parameters (optional :any:`Parameters`):
+                The parameters of the problem.
         """
         if self.labels is not None:
             lbl, indim, with_t = parse_labels(self.labels)
@@ -59,7 +71,9 @@ class Model:
         else:
             raise ValueError(f"No labels given for model.")
         if self.encoding is not None:
-            self.encoding.init(self.indim)
+            self.encoding.init(self.indim, lbl=self.lbl, parameters=parameters)
+        if self.transform is not None:
+            self.transform.init(self.outlabels())
 
 
     def get_layers_indim(self):
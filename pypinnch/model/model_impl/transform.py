@@ -0,0 +1,166 @@
+
+
+
+from torch import (
+    cat as torch_cat,
+    ones as torch_ones,
+)
+
+
+
+class OutputTransform:
+    """
+    Output transform of a :any:`Model`, applied at the end of
+    the forward path, which enforces a boundary or initial condition
+    exactly (a hard constraint). The outputs are transformed as
+
+        u = g(x) + d(x) N(x),
+
+    where N is the output of the network, d is a distance function
+    that vanishes where the condition is set, and g is a function
+    that satisfies the condition there. The inputs x include the
+    time as the final coordinate, if the model is time dependent.
+
+    The constraints that are enforced by the transform
+    are dropped from the phases, so that their sample sets,
+    batches, forward passes and loss terms are not computed.
+    If the transform enforces the initial condition, set ``ic``.
+    Then the initial condition loss is dropped. Since the
+    initial condition of a step is the solution at the end
+    of the previous step, this is only meaningful if g and d
+    account for the initial time of every step, for instance,
+    if the problem is solved in a single step.
+
+    Example: an output u vanishes on the boundary of a box
+    with a circular hole, where the constraints "boundary"
+    and "hole" are set::
+
+        box = Box90(proportions=[2.0, 2.0], origin=[-1.0, -1.0])
+        hole = Sphere90(radius=0.25, center=[0.0, 0.0])
+        transform = OutputTransform(
+            distance = [box, hole],
+            outputs = ["u"],
+            enforces = ["boundary", "hole"],
+        )
+
+    Parameters:
+
+        distance (callable or :any:`Source` or list):
+            The distance function d, a callable evaluated on
+            the inputs, returning a tensor of shape (N, 1),
+            or a source with a ``distance`` method,
+            cf. :any:`Box90` and :any:`Sphere90`,
+            or a list of these, whose product is the distance function.
+        g (optional callable or scalar or list of scalar):
+            The function g, a callable evaluated on the inputs,
+            returning a tensor of shape (N, n) for the n outputs
+            that are transformed, or a constant value,
+            or a constant value for each output. (Default: 0.0)
+        outputs (optional list of string):
+            Labels of the outputs to transform.
+            If None, all the outputs. (Default: None)
+        enforces (optional list of string):
+            Labels of the constraints that are enforced by the transform.
+            (Default: None)
+        ic (boolean):
+            Whether the transform enforces the initial condition.
+            (Default: False)
+
+    """
+
+    def __init__(
+            self,
+            distance,
+            g = None,
+            outputs = None,
+            enforces = None,
+            ic = False,
+    ):
+        self.distance = distance if isinstance(distance, (list, tuple)) else [distance]
+        self.g = 0.0 if g is None else g
+        self.outputs = outputs
+        self.enforces = [] if enforces is None else enforces
+        self.ic = ic
+        # memoized during init()
+        self.idx = None
+        self.noutputs = None
+
+
+    def init(self, outlabels):
+        """
+        Called by the model during init().
+
+        Arguments:
+
+            outlabels (list of string):
+                The output labels of the model.
+
+        """
+        self.noutputs = len(outlabels)
+        if self.outputs is None:
+            self.idx = None
+        else:
+            self.idx = []
+            for lb in self.outputs:
+                if lb not in outlabels:
+                    raise ValueError(f"[OutputTransform] Output {lb} is not an output of the model {outlabels}.")
+                self.idx.append(outlabels.index(lb))
+        n = self.noutputs if self.idx is None else len(self.idx)
+        if isinstance(self.g, (list, tuple)) and len(self.g) != n:
+            raise ValueError(f"[OutputTransform] Require a value of g for each of the {n} transformed outputs, received {self.g}.")
+
+
+    def _d(self, x):
+        out = None
+        for d in self.distance:
+            d_ = d.distance(x) if hasattr(d, 'distance') else d(x)
+            out = d_ if out is None else out*d_
+        return out
+
+
+    def _g(self, x):
+        if callable(self.g):
+            return self.g(x)
+        if isinstance(self.g, (list, tuple)):
+            ones = torch_ones((x.shape[0], 1), dtype=x.dtype, device=x.device)
+            return torch_cat([v*ones for v in self.g], dim=1)
+        return self.g
+
+
+    def __call__(self, x, y):
+        """
+        Transform the outputs.
+
+        Arguments:
+
+            x (tensor): inputs of the model
+            y (tensor): outputs of the network
+
+        Returns:
+
+            tensor
+
+        """
+        d = self._d(x)
+        if self.idx is None:
+            return self._g(x) + d*y
+        # > transform the selected columns, without writing in place
+        z = self._g(x) + d*y[:, self.idx]
+        cols = []
+        for j in range(self.noutputs):
+            if j in self.idx:
+                k = self.idx.index(j)
+                cols.append(z[:, k:k+1])
+            else:
+                cols.append(y[:, j:j+1])
+        return torch_cat(cols, dim=1)
+
+
+    def __str__(self):
+        out = f"{self.__class__.__name__}("
+        out += f"outputs: {self.outputs}, "
+        out += f"enforces: {self.enforces}, "
+        out += f"ic: {self.ic})"
+        return out
+
+
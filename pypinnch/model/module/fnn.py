@@ -67,5 +67,6 @@ class FNN(Module):
         x = self.layers[-1](x)
         if self.exp_final:
             x = exp(-x)
+        x = self.output_stage(inputs, x)
         return x
 
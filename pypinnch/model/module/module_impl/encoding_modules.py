@@ -4,7 +4,15 @@
 
 
 import torch.nn as nn
-from torch import randn
+from torch import (
+    randn,
+    tensor,
+    arange,
+    cat as torch_cat,
+    cos as torch_cos,
+    sin as torch_sin,
+)
+from math import pi
 
 from .rff.functional import (
     basic_encoding,
@@ -47,3 +55,21 @@ class GaussianEncodingModule(nn.Module):
 
 
 
+class PeriodicEncodingModule(nn.Module):
+
+    def __init__(self, indim, idx, origins, periods, m, dtype):
+        super().__init__()
+        self.indim = indim
+        self.idx = idx
+        self.register_buffer('origins', tensor(origins, dtype=dtype))
+        # angular frequencies, shape (nperiodic, m)
+        k = arange(1, m+1, dtype=dtype)
+        self.register_buffer('omega', (2.0*pi/tensor(periods, dtype=dtype)).reshape((-1, 1))*k.reshape((1, -1)))
+
+    def forward(self, x):
+        cols = [x[:, i:i+1] for i in range(self.indim) if i not in self.idx]
+        # phases, shape (N, nperiodic, m)
+        vp = (x[:, self.idx] - self.origins).unsqueeze(-1)*self.omega
+        vp = vp.flatten(-2, -1)
+        return torch_cat(cols + [torch_cos(vp), torch_sin(vp)], dim=-1)
+
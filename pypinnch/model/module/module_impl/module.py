@@ -1,7 +1,7 @@
 
 
 from torch import nn, tensor
-from torch import full, hstack
+from torch import full, hstack, empty, inference_mode
 from .activation import Activation
 import torch.nn.init as I
 
@@ -19,6 +19,7 @@ from .encoding_modules import (
     BasicEncodingModule,
     PositionalEncodingModule,
     GaussianEncodingModule,
+    PeriodicEncodingModule,
 )
 
 
@@ -48,6 +49,9 @@ class Module(nn.Module):
         super().__init__()
         self.with_t = net.with_t
         self.indim = net.indim
+        self.transform = net.transform
+        # labels of inputs that are periodic by construction
+        self.periodic_axes = []
         if net.encoding is None:
             self.encoding_module = None
         else:
@@ -67,6 +71,16 @@ class Module(nn.Module):
                     b = net.encoding.b,
                     dtype = dtype,
                 )
+            elif encoding == 'PeriodicEncoding':
+                self.encoding_module = PeriodicEncodingModule(
+                    indim = net.indim,
+                    idx = net.encoding.idx,
+                    origins = net.encoding.origins,
+                    periods = net.encoding.periods,
+                    m = net.encoding.m,
+                    dtype = dtype,
+                )
+                self.periodic_axes = list(net.encoding.axes)
             else:
                 raise ValueError(f"[Module] Unrecognized encoding type {encoding}")
 
@@ -102,6 +116,29 @@ class Module(nn.Module):
         return out
 
 
+    def output_stage(self, x, y):
+        """
+        Transform the outputs using the output transform, if any.
+
+        Arguments:
+
+            x (Tensor):
+                input on the forward path
+            y (Tensor):
+                output of the network
+
+        Returns:
+
+            Tensor
+
+        """
+        if self.transform is None:
+            out = y
+        else:
+            out = self.transform(x, y)
+        return out
+
+
     def populate_activation(
             self,
             activation_chain,
@@ -145,11 +182,17 @@ class Module(nn.Module):
         return activation_parameters
 
 
-    def evaluate_on_input(self, x):
+    def evaluate_on_input(self, x, chunk = 16384, out = None):
         """
         Unceremoniously evaluate the model on a set of
         inputs, without modifying the model
         or affecting the backprop facilities in any way.
+        This is the entry point for bulk inference,
+        e.g., on the meshes of the outputs:
+        the module is evaluated under ``torch.inference_mode``,
+        so no graph is built, and the inputs are processed in chunks,
+        written into a preallocated output, in order to bound
+        the memory of the forward pass.
 
         This method is provided to make scripts cleaner and
         more readable. The steps to
@@ -163,6 +206,12 @@ class Module(nn.Module):
                 inputs, compatible in shape with the module.
                 Alternatively, a pair (X, t); t will be extended and stacked with X.
                 The latter is the same calling signature used by a Solution method.
+            chunk (integer):
+                Number of inputs per forward pass. (Default: 16384)
+            out (optional tensor):
+                Output of shape (number of inputs, number of outputs),
+                which is written in place, e.g., a slice of a larger tensor.
+                If None, it is allocated. (Default: None)
 
         Returns:
 
@@ -173,19 +222,31 @@ class Module(nn.Module):
         if isinstance(x, tuple):
             X = x[0]
             t = x[1]
-            x_ = hstack((X, full((X.shape[0], 1), t, dtype=X.dtype, device=X.device)))
         else:
-            x_ = x
-        # Switch to eval mode, this switches off
-        # gradient computation and switches off
-        # dropout (if any), and ... (?)
+            X = x
+            t = None
+        n = X.shape[0]
+        # Switch to eval mode, this
+        # switches off dropout (if any), and ... (?)
+        training = self.training
         self.eval()
-        # I need to detach from the graph when
-        # the module is in eval mode, oh well.
-        y = self.forward(x_).detach().requires_grad_(False)
-        # Switch back to train mode
-        self.train()
-        return y
+        try:
+            # (at least one pass, for the shape of the output)
+            for beg in range(0, max(n, 1), chunk):
+                end = min(beg + chunk, n)
+                with inference_mode():
+                    x_ = X[beg:end]
+                    if t is not None:
+                        x_ = hstack((x_, full((end - beg, 1), t, dtype=X.dtype, device=X.device)))
+                    y = self.forward(x_)
+                if out is None:
+                    # (allocated outside of inference mode, so it is an ordinary tensor)
+                    out = empty((n, y.shape[1]), dtype=y.dtype, device=y.device)
+                out[beg:end] = y
+        finally:
+            # Switch back
+            self.train(training)
+        return out
 
 
     def activate(self, inputs, activation, params):
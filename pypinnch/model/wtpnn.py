@@ -54,6 +54,11 @@ class WTPNN(Model):
             Labels can be passed in here or during config stage.
             If there is one model whose labels are the problem
             labels, this will be set automatically.
+        encoding (optional :any:`Encoding`):
+            Encoding of the inputs. (Default: None)
+        transform (optional :any:`OutputTransform`):
+            Transform of the outputs, applied after exp_final (if set).
+            (Default: None)
 
     """
 
@@ -67,10 +72,12 @@ class WTPNN(Model):
             exp_final=False,
             labels = None,
             encoding = None,
+            transform = None,
     ):
         super().__init__(
             labels=labels,
             encoding=encoding,
+            transform=transform,
         )
         self.hidden_layer_sizes = hidden_layer_sizes
         self.layers = None
@@ -83,8 +90,8 @@ class WTPNN(Model):
         self._Module = Module_WTPNN
 
 
-    def init(self):
-        super().init()
+    def init(self, parameters=None):
+        super().init(parameters=parameters)
         layers_indim = self.get_layers_indim()
         outdim = len(self.lbl) - self.indim
         if len(self.hidden_layer_sizes) > 1:
@@ -9,10 +9,10 @@ from torch.nn import (
     MSELoss,
 )
 from torch import (
-    hstack as torch_hstack,
+    cat as torch_cat,
     minimum as torch_minimum,
     zeros_like as torch_zeros_like,
-    zeros as torch_zeros,
+    empty as torch_empty,
 )
 from ..._impl.residual import (
     Periodic,
@@ -24,11 +24,14 @@ from mv1fw.fw import (
 )
 
 from copy import deepcopy
+from math import sqrt
 
 from ...action.action_impl.action import separate_actions_probes
 from ...strategy.strategy_impl.strategies import Strategies
 
 from ...sampler import SampleSets, MomentSets
+from ..._impl.impl2.randomstate import set_random_state
+from ..._impl.impl2.batchsizeramp import BatchsizeRamp
 
 
 
@@ -93,6 +96,26 @@ class Phase:
         self.momentsets = None
         self.th = None
         self.L = 0
+        # the optimizer and the iteration counter
+        # of the current call to train(), for checkpointing
+        self.optimizer = None
+        self.iteration = None
+        # state pending to resume a call to train(), or None
+        self.resume = None
+        # if set, the loss routines record residual vectors,
+        # one per loss term, whose squared norm is the loss term,
+        # cf. :any:`GaussNewton`.
+        self.collect = False
+        self.rvs_ic = []
+        self.rvs_c = []
+        # batch-size schedule of the current call to train()
+        self.bsramp = BatchsizeRamp()
+        # (rank, nprocs) during data-parallel training, cf. :any:`DataParallel`:
+        # each process keeps its shard of every batch.
+        self.shard = None
+        # whether the initial condition is enforced
+        # by the output transform of the model, cf. :any:`OutputTransform`
+        self.ic_enforced = False
         # > populate `active constraint` boolean map
         self.active_constraint = {}
         constraints_ = constraints if constraints is not None else []
@@ -181,6 +204,7 @@ class Phase:
             hub,
             manager,
             th,
+            subdomain = None,
     ):
         """
         (Called by :any:`Driver`)
@@ -194,6 +218,8 @@ class Phase:
             hub (:any:`Hub`):
             manager (:any:`Manager`):
             th (:any:`TimeHorizon`):
+            subdomain (optional :any:`Union`):
+                The driver's subdomain, cf. :any:`Driver`.
 
         """
         time_dependent = icbase is not None
@@ -224,6 +250,8 @@ class Phase:
             self.hub.max_iterations = self.strategies.optimizer.kit.max_iterations
         else:
             self.hub.max_iterations = None
+        # > drop the constraints enforced by an output transform or an encoding
+        self._drop_enforced()
         # > initialize sample sets and moment sets
         self.samplesets.init_phase(
             active_constraint=self.active_constraint,
@@ -232,9 +260,11 @@ class Phase:
             SPD=self.problem.SPD,
             grading=self.strategies.using('grading'),
             config=config,
+            spatial_levels=self.strategies.spatialgrading.nlevels if self.strategies.using('spatialgrading') else 0,
             icbase=icbase,
             shelf=self.shelf,
             th=self.th,
+            subdomain=subdomain,
         )
         # unused if time independent (ITCINOOD)
         # but not expensive to init/deinit as empty set.
@@ -245,7 +275,8 @@ class Phase:
 
 
     def deinit(self):
-        self.problem = None
+        # (the problem is kept, it is set once by init(),
+        # and the phase is initialized again in the next stride)
         self.hub = None
         self.out = None
         self.samplesets.deinit()
@@ -275,28 +306,193 @@ class Phase:
             )
 
 
+    def state_dict(self, granularity):
+        """
+        The state of the phase, for the purpose of checkpointing.
+        If granularity is "iteration", this is called at the top of
+        an iteration in train(), and the state of the call to train()
+        is included.
+
+        Arguments:
+
+            granularity (string):
+                "step" or "iteration"
+
+        Returns:
+
+            dict
+
+        """
+        out = {
+            "samplesets": self.samplesets.state_dict(),
+            "momentsets": self.momentsets.state_dict(),
+            "dt": self.hub.dt,
+            "hub_iteration": self.hub.iteration,
+            "carryover": self.strategies.optimizer.carryover_state,
+            "warmstart": self.strategies.warmstart.history if self.strategies.using('warmstart') else None,
+            "train": None,
+        }
+        if granularity == "iteration":
+            out["train"] = {
+                "iteration": self.iteration,
+                "optimizer": self.optimizer.state_dict(),
+                "strategies": {strat.name: strat.state_dict() for strat in self.strategies},
+                "bsramp": self.bsramp.state_dict(),
+            }
+        return out
+
+
+    def load_state_dict(self, state, out_state, random_state):
+        """
+        Inverse of state_dict(). Called after init_phase().
+        If the state is taken during a call to train(), the remainder
+        is kept pending and it is restored by the next call to train().
+
+        Arguments:
+
+            state (dict):
+            out_state (dict):
+                State of the output manager.
+            random_state (dict):
+                State of random number generators, restored last.
+
+        """
+        self.samplesets.load_state_dict(state["samplesets"])
+        self.momentsets.load_state_dict(state["momentsets"])
+        self.hub.dt = state["dt"]
+        self.hub.iteration = state["hub_iteration"]
+        self.strategies.optimizer.carryover_state = state["carryover"]
+        if self.strategies.using('warmstart') and state["warmstart"] is not None:
+            self.strategies.warmstart.history = [p.to(self.config.device) for p in state["warmstart"]]
+        if state["train"] is None:
+            self.out.load_state_dict(out_state)
+            set_random_state(random_state, self.problem)
+        else:
+            self.resume = state["train"]
+            self.resume["out"] = out_state
+            self.resume["random"] = random_state
+
+
+    def _resume_train(self, optimizer):
+        """
+        Restore the state of a call to train(),
+        after the optimizer and the lr scheduler are created,
+        and after the gate_iterloop() callbacks.
+
+        Arguments:
+
+            optimizer: optimizer instance
+
+        Returns:
+
+            iteration (integer)
+
+        """
+        resume = self.resume
+        self.resume = None
+        optimizer.load_state_dict(resume["optimizer"])
+        # Invariant: the lr scheduler is restored after the optimizer.
+        for strat in self.strategies:
+            if strat.name in resume["strategies"]:
+                strat.load_state_dict(resume["strategies"][strat.name])
+        if self.bsramp.using():
+            self.bsramp.load_state_dict(resume["bsramp"])
+            self.set_batchsize()
+        self.out.load_state_dict(resume["out"])
+        self.out.log(f"Resuming train at level {self.L} at iteration {resume['iteration']}.")
+        set_random_state(resume["random"], self.problem)
+        return resume["iteration"]
+
+
+    def set_batchsize(self):
+        """
+        Set the batch size of the constraints
+        following the batch-size schedule, cf. :any:`Kit`.
+        """
+        divisor = self.bsramp.divisor()
+        batchsize = self.batchsize // divisor
+        if batchsize < 1:
+            raise ValueError(f"Batch size schedule reduces batch size {self.batchsize} below 1 (divisor {divisor}).")
+        for css in self.samplesets.unique_csss():
+            css.set_batchsize(batchsize)
+        if self.bsramp.using():
+            self.out.log(f"Batch size {batchsize}.")
+
+
     def evaluate_models_nograd(self, X):
         """
         Simple helper method to evaluate the
         entire set of models without any effect
-        on gradients or the computational graph.
+        on gradients or the computational graph,
+        cf. :any:`Module`.evaluate_on_input().
 
         Arguments:
             X: tensor formatted like problem inputs
         Returns:
             UU: tensor formatted like problem outputs
         """
-        modules = self.hub.modules
-        X.requires_grad_(False)
-        UU = torch_zeros((X.shape[0], 0))
-        for module in modules:
-            module.eval()
-            U = module.forward(X)
-            module.train()
-            UU = torch_hstack((UU, U))
+        hub = self.hub
+        outdims = [len(lbl) - indim for lbl, indim in zip(hub.lbls, hub.indims)]
+        UU = torch_empty((X.shape[0], sum(outdims)), dtype=X.dtype, device=X.device)
+        beg = 0
+        for module, outdim in zip(hub.modules, outdims):
+            module.evaluate_on_input(X, out=UU[:,beg:beg+outdim])
+            beg += outdim
         return UU
 
 
+    def evaluate_residual(
+            self,
+            constraint,
+            X,
+            chunk = 4096,
+    ):
+        """
+        Evaluate the pointwise squared residual of a
+        (pde) constraint on the inputs X, without building
+        a graph through the parameters.
+        The inputs are processed in chunks, in order to bound the memory
+        used by the derivatives with respect to the inputs.
+        Used to score sample points, cf. :any:`Refinement`.
+
+        Arguments:
+
+            constraint (:any:`Constraint`):
+            X (tensor):
+                inputs formatted like problem inputs.
+            chunk (integer):
+                number of points evaluated at a time. (Default: 4096)
+
+        Returns:
+
+            scores (tensor):
+                the squared residual, summed over the components
+                of the residual, one value per input point,
+                on the same device as X.
+
+        """
+        hub, problem = self.hub, self.problem
+        module = hub.modules[0]
+        params = [p for p in module.parameters() if p.requires_grad]
+        for p in params:
+            p.requires_grad_(False)
+        scores = []
+        for beg in range(0, X.shape[0], chunk):
+            hub._x = X[beg:beg+chunk].clone().detach().to(self.config.device).requires_grad_(True)
+            hub._u = module.forward(hub._x)
+            R = constraint.residual(problem, hub).detach()
+            problem.clear_gradients()
+            R = R*R
+            if R.dim() > 1:
+                R = R.sum(dim=1)
+            scores.append(R.to(X.device))
+        for p in params:
+            p.requires_grad_(True)
+        hub._x = None
+        hub._u = None
+        return torch_cat(scores)
+
+
     def train(self, level):
         """
         Main call to train neural network(s).
@@ -318,6 +514,40 @@ class Phase:
         raise NotImplementedError
 
 
+    def _drop_enforced(self):
+        """
+        Drop the constraints, and the initial condition,
+        enforced exactly by the output transforms of the modules,
+        and the periodic constraints enforced by their encodings.
+        """
+        self.ic_enforced = False
+        axes = None
+        for module in self.hub.modules:
+            axes_ = getattr(module, 'periodic_axes', [])
+            # a constraint is enforced only if it is enforced for every module
+            axes = axes_ if axes is None else [a for a in axes if a in axes_]
+        axes = [] if axes is None else axes
+        for lb in self.problem.constraints:
+            residual = self.problem.constraints[lb].residual
+            if isinstance(residual, Periodic) and residual.axis is not None and residual.axis in axes:
+                if self.active_constraint[lb]:
+                    self.active_constraint[lb] = False
+                    self.out.log(f"Constraint {lb} is enforced by the periodic encoding.")
+        for module in self.hub.modules:
+            transform = getattr(module, 'transform', None)
+            if transform is None:
+                continue
+            for lb in transform.enforces:
+                if lb not in self.problem.constraints:
+                    raise ValueError(f"[OutputTransform] Could not locate constraint {lb}.")
+                if self.active_constraint[lb]:
+                    self.active_constraint[lb] = False
+                    self.out.log(f"Constraint {lb} is enforced by the output transform.")
+            if transform.ic and self.problem.with_t:
+                self.ic_enforced = True
+                self.out.log(f"Initial condition is enforced by the output transform.")
+
+
     def batch(self):
         """
         Get batches from all constraints and from the base (for IC constraints).
@@ -332,45 +562,73 @@ class Phase:
             is either a periodic constraint or a data constraint.
 
         """
-        if self.problem.with_t:
+        if self.problem.with_t and not self.ic_enforced:
             XX, QQref = self.samplesets.icbase.batch()
             # dtypecheck('XX', XX)
             # dtypecheck('QQref', QQref)
             XX = XX.clone().detach().to(self.config.device).requires_grad_(False)
             # todo this doesn't need to be cloned?
             QQref = QQref.clone().detach().to(self.config.device).requires_grad_(False)
+            if self.shard is not None:
+                rank, nprocs = self.shard
+                XX, QQref = XX[rank::nprocs], QQref[rank::nprocs]
         else:
             XX, QQref = None, None
         # list of XX, QQref pairs
         XXs = []
         QQrefs = []
+        IWs = []
         # training on constraints
-        for lb in self.samplesets.active_csss:
+        for i, lb in enumerate(self.samplesets.active_csss):
             css = self.samplesets.csss[lb]
+            if i > 0 and css is self.samplesets.csss[self.samplesets.active_csss[i-1]]:
+                # > sample group: the same batch (the same tensors) is shared
+                XXs.append(XXs[-1])
+                QQrefs.append(QQrefs[-1])
+                IWs.append(IWs[-1])
+                continue
             XX_, QQref_ = css.batch()
+            if self.shard is not None:
+                rank, nprocs = self.shard
+                XX_ = XX_[rank::nprocs]
+                QQref_ = QQref_[rank::nprocs] if QQref_ is not None else None
             XX_ = XX_.clone().detach().to(self.config.device).requires_grad_(True)
             # todo this doesn't need to be cloned?
             if QQref_ is not None:
                 QQref_ = QQref_.clone().detach().to(self.config.device).requires_grad_(False)
+            IW_ = css.importance_weights()
+            if IW_ is not None:
+                IW_ = IW_.to(self.config.device)
             XXs.append(XX_)
             QQrefs.append(QQref_)
+            IWs.append(IW_)
         # the batch
         self.hub.XX = XX
         self.hub.QQref = QQref
         self.hub.XXs = XXs
         self.hub.QQrefs = QQrefs
+        self.hub.IWs = IWs
         # moving references that allow consistent API in scripts "_x", "_u" among sources
         # todo review after XFormat added - these objects _x, _u are only used by problem.get() now.
         self.hub._x = None
         self.hub._u = None
 
 
-    def ic_loss(self):
+    def ic_loss(
+            self,
+            quiet = False,
+    ):
         """
         Find the total loss from all IC constraints.
         Returns loss broken down by constraint, and
         (for general convenience) a float representation ``Lic``.
 
+        Arguments:
+
+            quiet (boolean):
+                If set, the actions are not called.
+                (Default: False)
+
         Returns:
 
              losses, Lic (pair of: list of tensor, scalar):
@@ -394,21 +652,34 @@ class Phase:
                 # Reduce = L1Loss(reduction="mean") # L1Loss
                 Reduce = MSELoss(reduction="mean") # L2Loss
                 loss = Reduce(input=Q, target=Qref)
+                if self.collect:
+                    self.rvs_ic.append((Q - Qref).reshape((-1,))/sqrt(Q.numel()))
                 Lic += float(loss)
                 # > add to losslist to be weighted
                 losses.append(loss)
-                out.after_ic_loss(icci=i, loss=float(loss))
+                if not quiet:
+                    out.after_ic_loss(icci=i, loss=float(loss))
             # > done with ic for this batch, clear problem's memoized gradients
             problem.clear_gradients()
         return losses, Lic
 
 
-    def constraint_loss(self):
+    def constraint_loss(
+            self,
+            quiet = False,
+    ):
         """
         Find the total loss from all non-IC constraints.
         Returns loss broken down by constraint, and
         (for general convenience) a float representation Lc.
 
+        Arguments:
+
+            quiet (boolean):
+                If set, the actions are not called,
+                and the residuals are not weighted
+                by any weighting strategy. (Default: False)
+
         Returns:
 
             loss from non-IC constraints,
@@ -421,12 +692,17 @@ class Phase:
         losses = []
         Lc = 0.0
         # Ordinary Constraint Training, including PDEs:
+        n = len(self.samplesets.active_csss)
         for i, lb in enumerate(self.samplesets.active_csss):
             constraint = problem.constraints[lb]
             ## Setup:
             QQref = hub.QQrefs[i]
-            hub._x = hub.XXs[i]
-            hub._u = module.forward(hub._x)
+            if i > 0 and hub.XXs[i] is hub.XXs[i-1]:
+                # > sample group: reuse the forward pass (and the derivatives)
+                hub._x = hub.XXs[i]
+            else:
+                hub._x = hub.XXs[i]
+                hub._u = module.forward(hub._x)
             if isinstance(constraint.residual, DataResidual):
                 # data constraint (data residual)
                 if isinstance(constraint.residual, Periodic):
@@ -452,18 +728,30 @@ class Phase:
                     for labeli in range(len(QQ)):
                         lossi = Reduce(input=QQ[labeli], target=QQref[labeli])
                         loss += lossi
+                    if self.collect:
+                        self.rvs_c.append(torch_cat([
+                            (QQ[labeli] - QQref[labeli]).reshape((-1,))/sqrt(QQ[labeli].numel())
+                            for labeli in range(len(QQ))
+                        ]))
                 else:
                     loss = Reduce(input=QQ, target=QQref)
+                    if self.collect:
+                        self.rvs_c.append((QQ - QQref).reshape((-1,))/sqrt(QQ.numel()))
                 Lc += float(loss)
             else:
                 # ordinary constraint (pde residual)
+                hub._qqref = QQref
                 loss = self.compute_residual(
                     constraint=constraint,
+                    quiet=quiet,
+                    ci=i,
                 )
                 Lc += float(loss)
-            # done with XX
-            problem.clear_gradients()
-            self.out.after_constraint_loss(ci=i, loss=float(loss))
+            # done with XX, unless it is shared with the next constraint
+            if not (i+1 < n and hub.XXs[i+1] is hub.XXs[i]):
+                problem.clear_gradients()
+            if not quiet:
+                self.out.after_constraint_loss(ci=i, loss=float(loss))
             losses.append(loss)
         return losses, Lc
 
@@ -471,12 +759,23 @@ class Phase:
     def compute_residual(
             self,
             constraint,
+            quiet = False,
+            ci = None,
     ):
         """
 
         Arguments:
 
             constraint (:any:`Constraint`):
+            quiet (boolean):
+                If set, the residual is not weighted,
+                and the actions are not called. (Default: False)
+            ci (optional integer):
+                Index of the constraint among the active constraints,
+                if the residual is computed on the constraint's batch.
+                In that case, if importance batching is used,
+                the loss estimates are refreshed and the residual is
+                reweighted by the importance weights, cf. :any:`ImportanceBatching`.
 
         Returns:
 
@@ -485,7 +784,17 @@ class Phase:
         """
         hub, strats, problem = self.hub, self.strategies, self.problem
         R = constraint.residual(problem, hub)
-        if problem.with_t and (strats.using('taweighting') or strats.using('grading')):
+        if ci is not None and hub.IWs[ci] is not None:
+            # > importance batching
+            if not quiet:
+                R2 = (R*R).detach()
+                if R2.dim() > 1:
+                    R2 = R2.sum(dim=1)
+                css = self.samplesets.csss[self.samplesets.active_csss[ci]]
+                css.update_importance(R2)
+            # the mean of IW*R^2 is an unbiased estimate of the mean of R^2
+            R = hub.IWs[ci].sqrt()*R
+        if not quiet and problem.with_t and (strats.using('taweighting') or strats.using('grading')):
             indim = 0 if constraint.source is None else constraint.source.dim
             # which of the weighting procedures is being applied.
             # Take the weights as the minimum, if needed.
@@ -507,13 +816,44 @@ class Phase:
         else:
             T = None
             W = None
-        # Reduce = torch.nn.L1Loss(reduction="mean") # L1Loss
-        Reduce = MSELoss(reduction="mean") # L2Loss
-        R = Reduce(input=R, target=torch_zeros_like(R))
-        self.out.after_residual(R=R, T=T, W=W)
+        if not quiet and problem.with_t and strats.using('causalweighting'):
+            indim = 0 if constraint.source is None else constraint.source.dim
+            R, rv = strats.causalweighting.reduce(
+                R=R,
+                T=hub._x[:,indim:indim+1].detach(),
+                collect=self.collect,
+            )
+            if self.collect:
+                self.rvs_c.append(rv)
+        else:
+            if self.collect:
+                self.rvs_c.append(R.reshape((-1,))/sqrt(R.numel()))
+            # Reduce = torch.nn.L1Loss(reduction="mean") # L1Loss
+            Reduce = MSELoss(reduction="mean") # L2Loss
+            R = Reduce(input=R, target=torch_zeros_like(R))
+        if not quiet:
+            self.out.after_residual(R=R, T=T, W=W)
         return R
 
 
+    def evaluate_loss(self):
+        """
+        Evaluate the total (unweighted) loss on the current batch,
+        without calling the actions.
+        The batch is not drawn, so that the loss can be compared
+        for different values of the parameters, cf. :any:`WarmStart`.
+
+        Returns:
+
+            L (scalar):
+                the sum of the IC and constraint losses.
+
+        """
+        _, Lic = self.ic_loss(quiet=True)
+        _, Lc = self.constraint_loss(quiet=True)
+        return Lic + Lc
+
+
 
     ################################################
 
@@ -11,6 +11,11 @@ from .phase_impl import (
 )
 from .._impl.types import timed
 
+from torch import (
+    cat as torch_cat,
+)
+from math import sqrt
+
 from mv1fw.fw import (
     fw_scalar
 )
@@ -143,6 +148,9 @@ class StandardPINN(Phase):
                 raise ValueError(f"Require to set kit (max_iterations, tolerance, ...) via Optimizer object.")
         for strat in strats:
             strat.init(phase=self)
+        self.bsramp.init(strats.optimizer.kit.batchsize_schedule)
+        if self.bsramp.using():
+            self.set_batchsize()
         optimizer = strats.optimizer.get(
             level=self.L,
             module=module,
@@ -167,123 +175,246 @@ class StandardPINN(Phase):
         )
 
         iteration = 0
-        while True:
-
-            self.out.on_iter()
-
-            self.batch()
-
-            self.out.after_batch(hub=self.hub)
-
-            def closure():
-                optimizer.zero_grad()
-                loss = fw_scalar(dtype=self.hub.fw_type, a=0.0).to(device=self.config.device)
-                losses_ic, Lic = self.ic_loss()
-                if strats.using('causalweighting'):
-                    # todo
-                    # losses_c, Lc = self.constraint_loss_causal()
-                    raise NotImplementedError
-                else:
+        self.optimizer = optimizer
+        if self.resume is not None:
+            iteration = self._resume_train(optimizer)
+        dp = strats.dataparallel if strats.using('dataparallel') else None
+        if dp is not None:
+            dp.start(phase=self)
+        try:
+            while True:
+
+                self.iteration = iteration
+                self.out.on_iter()
+
+                self.batch()
+
+                self.out.after_batch(hub=self.hub)
+
+                def terms():
+                    # > the NTK weighting needs the residual vectors of the terms
+                    collected = False
+                    if strats.using('laweighting') and strats.laweighting.needs_residuals(iteration) and not self.collect:
+                        self.collect = True
+                        self.rvs_ic = []
+                        self.rvs_c = []
+                        collected = True
+                    losses_ic, Lic = self.ic_loss()
                     losses_c, Lc = self.constraint_loss()
-                # > check loss rel. tolerance
-                self.tolerance_finished = tolerance_finished(
-                    losses_ic=losses_ic,
-                    losses_c=losses_c,
-                    tolerance=strats.optimizer.kit.tolerance,
-                )
-                # > get loss-aware weights
-                if strats.using('laweighting'):
-                    lambdas_ic, lambdas_c = strats.laweighting.get(
-                        losses_ic=losses_ic,
-                        losses_c=losses_c,
-                        epoch=self.samplesets.epoch(),
+                    if collected:
+                        self.collect = False
+                    if dp is not None:
+                        # > the losses over all the shards,
+                        # for the stop criteria and the actions
+                        rlosses_ic, rlosses_c = dp.reduce_losses(losses_ic, losses_c)
+                        Ltotal = sum(rlosses_ic) + sum(rlosses_c)
+                        self.out.set_losses(ic_losses=rlosses_ic, losses=rlosses_c)
+                    else:
+                        rlosses_ic, rlosses_c = losses_ic, losses_c
+                        Ltotal = Lic + Lc
+                    # > check loss rel. tolerance
+                    self.tolerance_finished = tolerance_finished(
+                        losses_ic=rlosses_ic,
+                        losses_c=rlosses_c,
+                        tolerance=strats.optimizer.kit.tolerance,
+                    )
+                    # > get loss-aware weights
+                    if strats.using('laweighting'):
+                        lambdas_ic, lambdas_c = strats.laweighting.get(
+                            losses_ic=losses_ic,
+                            Lic=Lic,
+                            losses_c=losses_c,
+                            Lc=Lc,
+                            epoch=self.samplesets.epoch(),
+                            iteration=iteration,
+                            phase=self,
+                        )
+                    else:
+                        lambdas_ic, lambdas_c = len(losses_ic)*[1.0], len(losses_c)*[1.0]
+                    if collected:
+                        self.rvs_ic = []
+                        self.rvs_c = []
+                    # > get tuning weights set directly/explicitly
+                    weights_ic, weights_c = self._get_weights(
+                        iteration=iteration,
                     )
+                    if strats.using('taweighting'):
+                        strats.taweighting.set_loss(Ltotal)
+                    if strats.using('plateau'):
+                        strats.plateau.set_loss(Ltotal)
+                    if self.bsramp.using():
+                        self.bsramp.set_loss(Ltotal)
+                    coeffs_ic = [lambdas_ic[i]*weights_ic[i] for i in range(len(losses_ic))]
+                    coeffs_c = [lambdas_c[i]*weights_c[i] for i in range(len(losses_c))]
+                    return losses_ic, losses_c, coeffs_ic, coeffs_c
+
+                def closure():
+                    optimizer.zero_grad()
+                    loss = fw_scalar(dtype=self.hub.fw_type, a=0.0).to(device=self.config.device)
+                    losses_ic, losses_c, coeffs_ic, coeffs_c = terms()
+                    for i, L_ in enumerate(losses_c):
+                        loss += coeffs_c[i]*L_
+                    for i, L_ in enumerate(losses_ic):
+                        loss += coeffs_ic[i]*L_
+                    loss.backward()
+                    if dp is not None:
+                        loss = dp.reduce(module=module, loss=loss)
+                    return loss
+
+                def residual_closure():
+                    # The weighted residual vector, whose squared norm is the loss.
+                    self.collect = True
+                    self.rvs_ic = []
+                    self.rvs_c = []
+                    _, _, coeffs_ic, coeffs_c = terms()
+                    self.collect = False
+                    rvs = [sqrt(coeffs_c[i])*rv for i, rv in enumerate(self.rvs_c)] \
+                        + [sqrt(coeffs_ic[i])*rv for i, rv in enumerate(self.rvs_ic)]
+                    self.rvs_ic = []
+                    self.rvs_c = []
+                    return torch_cat(rvs)
+
+                if strats.optimizer.gauss_newton():
+                    optimizer.step(residual_closure)
                 else:
-                    lambdas_ic, lambdas_c = len(losses_ic)*[1.0], len(losses_c)*[1.0]
-                # > get tuning weights set directly/explicitly
-                weights_ic, weights_c = self._get_weights(
-                    iteration=iteration,
-                )
-                for i, L_ in enumerate(losses_c):
-                    loss += lambdas_c[i]*weights_c[i]*L_
-                for i, L_ in enumerate(losses_ic):
-                    loss += lambdas_ic[i]*weights_ic[i]*L_
-                if strats.using('taweighting'):
-                    strats.taweighting.set_loss(Lic + Lc)
-                loss.backward()
-                return loss
-
-            optimizer.step(closure)
-
-            self.out.after_iter()
-
-            # Break-checks and Epoch-checks
-            # Impl note: always perform epoch-check *after* break-checks.
-            taw_finished = strats.taweighting.finished() if strats.using('taweighting') else True
-            if self.tolerance_finished and taw_finished:
-                self.out.on_tolerance_break()
-                passed = True
-                break
-            if iteration+1 == strats.optimizer.kit.max_iterations:
-                self.out.on_maxiter_break()
-                break
-            if self.out.action_triggered_break():
-                self.out.on_action_triggered_break()
-                break
-            if self.samplesets.end_of_epoch():
-                # > callbacks triggered at end of epoch
+                    optimizer.step(closure)
+
+                self.out.after_iter()
+
+                if strats.using('plateau'):
+                    strats.plateau.step()
+                if strats.using('spatialgrading'):
+                    strats.spatialgrading.step(phase=self)
+                if self.bsramp.step(iteration):
+                    self.set_batchsize()
+                    if strats.using('plateau'):
+                        # the loss estimate has changed
+                        strats.plateau.reset()
+                if strats.using('causalweighting'):
+                    causal = strats.causalweighting
+                    causal.step()
+                    if causal.advanced:
+                        if not causal.finished():
+                            self.out.log(f"[CausalWeighting] epsilon advanced to {causal.eps()} at iteration {iteration}.")
+                        if strats.using('plateau'):
+                            # the loss function has changed
+                            strats.plateau.reset()
+
+                # Break-checks and Epoch-checks
+                # Impl note: always perform epoch-check *after* break-checks.
+                taw_finished = strats.taweighting.finished() if strats.using('taweighting') else True
+                if strats.using('causalweighting'):
+                    # causal weighting gates the break-checks in the same way as TAW.
+                    taw_finished = taw_finished and strats.causalweighting.finished()
+                reason = None
+                if self.tolerance_finished and taw_finished:
+                    reason = "tolerance"
+                elif iteration+1 == strats.optimizer.kit.max_iterations:
+                    reason = "maxiter"
+                elif strats.using('plateau') and strats.plateau.finished() and taw_finished \
+                and self.bsramp.finished() \
+                and (strats.spatialgrading.finished() if strats.using('spatialgrading') else True):
+                    reason = "plateau"
+                elif self.out.action_triggered_break():
+                    reason = "action"
+                if dp is not None:
+                    # the main process decides for all the processes
+                    reason = dp.agree(reason)
+                if reason == "tolerance":
+                    self.out.on_tolerance_break()
+                    passed = True
+                    break
+                if reason == "maxiter":
+                    self.out.on_maxiter_break()
+                    break
+                if reason == "plateau":
+                    self.out.on_plateau_break(
+                        reason=strats.plateau.reason,
+                    )
+                    break
+                if reason == "action":
+                    self.out.on_action_triggered_break()
+                    break
+                if self.samplesets.end_of_epoch():
+                    # > callbacks triggered at end of epoch
+                    if strats.using('taweighting'):
+                        # todo review
+                        strats.taweighting.on_end_of_epoch()
+                    self.out.on_end_of_epoch()
+                    strats.lr_sched.step(
+                        optimizer=optimizer,
+                        phase=self,
+                        iteration=None,
+                    )
+                    self.out.after_lr_sched_step()
                 if strats.using('taweighting'):
-                    # todo review
-                    strats.taweighting.on_end_of_epoch()
-                self.out.on_end_of_epoch()
+                    taw = strats.taweighting
+                    if taw.end_of_stage():
+                        taw.step()
+                        self.out.after_taweighting_step()
+                        if strats.using('plateau'):
+                            # the loss function has changed
+                            strats.plateau.reset()
+                        if not taw.gradual_mode():
+                            # taw is not in gradual mode.
+                            # We want to reinitialize the optimizer.
+                            # Just create a new optimizer, it is not an expensive operation.
+                            # The same applies to lr scheduler.
+                            # todo review
+                            strats.optimizer.store(optimizer)
+                            optimizer = strats.optimizer.get(
+                                level=self.L,
+                                module=module,
+                            )
+                            # todo review - ?
+                            lr_sched = strats.lr_sched.get(
+                                level=self.L,
+                                optimizer=optimizer,
+                                kit=strats.optimizer.kit,
+                            )
+                            self.optimizer = optimizer
+                        else:
+                            # taw is in gradual mode,
+                            # and the end_of_stage() signal is set.
+                            pass
+                    else:
+                        # Either TAW is already finished,
+                        # or else TAW is proceeding and not at end of stage.
+                        pass
+                if strats.using('refinement'):
+                    strats.refinement.step(
+                        phase=self,
+                        iteration=iteration,
+                    )
                 strats.lr_sched.step(
                     optimizer=optimizer,
                     phase=self,
-                    iteration=None,
+                    iteration=iteration,
                 )
-                self.out.after_lr_sched_step()
-            if strats.using('taweighting'):
-                taw = strats.taweighting
-                if taw.end_of_stage():
-                    taw.step()
-                    self.out.after_taweighting_step()
-                    if not taw.gradual_mode():
-                        # taw is not in gradual mode.
-                        # We want to reinitialize the optimizer.
-                        # Just create a new optimizer, it is not an expensive operation.
-                        # The same applies to lr scheduler.
-                        # todo review
-                        optimizer = strats.optimizer.get(
-                            level=self.L,
-                            module=module,
-                        )
-                        # todo review - ?
-                        lr_sched = strats.lr_sched.get(
-                            level=self.L,
-                            optimizer=optimizer,
-                            kit=strats.optimizer.kit,
-                        )
-                    else:
-                        # taw is in gradual mode,
-                        # and the end_of_stage() signal is set.
-                        pass
-                else:
-                    # Either TAW is already finished,
-                    # or else TAW is proceeding and not at end of stage.
-                    pass
-            strats.lr_sched.step(
-                optimizer=optimizer,
-                phase=self,
-                iteration=iteration,
-            )
-            iteration += 1
-            self.hub.iteration += 1
-            # > update moments
-            self.momentsets.update(
-                iteration=iteration,
-                problem=self.problem,
-            )
+                iteration += 1
+                self.hub.iteration += 1
+                # > update moments
+                self.momentsets.update(
+                    iteration=iteration,
+                    problem=self.problem,
+                )
+        except BaseException:
+            if dp is not None:
+                dp.abort()
+            raise
         #} // iter
+        if dp is not None:
+            dp.finish(phase=self)
+
+        strats.optimizer.store(optimizer)
+        self.optimizer = None
+        self.iteration = None
+        if strats.using('spatialgrading'):
+            strats.spatialgrading.finish(phase=self)
+        if not self.bsramp.finished():
+            # > restore the batch size
+            self.bsramp.init(None)
+            self.set_batchsize()
 
         self.out.after_iterloop()
 
@@ -3,6 +3,7 @@ __all__ = [
     "Buffer",
     "ConstraintSampleSet",
     "Cylinder",
+    "Importance",
     "MomentSets",
     "SampleSets",
     "UnitHypercube",
@@ -14,6 +15,7 @@ from .icbase import ICBase
 from .buffer import Buffer
 from .constraintsampleset import ConstraintSampleSet
 from .cylinder import Cylinder
+from .importance import Importance
 from .momentsets import MomentSets
 from .samplesets import SampleSets
 from .unit_hypercube import UnitHypercube
@@ -15,6 +15,19 @@ class Buffer:
     Create from a Base class instance, and use to
     populate a Base class instance.
 
+    .. note::
+
+        Copy-on-write. The timeslice X is handed off between
+        a base and a buffer (and between drivers) by sharing its storage,
+        without a copy: calling a buffer on a base, or a base on a buffer,
+        transfers the reference. This is safe because X is never modified
+        in place: every update (advance, a new IC, a shuffle, a checkpoint)
+        replaces X with a new tensor. Code that must modify X in place
+        copies it first, e.g., by passing ``copy=True``.
+        Creating a buffer from a base takes a snapshot (a copy).
+        For drivers in other processes, the engines hand off
+        X through shared-memory tensors, cf. :any:`Strides`.
+
     Parameters:
 
         base (:any:`Base`):
@@ -37,17 +50,42 @@ class Buffer:
     def __call__(
             self,
             base,
+            copy = False,
     ):
         """
         Arguments:
 
             base (:any:`Base`):
                 Base sampler instance
+            copy (boolean):
+                Whether to copy X, instead of sharing
+                its storage (copy-on-write). Default: False
         """
         if isinstance(base.X, Tensor):
-            self.X = base.X.clone().detach()
+            self.X = base.X.detach().clone() if copy else base.X.detach()
             self.t = deepcopy(base.t)
         else:
             self.X = deepcopy(base.X)
             self.t = deepcopy(base.t)
 
+
+    def state_dict(self):
+        """
+        For the purpose of checkpointing.
+        """
+        return {
+            "X": self.X,
+            "t": self.t,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+        """
+        self.X = state["X"]
+        self.t = state["t"]
+
+
+
+
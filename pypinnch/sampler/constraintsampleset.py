@@ -5,10 +5,16 @@
 from .cylinder import Cylinder
 
 from ..source.dataset import DataSet
+from ..source.interface import Interface
 from .._impl.residual import DataResidual
 
 from math import ceil
 
+from torch import (
+    hstack as torch_hstack,
+    randperm as torch_randperm,
+)
+
 
 
 class ConstraintSampleSet:
@@ -54,8 +60,10 @@ class ConstraintSampleSet:
             SPD,
             shelf,
             grading,
+            spatial_levels=0,
             mode="pseudo",
             th=None,
+            subdomain=None,
     ):
         """
         (Called by :any:`SampleSets`)
@@ -86,8 +94,13 @@ class ConstraintSampleSet:
                 shelf, parameter for setting up time-dependent sample sets.
             grading (boolean):
                 whether grading strategy is used.
+            spatial_levels (integer):
+                number of spatial levels, cf. :any:`SpatialGrading`.
             mode (string):
                 sampling mode
+            subdomain (optional :any:`Union`):
+                The driver's subdomain, cf. :any:`Driver`.
+                If set, the sample set is restricted to the subdomain.
 
         """
         out.log(f"Initializing constraint {label}. SPL = {SPL}")
@@ -98,6 +111,9 @@ class ConstraintSampleSet:
                 labels = self.constraint.source.get_labels()
             )
             reference_data_size = self.constraint.source.reference_data_size()
+        elif isinstance(self.constraint.source, Interface):
+            # the row of each point in the interface sample
+            reference_data_size = self.constraint.source.reference_data_size()
         else:
             reference_data_size = 0
         # > create a base for the cylinder
@@ -113,6 +129,15 @@ class ConstraintSampleSet:
                 pow2=True if grading else False, # todo review
                 convex_hull_contains=True,
             )
+            if subdomain is not None and not isinstance(self.constraint.source, Interface):
+                base = self._restrict(
+                    base=base,
+                    subdomain=subdomain,
+                    label=label,
+                    SPL=SPL,
+                    Nmin=batchsize,
+                    pow2=True if grading else False,
+                )
         # > set inputs to cylinder
         if not self.time_dependent:
             tinit = None
@@ -158,6 +183,7 @@ class ConstraintSampleSet:
                 dtype=dtype,
                 log=out.log,
                 reference_data_size=reference_data_size,
+                spatial_levels=spatial_levels if self.constraint.source is not None else 0,
             )
             self.cyl.init(
                 tinit=tinit,
@@ -171,6 +197,44 @@ class ConstraintSampleSet:
             raise ValueError
 
 
+    def _restrict(
+            self,
+            base,
+            subdomain,
+            label,
+            SPL,
+            Nmin,
+            pow2,
+    ):
+        """
+        Keep the points of the base in the subdomain.
+        If some, but fewer than Nmin, points are left,
+        the source is sampled again, with the SPL scaled
+        by the missing fraction of points.
+        (A constraint whose source misses the subdomain
+        is deactivated by the engine, cf. :any:`TimeIndependent`.)
+        """
+        source = self.constraint.source
+        idim = max(1, source.internal_dimension())
+        for _ in range(4):
+            X = base[:,:source.dim]
+            out = base[subdomain.inside_all(X)]
+            n = out.shape[0]
+            if n >= Nmin:
+                return out
+            if n == 0:
+                break
+            SPL = ceil(SPL*(1.25*Nmin/n)**(1.0/idim))
+            base = source(
+                SPL=SPL,
+                Nmin=Nmin,
+                pow2=pow2,
+                convex_hull_contains=True,
+            )
+        raise ValueError(f"[ConstraintSampleSet] Constraint {label} has {n} < {Nmin} points in the subdomain, "
+                         f"deactivate it for the driver, or reduce the batch size.")
+
+
     def deinit(self):
         """
         Called by phase at end of phase.
@@ -178,6 +242,20 @@ class ConstraintSampleSet:
         self.cyl.deinit()
 
 
+    def state_dict(self):
+        """
+        For the purpose of checkpointing.
+        """
+        return self.cyl.state_dict()
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+        """
+        self.cyl.load_state_dict(state)
+
+
     def measure(self):
         """
         Measure (volume, length, etc.) of domain.
@@ -211,6 +289,61 @@ class ConstraintSampleSet:
         return XX, QQref
 
 
+    def set_spatial_level(self, level):
+        self.cyl.set_spatial_level(level)
+
+
+    def set_batchsize(self, batchsize):
+        self.cyl.set_batchsize(batchsize)
+
+
+    def importance_weights(self):
+        """
+        The importance weights of the last batch,
+        or None if importance batching is not used.
+        """
+        return self.cyl.batch_weights if self.cyl.importance is not None else None
+
+
+    def update_importance(self, R2):
+        """
+        Refresh the loss estimates of the points of the last batch,
+        cf. :any:`Importance.update`.
+        """
+        self.cyl.importance.update(R2)
+
+
+    def candidates(self, n, SPL):
+        """
+        Draw a pool of new candidate points from the constraint's source,
+        formatted like rows of the sample set, for refinement.
+        In the time-dependent case, the times are copied
+        from the sample set, cf. :any:`Cylinder.times`.
+
+        Arguments:
+
+            n (integer):
+                size of the pool.
+            SPL (integer):
+                samples per unit length, as for the sample set.
+
+        Returns:
+
+            tensor
+
+        """
+        X = self.constraint.source(
+            SPL=SPL,
+            Nmin=n,
+            pow2=False,
+            convex_hull_contains=True,
+        )
+        X = X[torch_randperm(X.shape[0])[:n]]
+        if self.time_dependent:
+            X = torch_hstack((X, self.cyl.times(X.shape[0])))
+        return X
+
+
     def age(self):
         """
         Recall that an epoch of training occurs at the iteration
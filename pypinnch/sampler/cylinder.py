@@ -11,6 +11,7 @@ from numpy import float64 as numpy_float64
 from .sampler_impl.sampler import Sampler
 from .._impl.types import ispow2
 from .unit_hypercube import UnitHypercube
+from .importance import Importance
 
 
 
@@ -70,6 +71,11 @@ class Cylinder(Sampler):
             log, for logging, or `None` to print directly to standard output.
         reference_data_size (integer):
             The number of reference columns in the data. Default: 0
+        spatial_levels (integer):
+            Number of spatial levels, cf. :any:`SpatialGrading`.
+            At level l, the active sample set
+            consists of the points that extend the first
+            size/2^(spatial_levels-l) points of the base. Default: 0
 
     """
 
@@ -101,6 +107,7 @@ class Cylinder(Sampler):
             dtype = numpy_float64,
             log = None,
             reference_data_size = 0,
+            spatial_levels = 0,
     ):
         super().__init__()
         self.base = base
@@ -127,14 +134,24 @@ class Cylinder(Sampler):
         self.point = 0
         # counters for age (1 age == 1 trip through the dataset)
         self.age_counter = 0
+        # spatial levels: the level of each point (as a base prefix),
+        # and the number of active points, a prefix of the sample set
+        self.spatial_levels = spatial_levels
+        self.bucket = None
+        self.nactive = None
+        # size of the sample set when it is populated,
+        # the reference for the memory budget of refinement
+        self.size0 = None
+        # permutation for batching, used instead of shuffling
+        # when the sample set is evolved in place, cf. evolve()
+        self.perm = None
+        # per-point loss estimates for importance batching,
+        # cf. set_importance(), and the weights of the last batch
+        self.importance = None
+        self.batch_weights = None
         # > set batchsize
-        if self.custom_batch is not None:
-            if batchsize % self.custom_batch.divisor != 0:
-                raise ValueError(f"batchsize {batchsize} is not divisible by custom batch divisor {self.custom_batch.divisor}.")
-            batchsize_ = batchsize // self.custom_batch.divisor
-        else:
-            batchsize_ = batchsize
-        self.batchsize = batchsize_
+        self.batchsize = None
+        self.set_batchsize(batchsize)
         # > set the base and find the size
         if base is None:
             # zero-dimensional case.
@@ -238,10 +255,25 @@ class Cylinder(Sampler):
         else:
             # todo make this XNoF
             self.sampleset = self.base
+        # > spatial levels
+        self.bucket = None
+        self.nactive = None
+        if self.spatial_levels > 0:
+            # Invariant: row r of the sample set extends point r % B of the base.
+            B = self.base.shape[0]
+            baseidx = torch.arange(self.sampleset.shape[0]) % B
+            n0 = max(1, B >> self.spatial_levels)
+            self.bucket = torch.zeros((self.sampleset.shape[0],), dtype=torch.uint8)
+            for l in range(1, self.spatial_levels+1):
+                self.bucket[baseidx >= (n0 << (l-1))] = l
         # > re-init state
         self.point = 0
         self.level = 0
         self.age_counter = 0
+        self.size0 = self.sampleset.shape[0]
+        self.perm = None
+        self.importance = None
+        self.batch_weights = None
         # > finalize
         if finalize:
             self.sampleset = self.shuffle()
@@ -270,10 +302,57 @@ class Cylinder(Sampler):
 
 
     def shuffle(self):
-        idxs = torch.randperm(self.sampleset.shape[0])
+        if self.nactive is None:
+            idxs = torch.randperm(self.sampleset.shape[0])
+        else:
+            # only the active prefix is shuffled,
+            # the inactive points remain ordered by level.
+            idxs = torch.cat((
+                torch.randperm(self.nactive),
+                torch.arange(self.nactive, self.sampleset.shape[0]),
+            ))
+        if self.bucket is not None:
+            self.bucket = self.bucket[idxs]
         return self.sampleset[idxs]
 
 
+    def size_active(self):
+        """
+        The number of points in the active sample set.
+        """
+        return self.sampleset.shape[0] if self.nactive is None else self.nactive
+
+
+    def set_spatial_level(self, level):
+        """
+        Set the spatial level, cf. :any:`SpatialGrading`.
+        Raising the level by one activates the next block of points,
+        which immediately follows the active prefix.
+        Otherwise the sample set is ordered by level first
+        (in a stable way, so that the order within each level is kept),
+        and the batch pointer is reset.
+
+        Arguments:
+
+            level (integer):
+                0 <= level <= spatial_levels.
+
+        """
+        if self.bucket is None:
+            return
+        if level < 0 or level > self.spatial_levels:
+            raise ValueError(f"Invalid spatial level {level} (spatial levels {self.spatial_levels}).")
+        nactive = int((self.bucket <= level).sum())
+        if nactive < self.batchsize:
+            raise ValueError(f"Spatial level {level} has {nactive} points, fewer than the batch size {self.batchsize}.")
+        if self.nactive is None or nactive < self.nactive:
+            idxs = torch.sort(self.bucket, stable=True).indices
+            self.sampleset = self.sampleset[idxs]
+            self.bucket = self.bucket[idxs]
+            self.point = 0
+        self.nactive = nactive if level < self.spatial_levels else None
+
+
     def _impl(self, contract=False):
         """
         Main v1 implementation method.
@@ -303,6 +382,64 @@ class Cylinder(Sampler):
         self.sampleset = None
 
 
+    def state_dict(self):
+        """
+        The cylinder's state, for the purpose of checkpointing.
+
+        Returns:
+
+            dict
+
+        """
+        return {
+            "sampleset": self.sampleset,
+            "stepsize": self.stepsize,
+            "shelf": self.shelf,
+            "level": self.level,
+            "point": self.point,
+            "age_counter": self.age_counter,
+            "epoch_marker": self.epoch_marker,
+            "size0": self.size0,
+            "perm": self.perm,
+            "bucket": self.bucket,
+            "nactive": self.nactive,
+            "importance": self.importance.state_dict() if self.importance is not None else None,
+            "sampler": self.sampler.state_dict() if self.sampler is not None else None,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        Arguments:
+
+            state (dict):
+
+        """
+        self.sampleset = state["sampleset"]
+        self.stepsize = state["stepsize"]
+        self.shelf = state["shelf"]
+        self.level = state["level"]
+        self.point = state["point"]
+        self.age_counter = state["age_counter"]
+        self.epoch_marker = state["epoch_marker"]
+        self.size0 = state["size0"]
+        self.perm = state["perm"]
+        self.bucket = state["bucket"]
+        self.nactive = state["nactive"]
+        if state["importance"] is not None:
+            self.importance = Importance(
+                size=self.sampleset.shape[0],
+                device=self.sampleset.device,
+                decay=state["importance"]["decay"],
+                uniform=state["importance"]["uniform"],
+            )
+            self.importance.load_state_dict(state["importance"])
+        if self.sampler is not None:
+            self.sampler.load_state_dict(state["sampler"])
+
+
     def batch(self):
         """
         Get a batch to train on.
@@ -325,16 +462,16 @@ class Cylinder(Sampler):
         """
         beg = self.point
         end = self.point + self.batchsize
-        XXQQref = self.sampleset[beg:end,:]
+        if self.importance is not None:
+            idx, self.batch_weights = self.importance.draw(self.batchsize)
+            XXQQref = self.sampleset[idx]
+        elif self.perm is None:
+            XXQQref = self.sampleset[beg:end,:]
+        else:
+            XXQQref = self.sampleset[self.perm[beg:end]]
         self.point = end
-        if self.point + self.batchsize > self.sampleset.shape[0]:
-            self.sampleset = self.shuffle()
-            self.point = 0
-            age_tmp = self.age()
-            self.age_counter += 1
-            # Invariant: only here is this flag set.
-            if self.age() > age_tmp:
-                self.epoch_marker = True
+        if self.point + self.batchsize > self.size_active():
+            self._end_of_age()
         if self.custom_batch is not None:
             XXQQref = self.custom_batch(XXQQref)
         if self.reference_data_size > 0:
@@ -352,6 +489,158 @@ class Cylinder(Sampler):
         return XX, QQref
 
 
+    def times(self, n):
+        """
+        Draw times for new points, by copying the times
+        of randomly chosen points of the sample set,
+        so that the times follow the current extent
+        and distribution of the time cylinder.
+
+        Arguments:
+
+            n (integer):
+
+        Returns:
+
+            tensor of shape (n, 1)
+
+        """
+        idx = torch.randint(self.sampleset.shape[0], (n,))
+        return self.sampleset[idx, self.indim:self.indim+1].clone()
+
+
+    def grow(self, X):
+        """
+        Append points to the sample set.
+        The points are appended after the current batch pointer,
+        so they are visited during the current age,
+        and they are mixed in with the next shuffle.
+
+        Arguments:
+
+            X (tensor):
+                points formatted like rows of the sample set.
+
+        """
+        self.sampleset = torch.vstack((self.sampleset, X.to(self.sampleset.dtype)))
+        if self.importance is not None:
+            self.importance.extend(X.shape[0])
+
+
+    def replace(self, idx, X):
+        """
+        Replace points of the sample set in place.
+
+        Arguments:
+
+            idx (tensor):
+                indices of the points to replace.
+            X (tensor):
+                points formatted like rows of the sample set.
+
+        """
+        self.sampleset[idx] = X.to(self.sampleset.dtype)
+        if self.importance is not None:
+            self.importance.reset(idx)
+
+
+    def evolve(self, scores, X):
+        """
+        Retain-and-resample evolution of the sample set (R3):
+        the points whose score is above the mean score are retained,
+        and the rest are replaced by new points.
+        This is done in place, so the size of the sample set
+        does not change. After the first call, batches are
+        gathered through a permutation that is redrawn at each age,
+        instead of shuffling (copying) the sample set.
+
+        Arguments:
+
+            scores (tensor):
+                one score per point of the sample set,
+                such as the squared residual.
+            X (tensor):
+                new points formatted like rows of the sample set,
+                at least as many as there are points to replace.
+
+        Returns:
+
+            integer: the number of points replaced.
+
+        """
+        if self.perm is None:
+            self.perm = torch.randperm(self.sampleset.shape[0])
+        idx = torch.nonzero(scores <= scores.mean()).squeeze(1)
+        n = min(idx.shape[0], X.shape[0])
+        self.sampleset[idx[:n]] = X[:n].to(self.sampleset.dtype)
+        if self.importance is not None:
+            self.importance.reset(idx[:n])
+        return n
+
+
+    def set_importance(self, decay, uniform):
+        """
+        Draw batches by importance, cf. :any:`Importance`.
+        The estimates are kept until the sample set is populated again.
+
+        Arguments:
+
+            decay (scalar):
+            uniform (scalar):
+
+        """
+        if self.importance is None:
+            self.importance = Importance(
+                size=self.sampleset.shape[0],
+                device=self.sampleset.device,
+                decay=decay,
+                uniform=uniform,
+            )
+
+
+    def _end_of_age(self):
+        """
+        Shuffle and start the next age.
+        """
+        if self.importance is not None:
+            # batches are drawn at random, there is nothing to shuffle,
+            # and the estimates stay aligned with the sample set.
+            pass
+        elif self.perm is None:
+            self.sampleset = self.shuffle()
+        else:
+            self.perm = torch.randperm(self.sampleset.shape[0])
+        self.point = 0
+        age_tmp = self.age()
+        self.age_counter += 1
+        # Invariant: only here is this flag set.
+        if self.age() > age_tmp:
+            self.epoch_marker = True
+
+
+    def set_batchsize(self, batchsize):
+        """
+        Set the batch size, which may change during training,
+        cf. :any:`Kit` (batch-size schedule).
+        If the next batch no longer fits in the current age,
+        the age ends, as it does in batch().
+
+        Arguments:
+
+            batchsize (integer):
+
+        """
+        if self.custom_batch is not None:
+            if batchsize % self.custom_batch.divisor != 0:
+                raise ValueError(f"batchsize {batchsize} is not divisible by custom batch divisor {self.custom_batch.divisor}.")
+            batchsize_ = batchsize // self.custom_batch.divisor
+        else:
+            batchsize_ = batchsize
+        self.batchsize = batchsize_
+        if self.sampleset is not None and self.point + self.batchsize > self.size_active():
+            self._end_of_age()
+
+
     def age(self):
         """
         The current age.
@@ -5,6 +5,11 @@
 
 
 import torch
+import numpy as np
+from scipy.interpolate import (
+    LinearNDInterpolator,
+    RegularGridInterpolator,
+)
 
 from .buffer import Buffer
 
@@ -19,6 +24,29 @@ from mv1fw.fw import \
     XFormat
 
 
+def _interpolator(X, indim, outdim):
+    """
+    Helper for :any:`ICBase`.interpolator().
+    """
+    P = X[:,:indim]
+    V = X[:,indim:indim+outdim]
+    # > lattice: the product of the distinct values on each axis
+    axes = [np.unique(P[:,i]) for i in range(indim)]
+    shape = tuple(axis.shape[0] for axis in axes)
+    if all(n > 1 for n in shape) and int(np.prod(shape)) == P.shape[0]:
+        idx = tuple(np.searchsorted(axes[i], P[:,i]) for i in range(indim))
+        if np.unique(np.ravel_multi_index(idx, shape)).shape[0] == P.shape[0]:
+            grid = np.empty(shape + (outdim,), dtype=V.dtype)
+            grid[idx] = V
+            return RegularGridInterpolator(axes, grid, method="linear", bounds_error=False, fill_value=np.nan)
+    if indim == 1:
+        # repeated points, keep the first
+        axis, first = np.unique(P[:,0], return_index=True)
+        return RegularGridInterpolator((axis,), V[first], method="linear", bounds_error=False, fill_value=np.nan)
+    return LinearNDInterpolator(P, V)
+
+
+
 class ICBase:
     """
     Base sample set type, it may just house typical data,
@@ -64,6 +92,12 @@ class ICBase:
         # Invariant: only problem instance can unset this.
         self.epoch_marker = None
         self.device = None
+        # cached interpolator, cf. interpolator()
+        self._interpolator = None
+        # permutation for batching, used instead of shuffling X,
+        # so that the rows of X (and of the final condition)
+        # stay in the order of the base
+        self.perm = None
 
         ##############################
         # fields that are shared with Buffer:
@@ -197,6 +231,7 @@ class ICBase:
         self.device = device
         # pointer for batching
         self.point = 0
+        self.perm = None
         # counter for age (1 age == 1 trip through the dataset)
         self.age = 0
         # marker for determining epoch transition point.
@@ -233,7 +268,8 @@ class ICBase:
             #         print(f"[Warning] batchsize {self.batchsize} exceeds total size of base sample size {size}. (If dimension of problem is small, this may be unavoidable.)")
             #         self.copies_required = True
             #         make_more_copies = True
-            self.X = torch.clone(icbase.X[:size,:]).detach() # already detached (was never attached)
+            # shared with icbase, without a copy (copy-on-write, cf. Buffer)
+            self.X = icbase.X[:size,:].detach() # already detached (was never attached)
             # safety = 6
             # while make_more_copies:
             #     self.X = torch.vstack((self.X, self.X))
@@ -245,20 +281,66 @@ class ICBase:
             self.X.to(self.device)
 
 
-    def __call__(self, buffer):
+    def __call__(self, buffer, copy = False):
         """
-        Calling the base on a buffer
+        Calling the base on a buffer.
+        The storage of X is shared with the buffer,
+        cf. :any:`Buffer` (copy-on-write).
 
         Arguments:
 
             buffer (:any:`Buffer`):
+            copy (boolean):
+                Whether to copy X, instead of sharing its storage.
+                Default: False
 
         :meta private:
         """
         if not isinstance(buffer, Buffer):
             raise ValueError(f"Expecting Buffer.")
-        self.X = torch.clone(buffer.X)
+        self.X = torch.clone(buffer.X) if copy else buffer.X.detach()
         self.t = deepcopy(buffer.t)
+        self.perm = None
+
+
+    def state_dict(self):
+        """
+        For the purpose of checkpointing.
+
+        Returns:
+
+            dict
+
+        """
+        return {
+            "X": self.X,
+            "t": self.t,
+            "point": self.point,
+            "perm": self.perm,
+            "age": self.age,
+            "epoch_marker": self.epoch_marker,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        Arguments:
+
+            state (dict):
+
+        """
+        self.X = state["X"]
+        if self.X is not None and self.device is not None:
+            self.X = self.X.to(self.device)
+        self.t = state["t"]
+        self.point = state["point"]
+        self.perm = state.get("perm")
+        if self.perm is not None and self.device is not None:
+            self.perm = self.perm.to(self.device)
+        self.age = state["age"]
+        self.epoch_marker = state["epoch_marker"]
 
 
     def deinit(self):
@@ -267,12 +349,46 @@ class ICBase:
         """
         # free memory
         self.X = None
+        self.perm = None
+        self._interpolator = None
+
+
+    def interpolator(self, outdim):
+        """
+        A linear interpolator of the first `outdim` outputs of the base
+        on its inputs, for the evaluation at the IC timeslice
+        before the model is trained, cf. :any:`Driver`.evaluate_output().
+        The interpolator is built once per state of the base,
+        and cached until the base changes (a new timeslice X,
+        by advance() or by a new IC, or a change of X in place).
+        If the inputs of the base are a lattice, the interpolator
+        is multilinear on the lattice, otherwise it is
+        piecewise linear on a Delaunay triangulation, as griddata.
+        Outside of the inputs' convex hull, the value is nan.
+
+        Arguments:
+
+            outdim (integer):
+
+        Returns:
+
+            callable: numpy array (n, indim) -> numpy array (n, outdim)
+
+        """
+        X = self.X
+        cache = self._interpolator
+        if cache is None or cache[0] is not X or cache[1] != X._version or cache[2] != outdim:
+            self._interpolator = (
+                X,
+                X._version,
+                outdim,
+                _interpolator(X.detach().cpu().numpy(), self.indim, outdim),
+            )
+        return self._interpolator[3]
 
 
     def _shuffle(self):
-        idxs = torch.randperm(self.X.shape[0])
-        self.X = self.X[idxs]
-        # self.rng.shuffle(self.X)
+        self.perm = torch.randperm(self.X.shape[0]).to(self.X.device)
 
 
     # API for batching
@@ -312,8 +428,9 @@ class ICBase:
             beg = self.point
             end = self.point + self.batchsize
             XX = torch.full([self.batchsize, 1], self.t).to(self.device)
-            XX = torch.hstack((self.X[beg:end,:self.indim], XX)).to(self.device)
-            QQref = self.X[beg:end,self.indim:]
+            rows = self.X[beg:end,:] if self.perm is None else self.X[self.perm[beg:end]]
+            XX = torch.hstack((rows[:,:self.indim], XX)).to(self.device)
+            QQref = rows[:,self.indim:]
             self.point = end
             if self.point + self.batchsize > self.size():
                 self._shuffle()
@@ -382,6 +499,8 @@ class ICBase:
         # todo review, are all the age counters are reset this way on advance (step)? review
         self.reset_ages()
         self.t += dt
+        # the rows of the new timeslice are in the order of the base
+        self.perm = None
         if problem.indim > 0:
             tvector = torch.full([self.X.shape[0], 1], self.t).to(device)
             XX = self.X[:,:problem.indim]
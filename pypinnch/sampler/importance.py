@@ -0,0 +1,123 @@
+
+
+
+from torch import (
+    cat as torch_cat,
+    ones as torch_ones,
+    full as torch_full,
+    multinomial as torch_multinomial,
+    float32 as torch_float32,
+)
+
+
+
+class Importance:
+    """
+    Per-point loss estimates of a sample set,
+    for importance batching, cf. :any:`ImportanceBatching`.
+    Batches are drawn with probability proportional to the estimates,
+    mixed with a uniform probability so that every point
+    remains reachable, and the importance weights 1/(N p)
+    are returned alongside, so that the weighted loss of a batch
+    is an unbiased estimate of the loss over the sample set.
+    The estimates are refreshed lazily, by an exponential moving average
+    of the squared residuals already computed for the points of the batch.
+
+    The estimates are kept as a compact float32 tensor
+    on the same device as the sample set.
+
+    Parameters:
+
+        size (integer):
+            Size of the sample set.
+        device:
+            Device of the sample set.
+        decay (scalar):
+            Decay of the moving average, the weight of the previous estimate.
+        uniform (scalar):
+            Fraction of the probability mixed in uniformly.
+
+    """
+
+    def __init__(
+            self,
+            size,
+            device,
+            decay,
+            uniform,
+    ):
+        self.scores = torch_ones((size,), dtype=torch_float32, device=device)
+        self.decay = decay
+        self.uniform = uniform
+        # indices of the last batch drawn
+        self.idx = None
+
+
+    def draw(self, n):
+        """
+        Draw the indices of a batch, with replacement.
+
+        Arguments:
+
+            n (integer):
+                batch size.
+
+        Returns:
+
+            idx, weights (pair of tensor):
+                the indices, and the importance weights, of shape (n, 1).
+
+        """
+        N = self.scores.shape[0]
+        p = (1.0 - self.uniform)*self.scores/self.scores.sum() + self.uniform/N
+        idx = torch_multinomial(p, n, replacement=True)
+        self.idx = idx
+        weights = (1.0/(N*p[idx])).reshape((n, 1))
+        return idx, weights
+
+
+    def update(self, R2):
+        """
+        Refresh the estimates of the points of the last batch.
+
+        Arguments:
+
+            R2 (tensor):
+                squared residual, one value per point of the last batch.
+
+        """
+        R2 = R2.detach().reshape((-1,)).to(device=self.scores.device, dtype=self.scores.dtype)
+        self.scores[self.idx] = self.decay*self.scores[self.idx] + (1.0 - self.decay)*R2
+
+
+    def extend(self, n):
+        """
+        Extend the estimates for points appended to the sample set.
+        New points receive the largest current estimate,
+        so that they are visited soon.
+        """
+        new = torch_full((n,), float(self.scores.max()), dtype=self.scores.dtype, device=self.scores.device)
+        self.scores = torch_cat((self.scores, new))
+
+
+    def reset(self, idx):
+        """
+        Reset the estimates for points replaced in the sample set,
+        in the same manner as :any:`Importance.extend`.
+        """
+        self.scores[idx] = self.scores.max()
+
+
+    def state_dict(self):
+        return {
+            "scores": self.scores,
+            "decay": self.decay,
+            "uniform": self.uniform,
+        }
+
+
+    def load_state_dict(self, state):
+        self.scores = state["scores"].to(self.scores.device)
+
+
+
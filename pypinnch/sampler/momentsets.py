@@ -191,6 +191,24 @@ class MomentSets:
         self.lattices = {}
 
 
+    def state_dict(self):
+        """
+        For the purpose of checkpointing.
+        """
+        return {
+            "lattices": self.lattices,
+            "tinit": self.tinit,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict(). Called after init_phase().
+        """
+        self.lattices = state["lattices"]
+        self.tinit = state["tinit"]
+
+
     @timed("moment_update")
     def update(
             self,
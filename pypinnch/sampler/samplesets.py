@@ -8,6 +8,7 @@ from .icbase import ICBase
 from .constraintsampleset import ConstraintSampleSet
 
 from ..source.source_impl.bounding_box import BoundingBox
+from ..source.dataset import DataSet
 
 
 from mv1fw.fw import get_dtype
@@ -60,14 +61,34 @@ class SampleSets:
         # switch that can be changed for a performance test,
         # not important to users
         self.version = "v1"
-        # > build dict of constraint sample sets
+        # > build dict of constraint sample sets.
+        # Constraints in the same sample group share a sample set.
         self.csss = {}
+        groups = {}
+        previous = None
         for lb in problem.constraints:
             constraint = problem.constraints[lb]
-            self.csss[lb] = ConstraintSampleSet(
-                constraint,
-                self.version,
-            )
+            group = constraint.group
+            if group is not None and group in groups:
+                if group != previous:
+                    raise ValueError(f"[SampleSets] Constraint {lb} in sample group {group} must be declared "
+                                     f"consecutively with the other constraints in the group.")
+                css = groups[group]
+                if constraint.source is not css.constraint.source:
+                    raise ValueError(f"[SampleSets] Constraint {lb} in sample group {group} must have the same source as the other constraints in the group.")
+                if constraint.custom_batch is not css.constraint.custom_batch:
+                    raise ValueError(f"[SampleSets] Constraint {lb} in sample group {group} must have the same custom batch as the other constraints in the group.")
+                self.csss[lb] = css
+            else:
+                if group is not None and isinstance(constraint.source, DataSet):
+                    raise ValueError(f"[SampleSets] Constraint {lb} with a data set source cannot be in a sample group.")
+                self.csss[lb] = ConstraintSampleSet(
+                    constraint,
+                    self.version,
+                )
+                if group is not None:
+                    groups[group] = self.csss[lb]
+            previous = group
         # > the list active sample sets (labels only)
         self.active_csss = None
         # the number of epochs of training.
@@ -93,9 +114,11 @@ class SampleSets:
         SPD,
         grading,
         config,
+        spatial_levels = 0,
         icbase = None,
         shelf = None,
         th = None,
+        subdomain = None,
     ):
         """
         (Called by :any:`Phase`)
@@ -119,6 +142,8 @@ class SampleSets:
             grading (boolean):
                 whether grading strategy is used.
             config (:any:`DriverConfig`):
+            spatial_levels (integer):
+                number of spatial levels, cf. :any:`SpatialGrading`.
             icbase (optional :any:`Base`):
                 Base instance from the driver,
                 or None if time-independent.
@@ -127,6 +152,8 @@ class SampleSets:
                 when defining their sample sets.
             th (optional :any:`TimeHorizon`):
                 the (phase-dependent) time horizon.
+            subdomain (optional :any:`Union`):
+                The driver's subdomain, cf. :any:`Driver`.
 
         """
         # todo allow phases of a stride to share sample sets.
@@ -143,15 +170,20 @@ class SampleSets:
             )
         else:
             th_ = None
-        # Aside: it's assumed that the user is not attempting to
-        # apply the same sample set to two or more constraints.
-        # Allowing that is not a priority at present, as creating sample sets
-        # is ordinarily not a bottleneck, and if it becomes one
-        # (due to memory pressure, presumably) we can return to it.
+        # Constraints in a sample group share a sample set,
+        # which is initialized once. They are declared consecutively,
+        # so they are listed consecutively among the active constraints
+        # (in the order of declaration, as in the output of the actions),
+        # and batches, forward passes and derivatives can be shared.
         self.active_csss = []
+        initialized = []
         for lb in self.csss:
             css = self.csss[lb]
             if active_constraint[lb]:
+                self.active_csss.append(lb)
+                if css in initialized:
+                    continue
+                initialized.append(css)
                 css.init_phase(
                     label=lb,
                     dtype = get_dtype(config.fw_type),
@@ -161,13 +193,52 @@ class SampleSets:
                     SPD = SPD,
                     shelf=shelf,
                     grading=grading,
+                    spatial_levels=spatial_levels,
                     mode = "pseudo",
                     th = th_,
+                    subdomain = subdomain,
                 )
-                self.active_csss.append(lb)
         out.log("\n~end~\n")
 
 
+    def unique_csss(self):
+        """
+        The active sample sets, each listed once
+        (constraints in a sample group share a sample set).
+
+        Returns:
+
+            list of :any:`ConstraintSampleSet`
+
+        """
+        out = []
+        for lb in self.active_csss:
+            css = self.csss[lb]
+            if css not in out:
+                out.append(css)
+        return out
+
+
+    def unique_labels(self):
+        """
+        The labels of the active constraints,
+        with one label per sample set, cf. unique_csss().
+
+        Returns:
+
+            list of string
+
+        """
+        out = []
+        seen = []
+        for lb in self.active_csss:
+            css = self.csss[lb]
+            if css not in seen:
+                seen.append(css)
+                out.append(lb)
+        return out
+
+
     def deinit(self):
         """
         (Called by :any:`Phase`)
@@ -175,11 +246,46 @@ class SampleSets:
         """
         if self._time_dependent():
             self.icbase.deinit()
-        for lb in self.active_csss:
-            css = self.csss[lb]
+        for css in self.unique_csss():
             css.deinit()
 
 
+    def state_dict(self):
+        """
+        The state of the sample sets, including the ages
+        and the epoch counter, for the purpose of checkpointing.
+
+        Returns:
+
+            dict
+
+        """
+        return {
+            "epoch_counter": self.epoch_counter,
+            "icbase": self.icbase.state_dict() if self._time_dependent() else None,
+            "csss": {lb: self.csss[lb].state_dict() for lb in self.unique_labels()},
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+        Called after init_phase().
+
+        Arguments:
+
+            state (dict):
+
+        """
+        self.epoch_counter = state["epoch_counter"]
+        if self._time_dependent():
+            self.icbase.load_state_dict(state["icbase"])
+        for lb in state["csss"]:
+            if lb not in self.active_csss:
+                raise ValueError(f"[SampleSets] Constraint {lb} in checkpoint is not active in this phase.")
+            self.csss[lb].load_state_dict(state["csss"][lb])
+
+
     def base_measure(self):
         # todo deprecate
         return self.icbase.result_measure
@@ -257,8 +363,7 @@ class SampleSets:
             problem=problem,
         )
         # advance the constraints
-        for lb in self.active_csss:
-            css = self.csss[lb]
+        for css in self.unique_csss():
             css.advance(
                 hub=hub,
             )
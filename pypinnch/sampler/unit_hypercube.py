@@ -144,6 +144,24 @@ class UnitHypercube(Sampler):
         return X
 
 
+    def state_dict(self):
+        """
+        The sampler's state, for the purpose of checkpointing.
+        The pseudorandom and Lhs modes draw from the
+        numpy generator, whose state is kept separately.
+        """
+        return {
+            "call_seed": self.call_seed,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+        """
+        self.call_seed = state["call_seed"]
+
+
     def get_corners(
             self,
             dim,
@@ -8,6 +8,7 @@ __all__ = [
     "Box90",
     "Sphere90",
     "Simplex90",
+    "Interface",
 ]
 
 from .source_impl.source import Source
@@ -19,6 +20,7 @@ from .parametrized import Parametrized
 from .box90 import Box90
 from .sphere90 import Sphere90
 from .simplex90 import Simplex90
+from .interface import Interface
 
 
 
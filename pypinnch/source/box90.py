@@ -298,6 +298,22 @@ class Box90(Union):
         return out
 
 
+    def inside_impl_all(self, X):
+        """
+        See :any:`Union`.
+
+        """
+        out = torch_full((X.shape[0],), True)
+        tiny = 1e-12
+        for i, (prop, cd, org) in enumerate(zip(self.proportions, self.constantdims, self.origin)):
+            x = X[:,i]
+            if cd is not None:
+                out &= (cd - tiny < x) & (x < cd + tiny)
+            else:
+                out &= (org <= x) & (x <= org + prop)
+        return out
+
+
 
     def measure_impl(self):
         """
@@ -328,6 +344,45 @@ class Box90(Union):
         return out
 
 
+    def distance(self, X):
+        """
+        A distance function of the box, for an :any:`OutputTransform`.
+        If the box has constant dimensions, it is the
+        product of the signed distances to the hyperplanes
+        where the box is located, otherwise it is the product of
+        the (scaled) distances to the opposite sides of the box,
+        which vanishes on the boundary and is 1 at the center.
+        Columns of X beyond the dimension of the box (e.g., time)
+        are not used.
+
+        Arguments:
+
+            X (tensor): points of shape (N, d), d ≥ dim
+
+        Returns:
+
+            tensor of shape (N, 1)
+
+        """
+        if self.dim is None:
+            raise ValueError(f"[Box90] Uninitialized source")
+        out = None
+        const = any(cd is not None for cd in self.constantdims)
+        for i in range(self.dim):
+            x = X[:, i:i+1]
+            cd = self.constantdims[i]
+            if const:
+                if cd is None:
+                    continue
+                d = x - cd
+            else:
+                a = self.origin[i]
+                prop = self.proportions[i]
+                d = 4.0*(x - a)*(a + prop - x)/(prop*prop)
+            out = d if out is None else out*d
+        return out
+
+
     def internal_dimension_impl(self):
         """
         See :any:`Union`.
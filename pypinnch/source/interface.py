@@ -0,0 +1,239 @@
+
+
+
+from numpy import \
+    float64 as np_float64
+
+from torch import (
+    cat as torch_cat,
+    hstack as torch_hstack,
+    arange as torch_arange,
+    as_tensor as torch_as_tensor,
+)
+
+from .source_impl.source import Source, UninitializedSource
+
+
+
+class Interface(Source):
+    """
+    The interface between the subdomains of two drivers,
+    for domain decomposition, cf. :any:`TimeIndependent`.
+    The interface is sampled once, and the two drivers
+    train on the same points. Each driver is constrained
+    to agree, at these points, with the values of its neighbor,
+    which are exchanged by the engine:
+    the continuity of the outputs in ``labels``,
+    and the continuity of the derivatives in ``flux``.
+    The engine adds these constraints to the problem,
+    labeled ``interface<k>_<driver>`` for the k-th interface,
+    so that they can be weighted like any other constraint.
+    The continuity of the flux is not derived from the labels,
+    since the normal of the interface is not known in general:
+    the derivatives, e.g., the derivative normal to the interface,
+    are listed in ``flux``, and without them only the outputs
+    are continuous.
+
+    The sample set of an interface constraint carries the row
+    of each point in the interface sample, as the sample set
+    of a :any:`DataSet` carries its reference data, so the
+    neighbor's values of a batch are found by indexing.
+
+    Example: two drivers D1, D2 on the left and right halves
+    of the unit square, with an interface at x = 0.5::
+
+        interface = Interface(
+            source = Box90(proportions=[ConstantDim(0.5), 1.0], origin=[None, 0.0]),
+            drivers = ("D1", "D2"),
+            labels = "u",
+            flux = "u_x",
+        )
+
+    Parameters:
+
+        source (:any:`Source`):
+            The geometry of the interface.
+        drivers (pair of string):
+            Labels of the drivers on either side of the interface.
+        labels (string):
+            Labels of the outputs that are continuous across the interface.
+        flux (optional string):
+            Labels of the derivatives that are continuous across the interface,
+            e.g., the derivative normal to the interface. (Default: None)
+        SPL (optional positive integer):
+            A sample per unit length value which, if set,
+            overrides the SPL of the final phase of the first driver.
+            (Default: None)
+
+    """
+
+    def __init__(
+            self,
+            source,
+            drivers,
+            labels,
+            flux = None,
+            SPL = None,
+    ):
+        super().__init__()
+        if len(drivers) != 2:
+            raise ValueError(f"[Interface] An interface has two drivers, received {drivers}.")
+        self.source = source
+        self.drivers = tuple(drivers)
+        self.labels = labels
+        self.flux = flux
+        self.SPL = SPL
+        # set by draw()
+        self.X = None
+
+
+    def init(
+            self,
+            dtype = np_float64,
+            parameters = None,
+    ):
+        """
+        See :any:`Source`.
+
+        """
+        if not self.source.initialized:
+            self.source.init(
+                dtype=dtype,
+                parameters=parameters,
+            )
+        super().init(
+            dtype=dtype,
+            parameters=parameters,
+        )
+        self.dim = self.source.dim
+
+
+    def all_labels(self):
+        """
+        The labels of the values that are exchanged.
+
+        Returns:
+
+            string
+
+        """
+        return self.labels if self.flux is None else f"{self.labels}, {self.flux}"
+
+
+    def draw(self, SPL, Nmin):
+        """
+        Sample the interface, once, before the drivers are trained.
+        (Called by the engine.)
+
+        Arguments:
+
+            SPL (integer):
+            Nmin (integer):
+                Minimum number of points, e.g., the batch size.
+
+        """
+        X = self.source(
+            SPL=SPL if self.SPL is None else self.SPL,
+            Nmin=Nmin,
+            convex_hull_contains=False,
+        )
+        self.X = torch_as_tensor(X)
+
+
+    def sample(
+            self,
+            SPL,
+            Nmin = None,
+            pow2 = False,
+            convex_hull_contains = True,
+    ):
+        """
+        The points drawn by draw(), with the row of each point
+        in a last column, cf. reference_data_size().
+        The arguments are not used.
+
+        """
+        if self.X is None:
+            raise UninitializedSource(f"[Interface] Attempted to sample an interface that was not drawn.")
+        rows = torch_arange(self.X.shape[0], dtype=self.X.dtype).reshape((-1,1))
+        return torch_hstack((self.X, rows))
+
+
+    def reference_data_size(self):
+        """
+        The number of columns of reference data in a sample:
+        the row of the point in the interface sample.
+        """
+        return 1
+
+
+    def measure(self):
+        return self.source.measure()
+
+
+    def internal_dimension(self):
+        return self.source.internal_dimension()
+
+
+    def bounding_box(self):
+        return self.source.bounding_box()
+
+
+    def residual(self, values):
+        """
+        The residual of the constraint of one side of the interface.
+
+        Arguments:
+
+            values (tensor):
+                The neighbor's values at the interface points,
+                of shape (N, k) for the k labels of all_labels().
+                The engine updates the values in place.
+
+        Returns:
+
+            callable
+
+        """
+        return InterfaceResidual(
+            interface=self,
+            values=values,
+        )
+
+
+    def __str__(self):
+        out = f"Interface({self.drivers[0]}, {self.drivers[1]}, "
+        out += f"labels: {self.labels}, "
+        out += f"flux: {self.flux})"
+        return out
+
+
+
+class InterfaceResidual:
+    """
+    Residual of an :any:`Interface` constraint:
+    the difference of the driver's values and the
+    neighbor's values, at the points of the batch.
+
+    :meta private:
+    """
+
+    def __init__(
+            self,
+            interface,
+            values,
+    ):
+        self.interface = interface
+        self.values = values
+
+
+    def __call__(self, problem, hub):
+        Q = problem.get(self.interface.all_labels(), hub)
+        if isinstance(Q, tuple):
+            Q = torch_cat(Q, dim=1)
+        # > the rows of the interface sample in the batch
+        idx = hub._qqref[:,0].long().to(self.values.device)
+        return Q - self.values[idx].to(dtype=Q.dtype, device=Q.device)
+
+
+
@@ -68,6 +68,31 @@ class BoundingBox:
         return self
 
 
+    def intersects(self, bb, tol = 1e-12):
+        """
+        Whether the (closed) bounding boxes intersect.
+        An empty bounding box intersects nothing.
+
+        Arguments:
+
+            bb (:any:`BoundingBox`):
+            tol (scalar): tolerance
+
+        Returns:
+
+            boolean
+
+        """
+        if self.dim != bb.dim:
+            raise ValueError(f"Bounding boxes cannot be compared, dim {self.dim} != dim {bb.dim}")
+        if not self.mins or not bb.mins:
+            return False
+        for i in range(self.dim):
+            if self.maxs[i] < bb.mins[i] - tol or bb.maxs[i] < self.mins[i] - tol:
+                return False
+        return True
+
+
     def __str__(self):
         """
         The range in each dimension, e.g.,
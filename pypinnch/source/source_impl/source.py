@@ -182,6 +182,28 @@ class Source:
         raise NotImplementedError
 
 
+    def state_dict(self):
+        """
+        State of the source's sampler, if any,
+        for the purpose of checkpointing.
+
+        """
+        sampler = getattr(self, 'sampler', None)
+        return {
+            "sampler": sampler.state_dict() if sampler is not None else None,
+        }
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        """
+        sampler = getattr(self, 'sampler', None)
+        if sampler is not None and state["sampler"] is not None:
+            sampler.load_state_dict(state["sampler"])
+
+
     def __str__(self):
         # stub
         out = str(self.initialized) + ", " + str(self.dtype)
@@ -5,7 +5,9 @@ from numpy import \
 
 from torch import \
     zeros as torch_zeros, \
-    vstack as torch_vstack
+    vstack as torch_vstack, \
+    tensor as torch_tensor, \
+    bool as torch_bool
 
 from .bounding_box import BoundingBox
 from .source import Source, UninitializedSource
@@ -471,6 +473,42 @@ class Union(Source):
         return (not out) if self.complemented else out
 
 
+    def inside_all(
+            self,
+            X,
+    ):
+        """
+        Vectorized ``inside``: whether each row of X
+        is inside the region.
+
+        Arguments:
+
+            X (tensor): points, of shape (N, dim)
+
+        Returns:
+
+            boolean tensor of shape (N,)
+
+        """
+        checklist = [self] if self.is_constituent() else self.union
+        out = torch_zeros((X.shape[0],), dtype=torch_bool)
+        for source in checklist:
+            found = source.inside_impl_all(X)
+            for void in self.voids:
+                found &= ~void.inside_impl_all(X)
+            out |= found
+        return ~out if self.complemented else out
+
+
+    def inside_impl_all(self, X):
+        """
+        Vectorized ``inside_impl``. Constituents may override it,
+        by default ``inside_impl`` is called on each row.
+
+        """
+        return torch_tensor([bool(self.inside_impl(p)) for p in X.tolist()], dtype=torch_bool)
+
+
 
 
 
@@ -621,6 +659,30 @@ class Union(Source):
         return out
 
 
+    def state_dict(self):
+        """
+        State of the samplers of the :any:`Union`
+        and its constituents, for the purpose of checkpointing.
+
+        """
+        out = super().state_dict()
+        out["union"] = [source.state_dict() for source in self.union]
+        out["voids"] = [source.state_dict() for source in self.voids]
+        return out
+
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict().
+
+        """
+        super().load_state_dict(state)
+        for source, state_ in zip(self.union, state["union"]):
+            source.load_state_dict(state_)
+        for source, state_ in zip(self.voids, state["voids"]):
+            source.load_state_dict(state_)
+
+
     def constituent_measure(self):
         """
         Private helper for measure().
@@ -202,6 +202,36 @@ class Sphere90(Union):
             return bb
 
 
+    def distance(self, X):
+        """
+        A distance function of the sphere, for an :any:`OutputTransform`,
+        (r^2 - |x - c|^2)/r^2 in the dimensions where the sphere is
+        not constant, which vanishes on the sphere, is positive inside,
+        and is 1 at the center.
+        Columns of X beyond the dimension of the sphere (e.g., time)
+        are not used.
+
+        Arguments:
+
+            X (tensor): points of shape (N, d), d ≥ dim
+
+        Returns:
+
+            tensor of shape (N, 1)
+
+        """
+        if self.dim is None:
+            raise ValueError(f"[Sphere90] Uninitialized source")
+        r2 = self.radius*self.radius
+        out = r2
+        for i, coord in enumerate(self.center):
+            if isinstance(coord, ConstantDim):
+                continue
+            x = X[:, i:i+1] - coord
+            out = out - x*x
+        return out/r2
+
+
     def internal_dimension_impl(self):
         """
         See :any:`Union`.
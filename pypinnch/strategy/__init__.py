@@ -6,6 +6,12 @@ __all__ = [
     "LAWeighting",
     "Grading",
     "ExponentialWeight",
+    "Plateau",
+    "WarmStart",
+    "Refinement",
+    "ImportanceBatching",
+    "SpatialGrading",
+    "DataParallel",
     "strategy_impl",
 ]
 
@@ -16,6 +22,12 @@ from .taweighting import TAWeighting
 from .laweighting import LAWeighting
 from .grading import Grading
 from .exponentialweight import ExponentialWeight
+from .plateau import Plateau
+from .warmstart import WarmStart
+from .refinement import Refinement
+from .importancebatching import ImportanceBatching
+from .spatialgrading import SpatialGrading
+from .dataparallel import DataParallel
 
 
 from . import strategy_impl
@@ -1,6 +1,15 @@
 
 
 
+from torch import (
+    bucketize as torch_bucketize,
+    cumsum as torch_cumsum,
+    exp as torch_exp,
+    linspace as torch_linspace,
+    minimum as torch_minimum,
+    ones_like as torch_ones_like,
+    zeros as torch_zeros,
+)
 
 from .strategy_impl.strategy import Strategy
 
@@ -8,6 +17,45 @@ from .strategy_impl.strategy import Strategy
 
 class CausalWeighting(Strategy):
     """
+    CausalWeighting implements the causal training strategy
+    of Wang, Sankaran and Perdikaris [arXiv:2203.07404].
+    The time extent of the step is divided into bins,
+    and the residual loss of the points in the ith bin
+    is weighted by
+
+        w_i = exp(-epsilon * (L_0 + ... + L_{i-1})),
+
+    where L_k is the mean squared residual of the points in the kth bin.
+    So the loss at later times is not minimized until the loss
+    at earlier times is small, respecting causality.
+    The weights are not differentiated.
+
+    The binning is done with `torch.bucketize`, the losses of the bins with
+    `scatter_add`, and the weights with a cumulative sum,
+    all on the device and without a device sync in the closure.
+
+    The causality parameter epsilon follows a schedule:
+    when the smallest weight exceeds `delta`, i.e., the loss
+    has been minimized throughout the step for the current epsilon,
+    epsilon advances to the next value in the schedule.
+    The strategy is finished when the smallest weight exceeds
+    `delta` for the last value of epsilon. Until then,
+    training is not stopped due to tolerance (or a plateau).
+
+    .. note::
+        The strategy applies to the residuals of the (pde) constraints.
+        It is only available for time-dependent problems.
+
+    Parameters:
+
+        epsilon (scalar or list of scalar):
+            The schedule of the causality parameter.
+            (Default: [0.01, 0.1, 1.0, 10.0, 100.0])
+        nbins (integer):
+            Number of time bins. (Default: 32)
+        delta (scalar):
+            Threshold on the smallest weight for advancing
+            epsilon, and for finishing. (Default: 0.99)
 
     """
 
@@ -15,17 +63,128 @@ class CausalWeighting(Strategy):
     def __init__(
             self,
             epsilon = None,
+            nbins = 32,
+            delta = 0.99,
     ):
         super().__init__(name='causalweighting')
+        if epsilon is None:
+            epsilon = [0.01, 0.1, 1.0, 10.0, 100.0]
+        elif not isinstance(epsilon, (list, tuple)):
+            epsilon = [epsilon]
+        if len(epsilon) == 0:
+            raise ValueError(f"[CausalWeighting] Require a nonempty epsilon schedule.")
+        if nbins < 1:
+            raise ValueError(f"[CausalWeighting] nbins must be a positive integer, received {nbins}.")
         self.epsilon = epsilon
+        self.nbins = nbins
+        self.delta = delta
+        # state
+        self.stage = 0
+        self.edges = None
+        # smallest weight seen during the current iteration (a device scalar)
+        self.wmin = None
+        self.advanced = False
 
 
     def init(self, phase):
-        pass
-
-
-
-
+        """
+        Called at the initialization of train().
+        """
+        t0 = phase.samplesets.icbase.t
+        t1 = t0 + phase.th.stepsize()*(2**phase.L) + phase.shelf
+        # interior bin edges, on the device
+        self.edges = torch_linspace(t0, t1, self.nbins+1, device=phase.config.device)[1:-1].contiguous()
+        self.stage = 0
+        self.wmin = None
+        self.advanced = False
+
+
+    def reduce(self, R, T, collect=False):
+        """
+        Causally weighted mean squared residual.
+        Called in place of the mean squared reduction of the residual.
+
+        Arguments:
+
+            R (tensor):
+                pointwise residual.
+            T (tensor):
+                times of the points, shape (N, 1).
+            collect (boolean):
+                Whether to return the weighted residual vector,
+                whose squared norm is the loss, cf. :any:`GaussNewton`.
+                (Default: False)
+
+        Returns:
+
+            loss, rv (pair of scalar tensor, optional tensor)
+
+        """
+        R2 = R*R
+        if R2.dim() > 1:
+            R2 = R2.sum(dim=1)
+        idx = torch_bucketize(T.reshape((-1,)).to(self.edges.dtype), self.edges)
+        sums = torch_zeros((self.nbins,), dtype=R2.dtype, device=R2.device).scatter_add(0, idx, R2)
+        counts = torch_zeros((self.nbins,), dtype=R2.dtype, device=R2.device).scatter_add(0, idx, torch_ones_like(R2))
+        Lbin = sums/counts.clamp(min=1.0)
+        # > weights from the loss of the preceding bins
+        Lprev = (torch_cumsum(Lbin, dim=0) - Lbin).detach()
+        W = torch_exp(-self.eps()*Lprev)
+        wmin = W.min()
+        self.wmin = wmin if self.wmin is None else torch_minimum(self.wmin, wmin)
+        rv = None
+        if collect:
+            # each point contributes W R^2/(count nbins) to the loss
+            scale = (W/(counts.clamp(min=1.0)*self.nbins)).sqrt()[idx]
+            rv = (R.reshape((R.shape[0], -1))*scale.reshape((-1, 1))).reshape((-1,))
+        return (W*Lbin).mean(), rv
+
+
+    def step(self):
+        """
+        Called once per iteration, after the optimizer step.
+        Advances epsilon if the smallest weight exceeds delta.
+        """
+        self.advanced = False
+        if self.wmin is None:
+            return
+        wmin = float(self.wmin)
+        self.wmin = None
+        if wmin > self.delta and self.stage < len(self.epsilon):
+            self.stage += 1
+            self.advanced = True
+
+
+    def finished(self):
+        """
+        Whether the last value of epsilon is done.
+        """
+        return self.stage == len(self.epsilon)
+
+
+    def eps(self):
+        """
+        The current value of epsilon.
+        """
+        return self.epsilon[min(self.stage, len(self.epsilon)-1)]
+
+
+    def state_dict(self):
+        return {
+            "stage": self.stage,
+        }
+
+
+    def load_state_dict(self, state):
+        self.stage = state["stage"]
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nepsilon: {self.epsilon}\n"
+        out += f"nbins: {self.nbins}\n"
+        out += f"delta: {self.delta}\n"
+        return out
 
 
 
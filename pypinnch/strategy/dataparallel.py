@@ -0,0 +1,262 @@
+
+
+
+import os
+import signal
+import socket
+import traceback
+
+from torch import (
+    cat as torch_cat,
+    tensor as torch_tensor,
+    float64 as torch_float64,
+    get_num_threads as torch_get_num_threads,
+    set_num_threads as torch_set_num_threads,
+)
+from torch.distributed import (
+    init_process_group,
+    destroy_process_group,
+    all_reduce,
+    broadcast,
+)
+
+from .strategy_impl.strategy import Strategy
+from .._impl.impl2.quietmanager import QuietManager
+
+
+
+# codes for the break reasons, agreed on by the processes
+_reason2id = {
+    None: 0,
+    "tolerance": 1,
+    "maxiter": 2,
+    "plateau": 3,
+    "action": 4,
+}
+_id2reason = {v: k for k, v in _reason2id.items()}
+
+
+
+class DataParallel(Strategy):
+    """
+    Data-parallel training of a phase by local processes.
+    At the start of each call to train(), `nprocs`-1 worker processes
+    are forked, which join the main process in a process group
+    (`torch.distributed`, gloo backend, on localhost).
+    Every process trains a copy of the module on a disjoint
+    shard of every batch, and the gradients (and the loss,
+    for optimizers that evaluate the closure more than once,
+    such as LBFGS) are averaged over the processes
+    before each optimizer step, so all the copies stay identical.
+    At the end of train(), the workers exit,
+    and the main process continues with the trained module.
+
+    The processes draw the batches of the full sample sets in lockstep
+    (the random state is inherited from the main process), and each
+    process keeps its shard of the batch, so the sample sets
+    (and their checkpoints) are the same in every process.
+    The losses of the terms are averaged over the processes,
+    for the stop criteria (the tolerance, :any:`Plateau`)
+    and for the actions, and the main process decides when training stops.
+    So the batch size is the total over the processes,
+    and each process evaluates batchsize/nprocs points per iteration.
+
+    .. note::
+        CPU only. Not compatible with the Gauss-Newton optimizers,
+        or with strategies whose decisions depend on the local loss:
+        :any:`TAWeighting`, :any:`CausalWeighting`, :any:`LAWeighting`,
+        :any:`Refinement`, :any:`ImportanceBatching`,
+        or a batch-size schedule in plateau mode.
+
+    Parameters:
+
+        nprocs (integer):
+            Number of processes, including the main process. (Default: 2)
+        threads (optional integer):
+            Number of intra-op threads of each process during training.
+            If None, the threads of the main process are divided
+            among the processes. (Default: None)
+
+    """
+
+    def __init__(
+            self,
+            nprocs = 2,
+            threads = None,
+    ):
+        super().__init__(name='dataparallel')
+        if nprocs < 1:
+            raise ValueError(f"[DataParallel] nprocs must be a positive integer, received {nprocs}.")
+        self.nprocs = nprocs
+        self.threads = threads
+        # state, during a call to train()
+        self.rank = None
+        self.pids = []
+        self.threads0 = None
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        for name in ['taweighting', 'causalweighting', 'laweighting', 'refinement', 'importancebatching']:
+            if phase.strategies.using(name):
+                raise ValueError(f"[DataParallel] DataParallel is not compatible with strategy {name}.")
+        if phase.strategies.optimizer.gauss_newton():
+            raise ValueError(f"[DataParallel] DataParallel is not compatible with the Gauss-Newton optimizers.")
+        if phase.bsramp.using() and phase.bsramp.schedule["mode"] == "plateau":
+            raise ValueError(f"[DataParallel] DataParallel is not compatible with a batch-size schedule in plateau mode.")
+        if phase.config.device.type != "cpu":
+            raise ValueError(f"[DataParallel] DataParallel only supports the cpu backend, received device {phase.config.device}.")
+        if phase.batchsize < self.nprocs:
+            raise ValueError(f"[DataParallel] Batch size {phase.batchsize} is smaller than the number of processes {self.nprocs}.")
+
+
+    def start(self, phase):
+        """
+        Fork the workers and join the process group.
+        Called before the first iteration of train().
+        Returns in every process: in a worker,
+        the caller proceeds with the training loop.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+
+        """
+        self.threads0 = torch_get_num_threads()
+        threads = self.threads if self.threads is not None else max(1, self.threads0 // self.nprocs)
+        # > a free port on localhost
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.rank = 0
+        self.pids = []
+        for rank in range(1, self.nprocs):
+            pid = os.fork()
+            if pid == 0:
+                # worker
+                self.rank = rank
+                self.pids = []
+                phase.out = QuietManager()
+                break
+            self.pids.append(pid)
+        torch_set_num_threads(threads)
+        init_process_group(
+            backend="gloo",
+            init_method=f"tcp://127.0.0.1:{port}",
+            rank=self.rank,
+            world_size=self.nprocs,
+        )
+        phase.shard = (self.rank, self.nprocs)
+        if self.rank == 0:
+            phase.out.log(f"[DataParallel] {self.nprocs} processes, {threads} threads each.")
+
+
+    def reduce(self, module, loss):
+        """
+        Average the gradients of the module, and the loss,
+        over the processes. Called in the closure, after backward().
+
+        Arguments:
+
+            module (:any:`Module`):
+            loss (scalar tensor):
+
+        Returns:
+
+            the averaged loss (scalar tensor)
+
+        """
+        params = [p for p in module.parameters() if p.requires_grad]
+        # > one buffer, one collective
+        buf = torch_cat(
+            [(p.grad if p.grad is not None else p.detach()*0.0).reshape((-1,)) for p in params]
+            + [loss.detach().reshape((1,))]
+        )
+        all_reduce(buf)
+        buf /= self.nprocs
+        beg = 0
+        for p in params:
+            n = p.numel()
+            if p.grad is not None:
+                p.grad.copy_(buf[beg:beg+n].view_as(p))
+            beg += n
+        return buf[-1]
+
+
+    def reduce_losses(self, losses_ic, losses_c):
+        """
+        Average the losses of the terms over the processes.
+        Called in every evaluation of the loss, by every process.
+
+        Arguments:
+
+            losses_ic (list of scalar tensor):
+            losses_c (list of scalar tensor):
+
+        Returns:
+
+            pair of list of float: the averaged losses
+
+        """
+        x = torch_tensor([float(L) for L in losses_ic + losses_c], dtype=torch_float64)
+        all_reduce(x)
+        x /= self.nprocs
+        x = x.tolist()
+        return x[:len(losses_ic)], x[len(losses_ic):]
+
+
+    def agree(self, reason):
+        """
+        The reason to stop training (or None), decided by the main process.
+        Called once per iteration, by every process.
+        """
+        x = torch_tensor([_reason2id[reason] if self.rank == 0 else 0])
+        broadcast(x, src=0)
+        return _id2reason[int(x[0])]
+
+
+    def finish(self, phase):
+        """
+        Leave the process group. A worker exits,
+        and the main process waits for the workers.
+        Called after the last iteration of train().
+        """
+        destroy_process_group()
+        phase.shard = None
+        if self.rank != 0:
+            os._exit(0)
+        for pid in self.pids:
+            os.waitpid(pid, 0)
+        self.pids = []
+        self.rank = None
+        torch_set_num_threads(self.threads0)
+
+
+    def abort(self):
+        """
+        Called if train() raises. A worker reports the error and exits
+        (it must not unwind into the caller of train()),
+        and the main process stops the workers.
+        """
+        if self.rank is None:
+            return
+        if self.rank != 0:
+            traceback.print_exc()
+            os._exit(1)
+        for pid in self.pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        self.pids = []
+        self.rank = None
+        destroy_process_group()
+        torch_set_num_threads(self.threads0)
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nnprocs: {self.nprocs}\n"
+        out += f"threads: {self.threads}\n"
+        return out
+
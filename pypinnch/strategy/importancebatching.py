@@ -0,0 +1,90 @@
+
+
+
+from .strategy_impl.strategy import Strategy
+
+from .._impl.residual import DataResidual
+
+
+
+class ImportanceBatching(Strategy):
+    """
+    Importance batching draws the batches of the (pde) constraints
+    with probability proportional to a per-point estimate of the loss,
+    instead of traversing a shuffled sample set, so that
+    the points which carry the most loss are visited most often.
+    The estimates are refreshed lazily from the residuals that are
+    computed anyway during training, and the residuals of a batch
+    are reweighted by the importance weights 1/(N p),
+    so that the loss remains an unbiased estimate of the loss
+    over the sample set, cf. :any:`Importance`.
+
+    The ages and epochs of the sample sets are counted
+    by the number of points drawn, as usual.
+
+    .. note::
+        Data constraints are not affected, and constraints
+        with a custom batch are not supported.
+        For a sample group, cf. :any:`Constraint`, the estimates
+        are refreshed by the residual of each constraint in the group.
+
+    Parameters:
+
+        decay (scalar):
+            Decay of the moving average of the squared residual
+            of each point, the weight of the previous estimate.
+            (Default: 0.9)
+        uniform (scalar):
+            Fraction of the probability that is uniform,
+            so that every point remains reachable, and so that the
+            importance weights are bounded by 1/uniform.
+            (Default: 0.1)
+        constraints (optional list of string):
+            Labels of the constraints to batch by importance.
+            If None, all the (pde) constraints. (Default: None)
+
+    """
+
+    def __init__(
+            self,
+            decay = 0.9,
+            uniform = 0.1,
+            constraints = None,
+    ):
+        super().__init__(name='importancebatching')
+        if decay < 0.0 or decay >= 1.0:
+            raise ValueError(f"[ImportanceBatching] decay must satisfy 0 <= decay < 1, received {decay}.")
+        if uniform <= 0.0 or uniform > 1.0:
+            raise ValueError(f"[ImportanceBatching] uniform must satisfy 0 < uniform <= 1, received {uniform}.")
+        self.decay = decay
+        self.uniform = uniform
+        self.constraints = constraints
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        for lb in phase.samplesets.unique_labels():
+            constraint = phase.problem.constraints[lb]
+            if isinstance(constraint.residual, DataResidual):
+                continue
+            if self.constraints is not None and lb not in self.constraints:
+                continue
+            if constraint.custom_batch is not None:
+                raise ValueError(f"[ImportanceBatching] Custom batch is not supported (constraint {lb}).")
+            phase.samplesets.csss[lb].cyl.set_importance(
+                decay=self.decay,
+                uniform=self.uniform,
+            )
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\ndecay: {self.decay}\n"
+        out += f"uniform: {self.uniform}\n"
+        out += f"constraints: {self.constraints}\n"
+        return out
+
+
+
@@ -1,9 +1,13 @@
+from .strategy_impl.strategy import Strategy
 
+from torch import (
+    dot as torch_dot,
+    randint as torch_randint,
+)
+from torch.autograd import grad as torch_grad
 
-
-
-
-from .strategy_impl.strategy import Strategy
+from math import exp, sqrt
+import random
 
 
 
@@ -54,28 +58,194 @@ class LAWeighting(Strategy):
             # calculate ...
             return lambdas_ic, lambdas_c
 
+    There are also built-in strategies, selected by a string:
+
+        - gradnorm: the weight of a loss term is inversely proportional
+            to the norm of its gradient, so that the terms contribute
+            gradients of similar size [arXiv:2001.04536].
+        - ntk: the weight of a loss term is inversely proportional
+            to the trace of its neural tangent kernel,
+            the sum of the squared norms of the gradients of its
+            residuals, so that the terms converge at similar
+            rates [arXiv:2007.14527]. The trace is estimated
+            by Hutchinson's estimator, with Rademacher probes.
+        - relobralo: relative loss balancing with random lookback,
+            the weights are a softmax of the ratio of each loss to
+            its value at the previous iteration, or (by random lookback)
+            at the first iteration [arXiv:2110.09813].
+            No gradients are needed.
+
+    For gradnorm and ntk, the weights are estimated every `every`
+    iterations, using the gradients with respect to the parameters
+    of the final layer of the network (the default), which are
+    inexpensive, since the backward pass stops at the final layer,
+    and the estimates are smoothed by a moving average.
+    The built-in weights are normalized so that the greatest weight is 1.
+
     Parameters:
 
-        strategy (optional callable):
+        strategy (optional callable or string):
+            A callable, or one of "gradnorm", "ntk", "relobralo".
+            (Default: None, all weights are 1)
+        every (integer):
+            gradnorm, ntk: Number of iterations between estimates. (Default: 100)
+        alpha (scalar):
+            gradnorm, ntk: Weight of the previous value in the moving average.
+            relobralo: Weight of the lookback to the first iteration
+            (the paper's alpha). (Default: 0.9)
+        params (string):
+            gradnorm, ntk: "last", the parameters of the final layer,
+            or "all", all of the parameters. (Default: "last")
+        nprobes (integer):
+            ntk: Number of Hutchinson probes. (Default: 1)
+        temperature (scalar):
+            relobralo: Temperature of the softmax. (Default: 0.1)
+        rho (scalar):
+            relobralo: Expectation of the Bernoulli variable that
+            keeps the previous weights (the random lookback). (Default: 0.999)
 
     """
 
     def __init__(
             self,
             strategy = None,
+            every = 100,
+            alpha = 0.9,
+            params = "last",
+            nprobes = 1,
+            temperature = 0.1,
+            rho = 0.999,
     ):
         super().__init__(name='laweighting')
+        self.mode = None
         if callable(strategy):
             self.strategy = strategy
         elif strategy is None:
             self.strategy = no_strategy
+        elif strategy in ["gradnorm", "ntk", "relobralo"]:
+            self.strategy = None
+            self.mode = strategy
+        else:
+            raise ValueError(f"[LAWeighting] Unrecognized strategy {strategy}.")
+        if params not in ["last", "all"]:
+            raise ValueError(f"[LAWeighting] Unrecognized params {params}, use last or all.")
+        if every < 1:
+            raise ValueError(f"[LAWeighting] every must be a positive integer, received {every}.")
+        self.every = every
+        self.alpha = alpha
+        self.params = params
+        self.nprobes = nprobes
+        self.temperature = temperature
+        self.rho = rho
+        # state
+        self.lambdas = None
+        self.last = None
+        # relobralo: losses at the first and the previous iteration
+        self.L0 = None
+        self.Lprev = None
 
 
     def init(self, phase):
-        pass
+        self.lambdas = None
+        self.last = None
+        self.L0 = None
+        self.Lprev = None
 
 
-    def get(self, losses_ic, Lic, losses_c, Lc, epoch):
+    def needs_residuals(self, iteration):
+        """
+        Whether the residual vectors of the loss terms
+        are needed at this iteration, cf. :any:`Phase`.collect.
+        """
+        return self.mode == "ntk" and self._due(iteration)
+
+
+    def _due(self, iteration):
+        return iteration % self.every == 0 and iteration != self.last
+
+
+    def _parameters(self, phase):
+        module = phase.hub.modules[0]
+        if self.params == "last" and hasattr(module, 'layers'):
+            out = list(module.layers[-1].parameters())
+        else:
+            out = list(module.parameters())
+        return [p for p in out if p.requires_grad]
+
+
+    def _gradnorms(self, phase, losses):
+        params = self._parameters(phase)
+        out = []
+        for L in losses:
+            if not L.requires_grad:
+                out.append(0.0)
+                continue
+            gs = torch_grad(L, params, retain_graph=True, allow_unused=True)
+            out.append(sqrt(sum(float((g*g).sum()) for g in gs if g is not None)))
+        return out
+
+
+    def _ntk_traces(self, phase, rvs):
+        params = self._parameters(phase)
+        out = []
+        for rv in rvs:
+            if not rv.requires_grad:
+                out.append(0.0)
+                continue
+            tr = 0.0
+            for _ in range(self.nprobes):
+                # Rademacher probe: E[|J^T v|^2] = tr(J J^T)
+                v = 2.0*torch_randint(0, 2, rv.shape, device=rv.device).to(rv.dtype) - 1.0
+                gs = torch_grad(torch_dot(rv, v), params, retain_graph=True, allow_unused=True)
+                tr += sum(float((g*g).sum()) for g in gs if g is not None)
+            out.append(tr/self.nprobes)
+        return out
+
+
+    def _inverse(self, xs):
+        """
+        Weights inversely proportional to xs,
+        smoothed, and normalized to a greatest weight of 1.
+        """
+        positive = [x for x in xs if x > 0.0]
+        if len(positive) == 0:
+            return len(xs)*[1.0]
+        xmin = min(positive)
+        new = [xmin/x if x > 0.0 else 1.0 for x in xs]
+        if self.lambdas is None or len(self.lambdas) != len(new):
+            lambdas = new
+        else:
+            lambdas = [self.alpha*l + (1.0 - self.alpha)*n for l, n in zip(self.lambdas, new)]
+        lmax = max(lambdas)
+        return [l/lmax for l in lambdas]
+
+
+    def _relobralo(self, Ls):
+        m = len(Ls)
+        if self.L0 is None or len(self.L0) != m:
+            self.L0 = Ls
+            self.Lprev = Ls
+            self.lambdas = m*[1.0]
+            return
+
+        def bal(Lref):
+            xs = [L/(self.temperature*Lr + 1e-12) for L, Lr in zip(Ls, Lref)]
+            xmax = max(xs)
+            es = [exp(x - xmax) for x in xs]
+            s = sum(es)
+            return [m*e/s for e in es]
+
+        bal0 = bal(self.L0)
+        balprev = bal(self.Lprev)
+        keep = 1.0 if random.random() < self.rho else 0.0
+        self.lambdas = [
+            self.alpha*(keep*l + (1.0 - keep)*b0) + (1.0 - self.alpha)*bp
+            for l, b0, bp in zip(self.lambdas, bal0, balprev)
+        ]
+        self.Lprev = Ls
+
+
+    def get(self, losses_ic, Lic, losses_c, Lc, epoch, iteration=None, phase=None):
         """
         Called by a :any:`Phase` during training,
         to retrieve the weights on losses set by the loss-aware
@@ -88,18 +258,79 @@ class LAWeighting(Strategy):
             losses_c (list of scalar): losses broken out, for each constraint
             Lc (scalar): sum of all losses in losses_c
             epoch (integer): present epoch
+            iteration (optional integer): present iteration (built-in strategies)
+            phase (optional :any:`Phase`): the phase (built-in strategies)
 
         Returns:
 
             pair of list of scalar
 
         """
-        lambdas_ic, lambdas_c = self.strategy(
-            losses_ic=losses_ic,
-            Lic=Lic,
-            losses_c=losses_c,
-            Lc=Lc,
-            epoch=epoch,
-        )
-        return lambdas_ic, lambdas_c
+        if self.mode is None:
+            lambdas_ic, lambdas_c = self.strategy(
+                losses_ic=losses_ic,
+                Lic=Lic,
+                losses_c=losses_c,
+                Lc=Lc,
+                epoch=epoch,
+            )
+            return lambdas_ic, lambdas_c
+        nic = len(losses_ic)
+        losses = losses_ic + losses_c
+        if self.mode == "relobralo":
+            # > once per iteration (the closure may be called more than once)
+            if iteration != self.last or self.lambdas is None:
+                self.last = iteration
+                self._relobralo([float(L) for L in losses])
+            lmax = max(self.lambdas)
+            lambdas = [l/lmax for l in self.lambdas]
+        else:
+            if self._due(iteration) or self.lambdas is None or len(self.lambdas) != len(losses):
+                self.last = iteration
+                if self.mode == "gradnorm":
+                    xs = self._gradnorms(phase, losses)
+                elif len(phase.rvs_ic) + len(phase.rvs_c) == len(losses):
+                    xs = self._ntk_traces(phase, phase.rvs_ic + phase.rvs_c)
+                else:
+                    # the residuals were not collected, e.g. first call on resume
+                    xs = self._gradnorms(phase, losses)
+                self.lambdas = self._inverse(xs)
+            lambdas = self.lambdas
+        return lambdas[:nic], lambdas[nic:]
+
+
+    def state_dict(self):
+        if self.mode is None:
+            return None
+        return {
+            "lambdas": self.lambdas,
+            "last": self.last,
+            "L0": self.L0,
+            "Lprev": self.Lprev,
+        }
+
+
+    def load_state_dict(self, state):
+        if state is None:
+            return
+        self.lambdas = state["lambdas"]
+        self.last = state["last"]
+        self.L0 = state["L0"]
+        self.Lprev = state["Lprev"]
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nstrategy: {self.mode if self.mode is not None else self.strategy.__name__}\n"
+        if self.mode in ["gradnorm", "ntk"]:
+            out += f"every: {self.every}\n"
+            out += f"alpha: {self.alpha}\n"
+            out += f"params: {self.params}\n"
+        if self.mode == "ntk":
+            out += f"nprobes: {self.nprobes}\n"
+        if self.mode == "relobralo":
+            out += f"alpha: {self.alpha}\n"
+            out += f"temperature: {self.temperature}\n"
+            out += f"rho: {self.rho}\n"
+        return out
 
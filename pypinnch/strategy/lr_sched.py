@@ -99,6 +99,18 @@ class LRSched(Strategy):
             )
 
 
+    def state_dict(self):
+        return {
+            "lrsched": self._lrsched.state_dict() if self._lrsched is not None else None,
+        }
+
+
+    def load_state_dict(self, state):
+        # Invariant: the optimizer state is already loaded.
+        if self._lrsched is not None and state["lrsched"] is not None:
+            self._lrsched.load_state_dict(state["lrsched"])
+
+
     def step(self, optimizer, phase, iteration = None):
         # todo review, it should not write into phase, phase can do that
         if self.id == 0:
@@ -0,0 +1,177 @@
+
+
+
+from .strategy_impl.strategy import Strategy
+
+from .._impl.impl2.losswindow import LossWindow
+
+
+
+class Plateau(Strategy):
+    """
+    Plateau is an early termination policy for a call to train().
+    Many steps reach a plateau well before the kit's
+    max_iterations, after they have converged as far as they will.
+    This strategy observes the (unweighted) loss history
+    over windows of iterations, and signals the training loop
+    to stop when the relative improvement of the windowed
+    mean loss has been less than `rtol` for `patience`
+    consecutive windows.
+
+    The loss values observed are the host values
+    already computed by the loss routines,
+    so that the test does not incur any additional device syncs.
+
+    .. note::
+        In the case of graded training, any of the parameters
+        can be a list with one entry per level, in the same manner
+        as the kits set via :any:`Grading`.
+        If :any:`TAWeighting` is used, plateau termination
+        is only considered after TAW is finished,
+        and the loss history is reset at each TAW stage.
+
+    Parameters:
+
+        window (integer or list of integer):
+            Number of iterations per window. (Default: 100)
+        rtol (scalar or list of scalar):
+            Relative improvement of the windowed mean loss
+            below which a window is counted as failed.
+            (Default: 1e-3)
+        patience (integer or list of integer):
+            Number of consecutive failed windows
+            before training is terminated. (Default: 3)
+        warmup (integer or list of integer):
+            Number of iterations at the start of train()
+            during which the loss is not observed. (Default: 0)
+
+    """
+
+    def __init__(
+            self,
+            window = 100,
+            rtol = 1e-3,
+            patience = 3,
+            warmup = 0,
+    ):
+        super().__init__(name='plateau')
+        self.window = window
+        self.rtol = rtol
+        self.patience = patience
+        self.warmup = warmup
+        # state
+        self.losswindow = None
+        self.iteration = 0
+        self.warmup_ = 0
+        self.loss = None
+        self.reason = None
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        level = phase.L
+        self.losswindow = LossWindow(
+            window=self._get(self.window, level),
+            rtol=self._get(self.rtol, level),
+            patience=self._get(self.patience, level),
+        )
+        self.warmup_ = self._get(self.warmup, level)
+        self.iteration = 0
+        self.loss = None
+        self.reason = None
+
+
+    def _get(self, x, level):
+        if isinstance(x, (list, tuple)):
+            if level >= len(x):
+                raise ValueError(f"[Plateau] Set values for all levels in graded case, received {x}.")
+            return x[level]
+        return x
+
+
+    def set_loss(self, L):
+        """
+        Set the loss observed during the current iteration.
+        If the closure is called more than once during an iteration,
+        the last value is kept.
+
+        Arguments:
+
+            L (scalar):
+                Host value of the (unweighted) loss.
+
+        """
+        self.loss = L
+
+
+    def step(self):
+        """
+        Called once per iteration, after the optimizer step.
+        Pushes the loss of the iteration into the window.
+        """
+        self.iteration += 1
+        if self.loss is None or self.iteration <= self.warmup_:
+            return
+        if self.losswindow.push(self.loss):
+            if self.losswindow.plateau():
+                lw = self.losswindow
+                self.reason = f"relative improvement {lw.improvement:.3e} < rtol {lw.rtol} " \
+                    + f"over {lw.patience} consecutive windows of {lw.window} iterations " \
+                    + f"(windowed mean loss {lw.mean:.3e}, best {lw.best:.3e})"
+        self.loss = None
+
+
+    def reset(self):
+        """
+        Forget the loss history, e.g., when the loss function changes
+        due to a stage of time-adaptive weighting.
+        """
+        self.losswindow.reset()
+        self.loss = None
+        self.reason = None
+
+
+    def state_dict(self):
+        lw = self.losswindow
+        return {
+            "iteration": self.iteration,
+            "loss": self.loss,
+            "reason": self.reason,
+            "losswindow": {
+                "acc": lw.acc,
+                "n": lw.n,
+                "best": lw.best,
+                "mean": lw.mean,
+                "improvement": lw.improvement,
+                "nfail": lw.nfail,
+            },
+        }
+
+
+    def load_state_dict(self, state):
+        self.iteration = state["iteration"]
+        self.loss = state["loss"]
+        self.reason = state["reason"]
+        for key in state["losswindow"]:
+            setattr(self.losswindow, key, state["losswindow"][key])
+
+
+    def finished(self):
+        """
+        Whether the loss has reached a plateau.
+        """
+        return self.reason is not None
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nwindow: {self.window}\n"
+        out += f"rtol: {self.rtol}\n"
+        out += f"patience: {self.patience}\n"
+        out += f"warmup: {self.warmup}\n"
+        return out
+
+
+
@@ -0,0 +1,256 @@
+
+
+
+from torch import (
+    randperm as torch_randperm,
+    topk as torch_topk,
+)
+
+from .strategy_impl.strategy import Strategy
+
+from .._impl.residual import DataResidual
+
+
+
+class Refinement(Strategy):
+    """
+    Residual-based adaptive refinement (RAR) of the sample sets.
+    A sample set is drawn once from the source, so that
+    regions where the residual is large, such as shocks
+    and boundary layers, are sampled at the same density
+    as regions where the solution is quiet.
+    With this strategy, every `every` iterations of train(),
+    a pool of candidate points is drawn from the source of each
+    (pde) constraint and scored by the squared residual,
+    evaluated without building a graph through the parameters.
+    The `k` candidates with the largest residual are added to the
+    sample set, as long as the sample set is within its memory budget.
+    Once the budget is reached, the candidates replace the points
+    with the lowest residual among a random sample of the sample set,
+    if their residual is larger.
+
+    In "evolve" mode, the sample sets do not grow. Instead,
+    at the end of each age of a sample set, all of its points
+    are scored, the points with residual above the mean residual
+    are retained, and the rest are redrawn from the source,
+    in place, cf. :any:`Cylinder.evolve`. The memory and the cost
+    of an iteration stay constant, and the points still
+    concentrate where the residual is large.
+    This is evolutionary sampling, or retain-resample-release (R3).
+
+    The shuffle, age and epoch logic of the sample set are unchanged,
+    cf. :any:`Cylinder.grow`. Refined points are advanced in time
+    with the sample set, and the sample set is drawn anew
+    at the start of the next stride.
+
+    .. note::
+        Refinement is not compatible with :any:`Grading`,
+        because grading relies on the structure of the sample set.
+        Data constraints and constraints without a source are not refined.
+
+    Parameters:
+
+        mode (string):
+
+            - grow: refine by adding and replacing points periodically.
+            - evolve: retain and resample the points at each age.
+
+            (Default: grow)
+
+        every (integer):
+            Number of iterations between refinements,
+            in grow mode. (Default: 1000)
+        npool (integer):
+            Number of candidate points drawn for each refinement,
+            also the size of the random sample of the sample set
+            that is scored when points are replaced. (Default: 1024)
+        k (integer):
+            Number of points added or replaced at each refinement.
+            (Default: 64)
+        budget (scalar):
+            Maximum size of a sample set, as a multiple of its
+            initial size. (Default: 2.0)
+        constraints (optional list of string):
+            Labels of the constraints to refine.
+            If None, all the (pde) constraints are refined. (Default: None)
+        chunk (integer):
+            Number of points scored at a time. (Default: 4096)
+
+    """
+
+    def __init__(
+            self,
+            mode = "grow",
+            every = 1000,
+            npool = 1024,
+            k = 64,
+            budget = 2.0,
+            constraints = None,
+            chunk = 4096,
+    ):
+        super().__init__(name='refinement')
+        if mode == "grow":
+            self.mode_id = 0
+        elif mode == "evolve":
+            self.mode_id = 1
+        else:
+            raise ValueError(f"[Refinement] Unrecognized mode {mode}.")
+        self.mode = mode
+        if every < 1:
+            raise ValueError(f"[Refinement] every must be a positive integer, received {every}.")
+        if k < 1 or k > npool:
+            raise ValueError(f"[Refinement] k must satisfy 1 <= k <= npool, received k = {k}, npool = {npool}.")
+        if budget < 1.0:
+            raise ValueError(f"[Refinement] budget must be at least 1.0, received {budget}.")
+        self.every = every
+        self.npool = npool
+        self.k = k
+        self.budget = budget
+        self.constraints = constraints
+        self.chunk = chunk
+        # state: the age of each sample set when last evolved
+        self.ages = {}
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        if phase.strategies.using('grading'):
+            raise ValueError(f"[Refinement] Refinement is not compatible with Grading.")
+        self.ages = {lb: phase.samplesets.csss[lb].age() for lb in self._labels(phase)}
+
+
+    def state_dict(self):
+        return {
+            "ages": self.ages,
+        }
+
+
+    def load_state_dict(self, state):
+        self.ages = state["ages"]
+
+
+    def _labels(self, phase):
+        """
+        Helper to list the labels of the constraints to refine.
+        Constraints in a sample group share a sample set,
+        which is refined once, by the first label in the group.
+        """
+        out = []
+        for lb in phase.samplesets.unique_labels():
+            constraint = phase.problem.constraints[lb]
+            if isinstance(constraint.residual, DataResidual) or constraint.source is None:
+                continue
+            if self.constraints is None or lb in self.constraints:
+                out.append(lb)
+        return out
+
+
+    def step(self, phase, iteration):
+        """
+        Called once per iteration, after the optimizer step.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+            iteration (integer):
+                The iteration of train().
+
+        """
+        if self.mode_id == 0:
+            if (iteration+1) % self.every != 0:
+                return
+            for lb in self._labels(phase):
+                self.refine(phase=phase, lb=lb)
+        else:
+            for lb in self._labels(phase):
+                age = phase.samplesets.csss[lb].age()
+                if age != self.ages[lb]:
+                    self.ages[lb] = age
+                    self.evolve(phase=phase, lb=lb)
+
+
+    def refine(self, phase, lb):
+        """
+        Refine the sample set of a constraint.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+            lb (string):
+                label of the constraint.
+
+        """
+        css = phase.samplesets.csss[lb]
+        cyl = css.cyl
+        constraint = phase.problem.constraints[lb]
+        # > score the candidates and select the top k
+        X = css.candidates(n=self.npool, SPL=phase.samplesets.SPL)
+        scores = phase.evaluate_residual(
+            constraint=constraint,
+            X=X,
+            chunk=self.chunk,
+        )
+        k = min(self.k, X.shape[0])
+        scores, idx = torch_topk(scores, k)
+        X = X[idx]
+        room = int(self.budget*cyl.size0) - cyl.size()
+        if room > 0:
+            # > grow
+            n = min(room, k)
+            cyl.grow(X[:n])
+            msg = f"added {n} points"
+        else:
+            # > replace the lowest-scoring points of a random sample
+            idx0 = torch_randperm(cyl.size())[:self.npool]
+            scores0 = phase.evaluate_residual(
+                constraint=constraint,
+                X=cyl.X()[idx0],
+                chunk=self.chunk,
+            )
+            k = min(k, idx0.shape[0])
+            scores0, j = torch_topk(scores0, k, largest=False)
+            # Invariant: scores is descending, scores0 is ascending.
+            mask = scores[:k] > scores0
+            cyl.replace(idx0[j][mask], X[:k][mask])
+            msg = f"replaced {int(mask.sum())} points"
+        phase.out.log(f"[Refinement] constraint {lb}: {msg}, size {cyl.size()}, max residual {float(scores[0]):.3e}.")
+
+
+    def evolve(self, phase, lb):
+        """
+        Evolve the sample set of a constraint.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+            lb (string):
+                label of the constraint.
+
+        """
+        css = phase.samplesets.csss[lb]
+        cyl = css.cyl
+        scores = phase.evaluate_residual(
+            constraint=phase.problem.constraints[lb],
+            X=cyl.X(),
+            chunk=self.chunk,
+        )
+        nreplace = int((scores <= scores.mean()).sum())
+        X = css.candidates(n=nreplace, SPL=phase.samplesets.SPL)
+        n = cyl.evolve(scores=scores, X=X)
+        phase.out.log(f"[Refinement] constraint {lb}: retained {cyl.size()-n} points, resampled {n} points, mean residual {float(scores.mean()):.3e}.")
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nmode: {self.mode}\n"
+        out += f"every: {self.every}\n"
+        out += f"npool: {self.npool}\n"
+        out += f"k: {self.k}\n"
+        out += f"budget: {self.budget}\n"
+        out += f"constraints: {self.constraints}\n"
+        return out
+
+
+
@@ -0,0 +1,140 @@
+
+
+
+from .strategy_impl.strategy import Strategy
+
+
+
+class SpatialGrading(Strategy):
+    """
+    SpatialGrading is a coarse-to-fine strategy in space,
+    analogous to :any:`Grading` in time.
+    Each call to train() starts on a coarse subset of
+    the sample set, the points that extend a prefix of the base
+    sample of each constraint, and doubles the active spatial set
+    at each level, until the full sample set is active.
+    Since the base is drawn in one pass, the prefixes are nested,
+    and if the base is drawn by a low-discrepancy sampler,
+    so is each prefix. No points are regenerated:
+    the sample set is only reordered, cf. :any:`Cylinder.set_spatial_level`.
+
+    So the early iterations of a step, which are spent on
+    the coarse reduction of the error, train on a smaller set,
+    while the final iterations train on the full set.
+
+    .. note::
+        Not compatible with :any:`Grading`, :any:`Refinement`,
+        or :any:`ImportanceBatching`.
+        Constraints without a source (0-dimensional) are not graded.
+
+    Parameters:
+
+        nlevels (integer):
+            Number of levels. At level 0, the active set
+            is 1/2^nlevels of the sample set. (Default: 3)
+        every (integer or list of integer):
+            Number of iterations at each level before
+            advancing to the next level. If a list, one entry per level
+            (before the final level). (Default: 1000)
+
+    """
+
+    def __init__(
+            self,
+            nlevels = 3,
+            every = 1000,
+    ):
+        super().__init__(name='spatialgrading')
+        if nlevels < 1:
+            raise ValueError(f"[SpatialGrading] nlevels must be a positive integer, received {nlevels}.")
+        if isinstance(every, (list, tuple)) and len(every) != nlevels:
+            raise ValueError(f"[SpatialGrading] Set every for each of the {nlevels} levels, received {every}.")
+        self.nlevels = nlevels
+        self.every = every
+        # state
+        self.level = 0
+        self.count = 0
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        for name in ['grading', 'refinement', 'importancebatching']:
+            if phase.strategies.using(name):
+                raise ValueError(f"[SpatialGrading] SpatialGrading is not compatible with strategy {name}.")
+        self.level = 0
+        self.count = 0
+        if phase.resume is None:
+            # (when resuming, the sample sets are restored at the saved level)
+            self._set(phase)
+
+
+    def _every(self):
+        if isinstance(self.every, (list, tuple)):
+            return self.every[self.level]
+        return self.every
+
+
+    def _set(self, phase):
+        for css in phase.samplesets.unique_csss():
+            css.set_spatial_level(self.level)
+        phase.out.log(f"[SpatialGrading] level {self.level}.")
+
+
+    def step(self, phase):
+        """
+        Called once per iteration, after the optimizer step.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+
+        """
+        if self.finished():
+            return
+        self.count += 1
+        if self.count == self._every():
+            self.level += 1
+            self.count = 0
+            self._set(phase)
+
+
+    def finish(self, phase):
+        """
+        Activate the full sample set, e.g.,
+        if train() ends before the final level.
+        """
+        if not self.finished():
+            self.level = self.nlevels
+            self.count = 0
+            self._set(phase)
+
+
+    def finished(self):
+        """
+        Whether the full sample set is active.
+        """
+        return self.level == self.nlevels
+
+
+    def state_dict(self):
+        return {
+            "level": self.level,
+            "count": self.count,
+        }
+
+
+    def load_state_dict(self, state):
+        self.level = state["level"]
+        self.count = state["count"]
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\nnlevels: {self.nlevels}\n"
+        out += f"every: {self.every}\n"
+        return out
+
+
+
@@ -1,8 +1,10 @@
 __all__ = [
+    "GaussNewton",
     "Strategies",
     "Strategy",
 ]
 
+from .gaussnewton import GaussNewton
 from .strategies import Strategies
 from .strategy import Strategy
 
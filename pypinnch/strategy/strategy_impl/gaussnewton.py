@@ -0,0 +1,251 @@
+
+
+
+import torch
+from torch.optim import Optimizer as TorchOptimizer
+
+
+
+class GaussNewton(TorchOptimizer):
+    """
+    Damped Gauss-Newton (Levenberg-Marquardt) optimizer
+    for a least squares loss L = |r|^2, where r is the
+    (weighted) residual vector of all the loss terms.
+    Each step solves the damped normal equations
+
+        (J^T J + damping I) d = -J^T r,
+
+    where J is the Jacobian of r with respect to the parameters,
+    and then performs a backtracking (Armijo) line search along d.
+    For the PINN residual of a linear PDE, the Gauss-Newton matrix
+    is the Gramian of energy natural gradient descent.
+
+    The closure passed to step() must return the residual vector r,
+    with a graph through the parameters. It does not call backward().
+
+    There are two solvers:
+
+        - cholesky: J is formed by batched vector-Jacobian products,
+            and the equations are solved by a Cholesky factorization.
+            If there are fewer residuals than parameters,
+            the (smaller) Gram matrix J J^T is factored instead.
+            Memory is O(m n) for m residuals and n parameters,
+            suitable for small to medium networks.
+        - cg: the equations are solved by conjugate gradients, and the
+            products with J^T J are Jacobian-free, using a double
+            vector-Jacobian product for J v. Memory is bounded
+            by a few copies of the graph of r.
+
+    Parameters:
+
+        params: parameters to optimize.
+        lr (scalar):
+            initial step length of the line search. (Default: 1.0)
+        damping (scalar):
+            damping added to the diagonal. (Default: 1e-3)
+        solver (string):
+            "cholesky" or "cg". (Default: "cg")
+        cg_max_iter (integer):
+            maximum number of CG iterations. (Default: 50)
+        cg_tol (scalar):
+            relative residual tolerance of CG. (Default: 1e-6)
+        ls_max (integer):
+            maximum number of line search steps. (Default: 12)
+        ls_factor (scalar):
+            factor by which the step length is reduced. (Default: 0.5)
+        ls_c (scalar):
+            sufficient decrease constant (Armijo). (Default: 1e-4)
+
+    """
+
+    def __init__(
+            self,
+            params,
+            lr = 1.0,
+            damping = 1e-3,
+            solver = "cg",
+            cg_max_iter = 50,
+            cg_tol = 1e-6,
+            ls_max = 12,
+            ls_factor = 0.5,
+            ls_c = 1e-4,
+    ):
+        if solver not in ["cholesky", "cg"]:
+            raise ValueError(f"Unrecognized Gauss-Newton solver {solver}")
+        defaults = dict(
+            lr=lr,
+            damping=damping,
+            solver=solver,
+            cg_max_iter=cg_max_iter,
+            cg_tol=cg_tol,
+            ls_max=ls_max,
+            ls_factor=ls_factor,
+            ls_c=ls_c,
+        )
+        super().__init__(params, defaults)
+        if len(self.param_groups) != 1:
+            raise ValueError(f"GaussNewton doesn't support per-parameter options (parameter groups)")
+
+
+    def _params(self):
+        return [p for p in self.param_groups[0]["params"] if p.requires_grad]
+
+
+    def _flat(self, xs, params):
+        return torch.cat([
+            (x if x is not None else torch.zeros_like(p)).reshape((-1,))
+            for x, p in zip(xs, params)
+        ])
+
+
+    def _unflat(self, v, params):
+        out = []
+        beg = 0
+        for p in params:
+            n = p.numel()
+            out.append(v[beg:beg+n].view_as(p))
+            beg += n
+        return out
+
+
+    def _solve_cholesky(self, r, params, damping):
+        m = r.shape[0]
+        eye = torch.eye(m, dtype=r.dtype, device=r.device)
+        rows = torch.autograd.grad(
+            r,
+            params,
+            grad_outputs=eye,
+            is_grads_batched=True,
+            retain_graph=True,
+            allow_unused=True,
+        )
+        J = torch.cat([
+            (row if row is not None else torch.zeros((m,) + p.shape, dtype=r.dtype, device=r.device)).reshape((m, -1))
+            for row, p in zip(rows, params)
+        ], dim=1)
+        r = r.detach()
+        n = J.shape[1]
+        if m < n:
+            # d = -J^T (J J^T + damping I)^{-1} r
+            K = J @ J.T + damping*torch.eye(m, dtype=r.dtype, device=r.device)
+            y = torch.cholesky_solve(r.reshape((-1, 1)), torch.linalg.cholesky(K))
+            d = -(J.T @ y).reshape((-1,))
+        else:
+            # d = -(J^T J + damping I)^{-1} J^T r
+            G = J.T @ J + damping*torch.eye(n, dtype=r.dtype, device=r.device)
+            y = torch.cholesky_solve((J.T @ r).reshape((-1, 1)), torch.linalg.cholesky(G))
+            d = -y.reshape((-1,))
+        return d
+
+
+    def _solve_cg(self, r, params, g, damping, max_iter, tol):
+        # J v via double vector-Jacobian product:
+        # with u a dummy vector, J^T u is linear in u, and J v = d(v . J^T u)/du.
+        u = torch.zeros_like(r, requires_grad=True)
+        JTu = torch.autograd.grad(
+            r,
+            params,
+            grad_outputs=u,
+            create_graph=True,
+            allow_unused=True,
+        )
+        JTu = [x if x is not None else torch.zeros_like(p) for x, p in zip(JTu, params)]
+
+        def Gv(v):
+            Jv, = torch.autograd.grad(
+                JTu,
+                u,
+                grad_outputs=self._unflat(v, params),
+                retain_graph=True,
+            )
+            JTJv = torch.autograd.grad(
+                r,
+                params,
+                grad_outputs=Jv.detach(),
+                retain_graph=True,
+                allow_unused=True,
+            )
+            return self._flat(JTJv, params) + damping*v
+
+        b = -g
+        x = torch.zeros_like(b)
+        res = b.clone()
+        p = res.clone()
+        rr = torch.dot(res, res)
+        bnorm2 = float(rr)
+        for _ in range(max_iter):
+            if float(rr) <= tol*tol*bnorm2:
+                break
+            Ap = Gv(p)
+            alpha = rr/torch.dot(p, Ap)
+            x = x + alpha*p
+            res = res - alpha*Ap
+            rr_ = torch.dot(res, res)
+            p = res + (rr_/rr)*p
+            rr = rr_
+        return x
+
+
+    def step(self, closure):
+        """
+        Perform a Gauss-Newton step.
+
+        Arguments:
+
+            closure (callable):
+                returns the residual vector.
+
+        Returns:
+
+            loss (scalar tensor)
+
+        """
+        group = self.param_groups[0]
+        params = self._params()
+        r = closure()
+        loss = torch.dot(r, r)
+        # > J^T r, half the gradient of the loss
+        g = self._flat(torch.autograd.grad(
+            r,
+            params,
+            grad_outputs=r.detach(),
+            retain_graph=True,
+            allow_unused=True,
+        ), params)
+        # > search direction
+        if group["solver"] == "cholesky":
+            d = self._solve_cholesky(r, params, group["damping"])
+        else:
+            d = self._solve_cg(r, params, g, group["damping"], group["cg_max_iter"], group["cg_tol"])
+        del r
+        # > backtracking line search
+        loss0 = float(loss)
+        slope = 2.0*float(torch.dot(g, d))
+        if slope >= 0.0:
+            # not a descent direction, fall back to the gradient
+            d = -g
+            slope = -2.0*float(torch.dot(g, g))
+        with torch.no_grad():
+            x0 = [p.detach().clone() for p in params]
+        ds = self._unflat(d, params)
+        t = group["lr"]
+        accepted = False
+        for _ in range(group["ls_max"]):
+            with torch.no_grad():
+                for p, p0, dp in zip(params, x0, ds):
+                    p.copy_(p0 + t*dp)
+            r = closure()
+            loss1 = float(torch.dot(r, r))
+            del r
+            if loss1 <= loss0 + group["ls_c"]*t*slope:
+                accepted = True
+                break
+            t *= group["ls_factor"]
+        if not accepted:
+            with torch.no_grad():
+                for p, p0 in zip(params, x0):
+                    p.copy_(p0)
+        return loss.detach()
+
+
+
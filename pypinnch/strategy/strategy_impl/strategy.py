@@ -18,6 +18,20 @@ class Strategy:
     def init(self, phase):
         raise NotImplementedError(f"[Strategy:{self.name}] init method undefined")
 
+    def state_dict(self):
+        """
+        State of the strategy during a call to train(),
+        for the purpose of checkpointing.
+        Stateless strategies return None.
+        """
+        return None
+
+    def load_state_dict(self, state):
+        """
+        Inverse of state_dict(). Called after init().
+        """
+        pass
+
     def __str__(self):
         out = f"Strategy:{self.name}"
         return out
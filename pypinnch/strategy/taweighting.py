@@ -263,6 +263,33 @@ class TAWeighting(Strategy):
         return self.stage == self.nstages
 
 
+    def state_dict(self):
+        return {
+            "stage": self.stage,
+            "nepoch": self.nepoch,
+            "loss": self.loss,
+            "tolerance": self.tolerance,
+            "t0": self.t0,
+            "dt": self.dt,
+            "target": self.target,
+        }
+
+
+    def load_state_dict(self, state):
+        self.nepoch = state["nepoch"]
+        self.loss = state["loss"]
+        self.tolerance = state["tolerance"]
+        self.t0 = state["t0"]
+        self.dt = state["dt"]
+        self.target = state["target"]
+        if self.using():
+            # > replay the stages, to rebuild w (and case2 for linearA)
+            self.stage = 0
+            self.case2 = False
+            for _ in range(state["stage"]):
+                self._advance()
+
+
     def gradual_mode(self):
         """
         Whether gradual mode is being used.
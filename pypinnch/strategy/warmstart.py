@@ -0,0 +1,146 @@
+
+
+
+from math import comb
+
+from torch import (
+    no_grad as torch_no_grad,
+)
+from torch.nn.utils import (
+    parameters_to_vector as torch_parameters_to_vector,
+    vector_to_parameters as torch_vector_to_parameters,
+)
+
+from .strategy_impl.strategy import Strategy
+
+
+
+class WarmStart(Strategy):
+    """
+    WarmStart initializes the parameters at the start of a step
+    by polynomial extrapolation in parameter space,
+    from the parameters at the end of the previous steps,
+    instead of simply continuing from the parameters
+    of the previous step.
+    When the solution evolves smoothly in time, the
+    extrapolated parameters are closer to the
+    solution of the next step, and fewer iterations are needed.
+
+    The parameters at the end of the last `order` + 1 steps
+    are kept. With m + 1 of them available, the start is
+
+        p_{n+1} = sum_{j=0}^{m} (-1)^j C(m+1, j+1) p_{n-j},
+
+    which for m = 1 is the linear extrapolation 2 p_n - p_{n-1}.
+    This assumes the steps are of equal length.
+    The history is forgotten at the start of each stride.
+
+    .. note::
+        If `check` is set, a batch is drawn at the start of the step,
+        and the (unweighted) loss is evaluated
+        for both the extrapolated parameters and the parameters
+        of the previous step. The extrapolated start is only kept
+        if its loss is lower. Drawing the batch advances
+        the sample sets in the same way as an iteration of training.
+
+    Parameters:
+
+        order (integer):
+            Order of the polynomial extrapolation. (Default: 1)
+        check (boolean):
+            Fall back to the parameters of the previous step
+            if the extrapolated start has a higher initial loss.
+            (Default: True)
+
+    """
+
+    def __init__(
+            self,
+            order = 1,
+            check = True,
+    ):
+        super().__init__(name='warmstart')
+        if order < 1:
+            raise ValueError(f"[WarmStart] order must be a positive integer, received {order}.")
+        self.order = order
+        self.check = check
+        # state: parameter vectors at the end of the previous steps, oldest first
+        self.history = []
+
+
+    def init(self, phase):
+        """
+        Called at the initialization of train().
+        """
+        pass
+
+
+    def _parameters(self, phase):
+        return [p for module in phase.hub.modules for p in module.parameters()]
+
+
+    def store(self, phase, step):
+        """
+        Called at the end of a step, after the final training session.
+        Records the parameters.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+            step (integer):
+                The index of the step in the stride.
+
+        """
+        if step == 0:
+            self.history = []
+        p = torch_parameters_to_vector(self._parameters(phase)).detach().clone()
+        self.history.append(p)
+        if len(self.history) > self.order + 1:
+            self.history.pop(0)
+
+
+    def apply(self, phase, step):
+        """
+        Called at the start of a step, before training.
+        Sets the parameters to the extrapolated start,
+        if there is enough history.
+
+        Arguments:
+
+            phase (:any:`Phase`):
+            step (integer):
+                The index of the step in the stride.
+
+        """
+        if step == 0 or len(self.history) < 2:
+            return
+        params = self._parameters(phase)
+        m = len(self.history) - 1
+        with torch_no_grad():
+            p0 = torch_parameters_to_vector(params).detach().clone()
+            p1 = 0.0
+            for j in range(m+1):
+                p1 = p1 + ((-1)**j)*comb(m+1, j+1)*self.history[-1-j]
+            torch_vector_to_parameters(p1, params)
+        if self.check:
+            phase.batch()
+            L1 = phase.evaluate_loss()
+            with torch_no_grad():
+                torch_vector_to_parameters(p0, params)
+            L0 = phase.evaluate_loss()
+            if L1 < L0:
+                with torch_no_grad():
+                    torch_vector_to_parameters(p1, params)
+                phase.out.log(f"[WarmStart] extrapolated start (order {m}), initial loss {L1:.3e}, copied start {L0:.3e}.")
+            else:
+                phase.out.log(f"[WarmStart] copied start, initial loss {L0:.3e}, extrapolated start (order {m}) {L1:.3e}.")
+
+
+    def __str__(self):
+        out = super().__str__()
+        out += f"\norder: {self.order}\n"
+        out += f"check: {self.check}\n"
+        return out
+
+
+